@@ -12,6 +12,7 @@ warnings.filterwarnings('ignore')
 WINDOW_LENGTH_SEC = 10
 OVERLAP_RATIO = 0.5
 NORMALIZATION_METHOD = 'zscore'
+LEADS = [0]  # [0, 1] = both AFDB leads in one pass -> windows (n_windows, 2500, n_leads)
 DATA_DIR = 'D:\\skripsi_teknis\\dataset\\mitbih-afdb'
 OUTPUT_DIR = 'D:\\skripsi_teknis\\dataset\\mitbih-afdb\\processed'
 
@@ -45,8 +46,13 @@ def get_available_records():
     print(f"Found {len(available_records)} complete records")
     return sorted(available_records)
 
-def load_ecg_data(record_id):
-    """Load ECG data dari path lokal"""
+def load_ecg_data(record_id, leads=None):
+    """Load ECG data dari path lokal
+
+    leads=None -> lead pertama sebagai array 1-D;
+    list satu lead -> lead tersebut sebagai array 1-D;
+    list beberapa lead -> array (samples, n_leads), semua lead dari satu kali baca
+    """
     try:
         record_path = os.path.join(DATA_DIR, record_id)
         
@@ -55,12 +61,13 @@ def load_ecg_data(record_id):
             print(f"Data file not found: {record_path}.dat")
             return None, None
             
-        # Load record dari path lokal
-        record = wfdb.rdrecord(record_path)
+        # Load record dari path lokal (hanya lead yang diminta)
+        channels = [0] if leads is None else list(leads)
+        record = wfdb.rdrecord(record_path, channels=channels)
         
-        # Ambil lead pertama (biasanya lead I atau II)
+        # Satu lead (default lead pertama, biasanya lead I atau II) -> 1-D, beberapa lead -> 2-D
         if record.p_signal.shape[1] > 0:
-            ecg_signal = record.p_signal[:, 0]  # Lead pertama
+            ecg_signal = record.p_signal[:, 0] if len(channels) == 1 else record.p_signal
         else:
             print(f"No signal data found in {record_id}")
             return None, None
@@ -75,9 +82,10 @@ def load_ecg_data(record_id):
         return None, None
 
 def apply_comprehensive_filtering(ecg_signal, fs):
+    # 1-D signal or (samples, n_leads): every step runs along the time axis (axis 0)
     
     # Step 1: DC removal
-    ecg_dc_removed = ecg_signal - np.mean(ecg_signal)
+    ecg_dc_removed = ecg_signal - np.mean(ecg_signal, axis=0)
     
     # Step 2: Bandpass filter (0.5-40 Hz)
     nyquist = fs / 2
@@ -85,12 +93,12 @@ def apply_comprehensive_filtering(ecg_signal, fs):
     high_cutoff = 40.0 / nyquist
     
     bp_b, bp_a = signal.butter(4, [low_cutoff, high_cutoff], btype='band')
-    ecg_bandpass = signal.filtfilt(bp_b, bp_a, ecg_dc_removed)
+    ecg_bandpass = signal.filtfilt(bp_b, bp_a, ecg_dc_removed, axis=0)
     
     # Step 3: Notch filter (50 Hz)
     notch_freq = 50.0 / nyquist
     notch_b, notch_a = signal.iirnotch(notch_freq, Q=25)
-    ecg_filtered = signal.filtfilt(notch_b, notch_a, ecg_bandpass)
+    ecg_filtered = signal.filtfilt(notch_b, notch_a, ecg_bandpass, axis=0)
     
     return ecg_filtered
 
@@ -292,14 +300,10 @@ def create_ecg_windows_enhanced(ecg_signal, segments, fs, window_length_sec=10,
 
 def normalize_ecg_windows(windows, method='zscore'):
     if method == 'zscore':
-        normalized_windows = []
-        for window in windows:
-            if np.std(window) > 0:
-                normalized = (window - np.mean(window)) / np.std(window)
-            else:
-                normalized = window - np.mean(window)
-            normalized_windows.append(normalized)
-        normalized_windows = np.array(normalized_windows)
+        # Per window (and per lead for (n, samples, n_leads) windows), along the time axis
+        mean = np.mean(windows, axis=1, keepdims=True)
+        std = np.std(windows, axis=1, keepdims=True)
+        normalized_windows = (windows - mean) / np.where(std > 0, std, 1.0)
         
     elif method == 'minmax':
         global_min = np.min(windows)
@@ -313,8 +317,8 @@ def preprocess_single_record(record_id):
     
     print(f"\n=== Processing Record {record_id} ===")
     
-    # Load ECG data
-    ecg_signal, fs = load_ecg_data(record_id)
+    # Load ECG data (all LEADS from one read; a single lead comes back 1-D)
+    ecg_signal, fs = load_ecg_data(record_id, LEADS)
     if ecg_signal is None:
         return None
     
@@ -371,6 +375,7 @@ def preprocess_single_record(record_id):
         'window_length_sec': WINDOW_LENGTH_SEC,
         'overlap_ratio': OVERLAP_RATIO,
         'normalization_method': NORMALIZATION_METHOD,
+        'leads': LEADS,
         'windows': normalized_windows,
         'labels': window_labels,
         'total_windows': len(window_labels),
@@ -402,6 +407,7 @@ def main():
     print(f"Window length: {WINDOW_LENGTH_SEC}s")
     print(f"Overlap ratio: {OVERLAP_RATIO}")
     print(f"Normalization: {NORMALIZATION_METHOD}")
+    print(f"Leads: {LEADS}")
     print(f"Output directory: {OUTPUT_DIR}")
     
     # Pastikan directory data ada
@@ -484,6 +490,7 @@ def main():
             'window_length_sec': WINDOW_LENGTH_SEC,
             'overlap_ratio': OVERLAP_RATIO,
             'normalization_method': NORMALIZATION_METHOD,
+            'leads': LEADS,
             'supports_single_annotation': True
         }
     }
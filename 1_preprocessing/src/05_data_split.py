@@ -15,14 +15,25 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.metrics import classification_report
 
-def load_all_processed_data():
+from split_optimizer import optimize_allocation, print_allocation
+
+# 'stratified' = one shuffle per category (stratified_patient_allocation), default;
+# 'optimized' = best of many candidate allocations (split_optimizer.py), opt-in
+# because it assigns patients to different splits than existing 'stratified' runs
+ALLOCATION_METHOD = 'stratified'
+
+# Output 03_preprocessing.py; untuk window dari rhythm_index.py pakai
+# PROCESSED_DIR = r'...\processed\indexed' dan PROCESSED_PATTERN = 'record_*_indexed.npz'
+PROCESSED_DIR = r'D:\skripsi_teknis\dataset\mitbih-afdb\processed'
+PROCESSED_PATTERN = 'record_*_processed.npz'
+
+def load_all_processed_data(processed_dir=PROCESSED_DIR, pattern=PROCESSED_PATTERN):
     """
     Step 1: Load semua processed data dan analyze record characteristics
     """
     print("=== Step 1: Loading dan Analyzing Processed Data ===")
     
-    processed_dir = r'D:\skripsi_teknis\dataset\mitbih-afdb\processed'
-    processed_files = glob.glob(os.path.join(processed_dir, 'record_*_processed.npz'))
+    processed_files = glob.glob(os.path.join(processed_dir, pattern))
     
     if not processed_files:
         raise FileNotFoundError(f"No processed files found in {processed_dir}")
@@ -243,6 +254,21 @@ def stratified_patient_allocation(categories, test_size=0.2, val_size=0.2, rando
     
     return allocated_splits
 
+def optimized_patient_allocation(categories, test_size=0.2, val_size=0.2, random_seed=42, workers=None):
+    """
+    Step 3 (alternatif): alokasi dengan AF ratio dan ukuran split paling dekat ke target
+    """
+    print(f"\n=== Step 3: Optimized Patient Allocation ===")
+    print(f"Target splits: Train {1-test_size-val_size:.1%}, Val {val_size:.1%}, Test {test_size:.1%}")
+    
+    record_profiles = [record for records in categories.values() for record in records]
+    allocated_splits, result = optimize_allocation(
+        record_profiles, test_size, val_size, random_seed=random_seed, workers=workers
+    )
+    print_allocation(allocated_splits, result)
+    
+    return allocated_splits
+
 def create_data_splits(allocated_splits, all_data):
     """
     Step 4: Create actual data splits dari allocated records
@@ -713,7 +739,10 @@ def main():
         categories = categorize_records(record_profiles)
         
         # Step 3: Stratified allocation
-        allocated_splits = stratified_patient_allocation(categories)
+        if ALLOCATION_METHOD == 'optimized':
+            allocated_splits = optimized_patient_allocation(categories)
+        else:
+            allocated_splits = stratified_patient_allocation(categories)
         
         # Step 4: Create data splits
         data_splits = create_data_splits(allocated_splits, all_data)
@@ -0,0 +1,287 @@
+"""
+Scanner dataset cepat: hanya .hea dan .atr (tanpa membaca .dat)
+- header: fs dan panjang sinyal dari baris record .hea
+- anotasi: parser format MIT .atr langsung (tanpa wfdb.rdann)
+- per record: durasi, komposisi label ritme (detik), detik AF/Normal dan
+  estimasi jumlah window untuk window/overlap apa pun, dengan aturan segment
+  yang sama seperti extract_af_normal_segments_enhanced +
+  create_ecg_windows_enhanced di 03_preprocessing.py
+- profil record kompatibel dengan record_profiles di 05_data_split.py,
+  sehingga split bisa direncanakan sebelum preprocessing (--plan)
+
+Contoh:
+    python annotation_scanner.py
+    python annotation_scanner.py --window-sec 30 --overlap 0.75
+    python annotation_scanner.py --plan --output inventory.json
+"""
+
+import argparse
+import glob
+import importlib.util
+import json
+import os
+import time
+
+import numpy as np
+
+DATA_DIR = 'D:\\skripsi_teknis\\dataset\\mitbih-afdb'
+WINDOW_LENGTH_SEC = 10
+OVERLAP_RATIO = 0.5
+
+# Same rhythm sets as extract_af_normal_segments_enhanced
+AF_LABELS = {'(AFIB', 'AFIB'}
+NORMAL_LABELS = {'(N', 'N', 'NSR'}
+
+# MIT annotation format pseudo-codes
+SKIP = 59
+NUM = 60
+SUB = 61
+CHN = 62
+AUX = 63
+
+
+def read_header(record_path):
+    """fs, signal length and signal count from the record line of a .hea file"""
+    with open(f"{record_path}.hea", 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                fields = line.split()
+                break
+        else:
+            raise ValueError(f"No record line in {record_path}.hea")
+
+    # "name[/segments] n_sig [fs[/counter_freq[(base)]] [sig_len ...]]"
+    n_sig = int(fields[1])
+    fs = float(fields[2].split('/')[0].split('(')[0]) if len(fields) > 2 else 250.0
+    sig_len = int(fields[3]) if len(fields) > 3 else None
+    return {'fs': fs, 'sig_len': sig_len, 'n_sig': n_sig}
+
+
+def read_annotations(record_path, extension='atr'):
+    """(sample, code, aux_note) of every annotation in an MIT-format annotation file"""
+    words = np.fromfile(f"{record_path}.{extension}", dtype='<u2')
+    codes = (words >> 10).tolist()
+    values = (words & 0x3FF).tolist()
+
+    samples, types, aux_notes = [], [], []
+    time_index = 0
+    i = 0
+    while i < len(words):
+        code, value = codes[i], values[i]
+        if code == 0 and value == 0:
+            break
+        if code == SKIP:
+            # 32-bit interval, PDP-11 order: high word first
+            skip = (int(words[i + 1]) << 16) | int(words[i + 2])
+            time_index += skip - (1 << 32) if skip >= 1 << 31 else skip
+            i += 3
+            continue
+        if code == AUX:
+            raw = words[i + 1:i + 1 + (value + 1) // 2].tobytes()[:value]
+            if aux_notes:
+                aux_notes[-1] = raw.decode('latin-1').rstrip('\x00').strip()
+            i += 1 + (value + 1) // 2
+            continue
+        if code in (NUM, SUB, CHN):
+            i += 1
+            continue
+
+        time_index += value
+        samples.append(time_index)
+        types.append(code)
+        aux_notes.append('')
+        i += 1
+
+    return np.array(samples, dtype=np.int64), np.array(types, dtype=np.int64), aux_notes
+
+
+def rhythm_annotations(record_path):
+    """(header, samples, labels) of the rhythm-change annotations of a record"""
+    header = read_header(record_path)
+    samples, _, aux_notes = read_annotations(record_path)
+    # Rhythm changes carry the rhythm in aux_note; other annotations are ignored
+    is_rhythm = np.array([note.startswith('(') or note in AF_LABELS or note in NORMAL_LABELS
+                          for note in aux_notes], dtype=bool)
+    labels = [note for note, keep in zip(aux_notes, is_rhythm) if keep]
+    return header, samples[is_rhythm] if len(samples) else samples, labels
+
+
+def rhythm_segments(samples, rhythm_labels, sig_len):
+    """AF/Normal segments like extract_af_normal_segments_enhanced (without the signal)
+
+    Returns (starts, ends, labels, record_type) or None when the record has
+    no usable AF/Normal annotation.
+    """
+    unique_labels = set(rhythm_labels)
+    if len(unique_labels) == 1:
+        label = next(iter(unique_labels))
+        if label in AF_LABELS or label in NORMAL_LABELS:
+            return (np.array([0]), np.array([sig_len]), np.array([int(label in AF_LABELS)]),
+                    'single_annotation')
+        return None
+
+    keep = np.array([i for i, label in enumerate(rhythm_labels) if label in AF_LABELS or label in NORMAL_LABELS])
+    if len(keep) < 2:
+        return None
+    starts = samples[keep[:-1]]
+    ends = samples[keep[1:]]
+    labels = np.array([int(rhythm_labels[i] in AF_LABELS) for i in keep[:-1]])
+    inside = ends <= sig_len
+    return starts[inside], ends[inside], labels[inside], 'multi_annotation'
+
+
+def estimate_windows(segment_samples, fs, window_sec=WINDOW_LENGTH_SEC, overlap_ratio=OVERLAP_RATIO):
+    """Windows create_ecg_windows_enhanced would cut from segments of these lengths"""
+    window_samples = int(window_sec * fs)
+    step_samples = max(1, int(window_samples * (1 - overlap_ratio)))
+    segment_samples = np.asarray(segment_samples, dtype=np.int64)
+    return np.where(segment_samples >= window_samples, (segment_samples - window_samples) // step_samples + 1, 0)
+
+
+def scan_record(data_dir, record_id, window_sec=WINDOW_LENGTH_SEC, overlap_ratio=OVERLAP_RATIO):
+    """Profile of one record from its .hea and .atr only"""
+    header, rhythm_samples, rhythm_labels = rhythm_annotations(os.path.join(data_dir, record_id))
+    fs, sig_len = header['fs'], header['sig_len']
+    if sig_len is None:
+        sig_len = int(rhythm_samples[-1]) + 1 if len(rhythm_samples) else 0
+
+    # Seconds per rhythm: each annotation lasts until the next one (or the end of the record)
+    rhythm_seconds = {}
+    if len(rhythm_samples):
+        durations = np.diff(np.r_[rhythm_samples, max(sig_len, rhythm_samples[-1])]) / fs
+        for label, duration in zip(rhythm_labels, durations):
+            rhythm_seconds[label] = rhythm_seconds.get(label, 0.0) + float(duration)
+
+    profile = {
+        'record_id': record_id,
+        'fs': fs,
+        'sig_len': sig_len,
+        'n_sig': header['n_sig'],
+        'duration_sec': sig_len / fs,
+        'annotation_labels': sorted(set(rhythm_labels)),
+        'rhythm_seconds': rhythm_seconds,
+        'record_type': 'unusable',
+        'af_seconds': 0.0,
+        'normal_seconds': 0.0,
+        'segments': 0,
+        'total_windows': 0,
+        'af_windows': 0,
+        'normal_windows': 0,
+        'af_ratio': 0.0
+    }
+
+    segments = rhythm_segments(rhythm_samples, rhythm_labels, sig_len) if rhythm_labels else None
+    if segments is None:
+        return profile
+
+    starts, ends, labels, record_type = segments
+    lengths = ends - starts
+    windows = estimate_windows(lengths, fs, window_sec, overlap_ratio)
+    af_windows = int(np.sum(windows[labels == 1]))
+    total_windows = int(np.sum(windows))
+    profile.update({
+        'record_type': record_type,
+        'af_seconds': float(np.sum(lengths[labels == 1]) / fs),
+        'normal_seconds': float(np.sum(lengths[labels == 0]) / fs),
+        'segments': int(len(lengths)),
+        'total_windows': total_windows,
+        'af_windows': af_windows,
+        'normal_windows': total_windows - af_windows,
+        'af_ratio': af_windows / total_windows if total_windows > 0 else 0.0
+    })
+    return profile
+
+
+def get_annotated_records(data_dir):
+    """Record ids with both a .hea and an .atr file"""
+    headers = glob.glob(os.path.join(data_dir, "*.hea"))
+    records = [os.path.splitext(os.path.basename(path))[0] for path in headers]
+    return sorted(r for r in records if os.path.exists(os.path.join(data_dir, f"{r}.atr")))
+
+
+def scan_dataset(data_dir=DATA_DIR, window_sec=WINDOW_LENGTH_SEC, overlap_ratio=OVERLAP_RATIO, records=None):
+    profiles = []
+    for record_id in records or get_annotated_records(data_dir):
+        try:
+            profiles.append(scan_record(data_dir, record_id, window_sec, overlap_ratio))
+        except Exception as e:
+            print(f"  ERROR scanning {record_id}: {e}")
+    return profiles
+
+
+def print_inventory(profiles):
+    print(f"\n{'Record':<8} {'Type':<18} {'Dur (min)':>9} {'AF (min)':>9} {'N (min)':>8} "
+          f"{'Windows':>8} {'AF win':>7} {'AF ratio':>9}  Labels")
+    for p in profiles:
+        print(f"{p['record_id']:<8} {p['record_type']:<18} {p['duration_sec'] / 60:>9.1f} "
+              f"{p['af_seconds'] / 60:>9.1f} {p['normal_seconds'] / 60:>8.1f} {p['total_windows']:>8,} "
+              f"{p['af_windows']:>7,} {p['af_ratio']:>9.3f}  {', '.join(p['annotation_labels'])}")
+
+    usable = [p for p in profiles if p['total_windows'] > 0]
+    total_windows = sum(p['total_windows'] for p in usable)
+    total_af = sum(p['af_windows'] for p in usable)
+    label_seconds = {}
+    for p in profiles:
+        for label, seconds in p['rhythm_seconds'].items():
+            label_seconds[label] = label_seconds.get(label, 0.0) + seconds
+
+    print(f"\nRecords: {len(profiles)} ({len(usable)} usable)")
+    print(f"Total duration: {sum(p['duration_sec'] for p in profiles) / 3600:.1f} h")
+    print(f"Rhythm composition: " + ", ".join(
+        f"{label} {seconds / 3600:.1f} h" for label, seconds in sorted(label_seconds.items(), key=lambda x: -x[1])))
+    if total_windows:
+        print(f"Estimated windows: {total_windows:,} (AF {total_af:,}, {total_af / total_windows:.1%})")
+
+
+def load_data_split():
+    # 05_data_split.py is not importable by name (starts with a digit)
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '05_data_split.py')
+    spec = importlib.util.spec_from_file_location('data_split_05', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dataset inventory from .hea/.atr files only")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--window-sec", type=float, default=WINDOW_LENGTH_SEC)
+    parser.add_argument("--overlap", type=float, default=OVERLAP_RATIO)
+    parser.add_argument("--output", default=None, help="save the record profiles as JSON")
+    parser.add_argument("--plan", action='store_true',
+                        help="run the 05_data_split categorization and allocation on the estimates")
+    args = parser.parse_args()
+
+    print("=== Annotation-only Dataset Scan ===")
+    print(f"Data directory: {args.data_dir}")
+    print(f"Window: {args.window_sec:g}s, overlap {args.overlap:g}")
+
+    start_time = time.perf_counter()
+    profiles = scan_dataset(args.data_dir, args.window_sec, args.overlap)
+    elapsed = time.perf_counter() - start_time
+    if not profiles:
+        print("No records found!")
+        return
+
+    print_inventory(profiles)
+    print(f"Scanned {len(profiles)} records in {elapsed * 1000:.0f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'window_sec': args.window_sec, 'overlap_ratio': args.overlap, 'records': profiles},
+                      f, indent=2)
+        print(f"✓ Inventory saved: {args.output}")
+
+    if args.plan:
+        data_split = load_data_split()
+        usable = [p for p in profiles if p['total_windows'] > 0]
+        categories = data_split.categorize_records(usable)
+        if data_split.ALLOCATION_METHOD == 'optimized':
+            data_split.optimized_patient_allocation(categories)
+        else:
+            data_split.stratified_patient_allocation(categories)
+
+
+if __name__ == "__main__":
+    main()
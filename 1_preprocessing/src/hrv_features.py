@@ -0,0 +1,269 @@
+"""
+Fitur HRV per window 10 detik (batch)
+- R-peak semua window dideteksi sekaligus (detect_r_peaks_windows), RR
+  disimpan sebagai array padded (n_windows, max_rr) dengan NaN
+- RMSSD, pNN50, CV, Poincaré SD1/SD2 dihitung tervektorisasi atas semua window
+- sample entropy / approximate entropy memakai satu KD-tree (jarak Chebyshev)
+  untuk semua template satu batch, O(T log T), bukan perbandingan template O(n²)
+- baris matriks fitur sejajar dengan X/y dari 05_data_split.py
+  ({split}_data.npz -> {split}_hrv_features.npz, y dan record_mapping ikut disimpan)
+
+Contoh:
+    python hrv_features.py
+    python hrv_features.py --splits test --fs 250
+    python hrv_features.py --synthetic 20000
+"""
+
+import argparse
+import os
+import time
+import warnings
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.spatial import cKDTree
+
+from r_peak_detector import detect_r_peaks_windows, synthetic_ecg
+
+SPLITS_DIR = r'D:\skripsi_teknis\dataset\mitbih-afdb\stratified_splits'
+SPLITS = ['train', 'val', 'test']
+SAMPLING_RATE = 250
+BATCH_SIZE = 4096
+
+ENTROPY_M = 2
+ENTROPY_R_RATIO = 0.2  # tolerance r = 0.2 x SD of the window's RR intervals
+NN50_MS = 50
+
+FEATURE_NAMES = [
+    'n_beats', 'mean_rr', 'heart_rate', 'sdnn', 'cv', 'rmssd', 'pnn50',
+    'sd1', 'sd2', 'sd1_sd2', 'sample_entropy', 'approximate_entropy'
+]
+
+
+def rr_matrix(peaks, counts, fs):
+    """Padded RR intervals (ms) from detect_r_peaks_windows output; NaN past each window's last beat"""
+    if peaks.shape[1] < 2:
+        return np.full((len(peaks), 1), np.nan)
+    rr = np.diff(peaks, axis=1).astype(np.float64) / fs * 1000
+    valid = np.arange(rr.shape[1]) < (counts - 1)[:, None]
+    return np.where(valid, rr, np.nan)
+
+
+def _template_counts(rr, n_rr, scale, length, n_templates):
+    """Chebyshev neighbour counts (self included) of every template of every window
+
+    Templates are divided by their window's tolerance r, so "within r" is
+    distance <= 1 for all windows, and get the window index (x3) as an extra
+    coordinate so templates of different windows are never neighbours. One
+    KD-tree then serves the whole batch: O(T log T) for T templates instead
+    of O(n^2) comparisons per window.
+    Returns (counts, window index) for the first n_templates[i] templates
+    of each window.
+    """
+    if rr.shape[1] < length:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    templates = sliding_window_view(rr, length, axis=1) * scale[:, None, None]
+    rows, cols = np.nonzero(np.arange(templates.shape[1]) < n_templates[:, None])
+    points = np.column_stack([templates[rows, cols], rows * 3.0])
+    counts = cKDTree(points).query_ball_point(points, 1.0, p=np.inf, return_length=True)
+    return counts, rows
+
+
+def entropy_features(rr, m=ENTROPY_M, r=None):
+    """Sample entropy and approximate entropy of every row of padded RR intervals
+
+    r defaults to ENTROPY_R_RATIO x SD of each row. Rows with fewer than
+    m + 2 intervals get NaN. When no template pair of length m+1 matches,
+    SampEn is undefined; the Richman & Moorman upper bound
+    ln((N-m)(N-m-1)/2) is returned so very irregular short windows still get
+    a finite, large value.
+    """
+    rr = np.atleast_2d(np.asarray(rr, dtype=np.float64))
+    n_rr = np.sum(~np.isnan(rr), axis=1)
+    n_windows = len(rr)
+    sample_en = np.full(n_windows, np.nan)
+    approximate_en = np.full(n_windows, np.nan)
+    usable = n_rr >= m + 2
+    if not usable.any():
+        return sample_en, approximate_en
+
+    rr, n_rr = rr[usable], n_rr[usable]
+    if r is None:
+        r = ENTROPY_R_RATIO * np.nanstd(rr, axis=1)
+    r = np.broadcast_to(np.asarray(r, dtype=np.float64), n_rr.shape)
+    # r == 0 only for constant rows: every template matches, any finite scale works
+    scale = np.where(r > 0, 1 / np.where(r > 0, r, 1), 0)
+    rr = np.nan_to_num(rr)
+
+    # SampEn: the same N-m templates for both lengths, self-matches removed
+    n_templates = n_rr - m
+    counts_b, rows_b = _template_counts(rr, n_rr, scale, m, n_templates)
+    counts_m1, rows_m1 = _template_counts(rr, n_rr, scale, m + 1, n_templates)
+    b = np.bincount(rows_b, weights=counts_b, minlength=len(n_rr)) - n_templates
+    a = np.bincount(rows_m1, weights=counts_m1, minlength=len(n_rr)) - n_templates
+    bound = np.log(n_templates * (n_templates - 1) / 2)
+    with np.errstate(all='ignore'):
+        sample = np.where((a > 0) & (b > 0), -np.log(a / b), bound)
+
+    # ApEn: all templates of each length, self-matches included
+    def phi(counts, rows, n_len):
+        return np.bincount(rows, weights=np.log(counts / n_len[rows]), minlength=len(n_rr)) / n_len
+
+    counts_m, rows_m = _template_counts(rr, n_rr, scale, m, n_rr - m + 1)
+    approximate = phi(counts_m, rows_m, n_rr - m + 1) - phi(counts_m1, rows_m1, n_templates)
+
+    sample_en[usable] = sample
+    approximate_en[usable] = approximate
+    return sample_en, approximate_en
+
+
+def sample_entropy(x, m=ENTROPY_M, r=None):
+    """SampEn(m, r) of one RR series (see entropy_features)"""
+    return entropy_features(np.asarray(x, dtype=np.float64)[None], m, r)[0][0]
+
+
+def approximate_entropy(x, m=ENTROPY_M, r=None):
+    """ApEn(m, r) of one RR series (see entropy_features)"""
+    return entropy_features(np.asarray(x, dtype=np.float64)[None], m, r)[1][0]
+
+
+def rr_time_domain(rr):
+    """mean_rr, rmssd (ms) and pnn50 (%) per window from padded RR intervals (ms)
+
+    Vendored into the GUI's cascade pre-screen (3_gui/gui_3-fix/core/rr_screen.py),
+    which needs these three without the Poincaré and entropy features.
+    """
+    with np.errstate(all='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN rows -> NaN
+        successive = np.diff(rr, axis=1)
+        n_successive = np.sum(~np.isnan(successive), axis=1)
+        return {
+            'mean_rr': np.nanmean(rr, axis=1),
+            'rmssd': np.sqrt(np.nanmean(successive ** 2, axis=1)),
+            'pnn50': np.sum(np.abs(successive) > NN50_MS, axis=1) / n_successive * 100
+        }
+
+
+def hrv_features_from_rr(rr):
+    """Feature matrix (n_windows, len(FEATURE_NAMES)) from padded RR intervals (ms)"""
+    n_rr = np.sum(~np.isnan(rr), axis=1)
+    features = np.full((len(rr), len(FEATURE_NAMES)), np.nan)
+    features[:, 0] = np.where(n_rr > 0, n_rr + 1, 0)
+    time_domain = rr_time_domain(rr)
+
+    with np.errstate(all='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN rows -> NaN features
+
+        mean_rr = time_domain['mean_rr']
+        sdnn = np.nanstd(rr, axis=1, ddof=1)
+        successive = np.diff(rr, axis=1)
+
+        rmssd = time_domain['rmssd']
+        pnn50 = time_domain['pnn50']
+        # Poincaré: SD1 across the identity line, SD2 along it
+        sd1 = np.sqrt(0.5 * np.nanvar(successive, axis=1, ddof=1))
+        sd2 = np.sqrt(np.maximum(2 * sdnn ** 2 - sd1 ** 2, 0))
+
+        features[:, 1] = mean_rr
+        features[:, 2] = 60000 / mean_rr
+        features[:, 3] = sdnn
+        features[:, 4] = sdnn / mean_rr
+        features[:, 5] = rmssd
+        features[:, 6] = pnn50
+        features[:, 7] = sd1
+        features[:, 8] = sd2
+        features[:, 9] = sd1 / sd2
+
+    features[:, 10], features[:, 11] = entropy_features(rr)
+    return features
+
+
+def extract_hrv_features(windows, fs=SAMPLING_RATE, batch_size=BATCH_SIZE):
+    """HRV features of every window; row i belongs to windows[i]"""
+    features = np.empty((len(windows), len(FEATURE_NAMES)), dtype=np.float32)
+    for start in range(0, len(windows), batch_size):
+        batch = np.asarray(windows[start:start + batch_size], dtype=np.float64)
+        peaks, counts = detect_r_peaks_windows(batch, fs)
+        features[start:start + len(batch)] = hrv_features_from_rr(rr_matrix(peaks, counts, fs))
+    return features
+
+
+def timed_extraction(windows, fs, batch_size=BATCH_SIZE):
+    start_time = time.perf_counter()
+    features = extract_hrv_features(windows, fs, batch_size)
+    elapsed = time.perf_counter() - start_time
+    n_windows = len(windows)
+    print(f"  {n_windows:,} windows in {elapsed:.2f}s: {n_windows / elapsed:,.0f} windows/s, "
+          f"{n_windows * len(FEATURE_NAMES) / elapsed:,.0f} features/s")
+    return features
+
+
+def print_feature_summary(features, labels):
+    print(f"\n  {'Feature':<22} {'Normal':>12} {'AF':>12} {'NaN':>6}")
+    for i, name in enumerate(FEATURE_NAMES):
+        column = features[:, i]
+        normal = np.nanmedian(column[labels == 0]) if np.any(labels == 0) else np.nan
+        af = np.nanmedian(column[labels == 1]) if np.any(labels == 1) else np.nan
+        print(f"  {name:<22} {normal:>12.3f} {af:>12.3f} {int(np.sum(np.isnan(column))):>6}")
+
+
+def synthetic_benchmark(n_windows, fs):
+    """Feature throughput on synthetic Normal/AF windows (no dataset needed)"""
+    window_size = 10 * fs
+    half = (n_windows + 1) // 2
+    windows, labels = [], []
+    for af in (False, True):
+        ecg, _ = synthetic_ecg(fs, half * 10 + 1, af=af, seed=int(af))
+        windows.append(ecg[:half * window_size].reshape(half, window_size))
+        labels.append(np.full(half, int(af)))
+    windows = np.concatenate(windows)[:n_windows]
+    labels = np.concatenate(labels)[:n_windows]
+
+    print(f"=== HRV Features: synthetic benchmark ({fs} Hz) ===")
+    features = timed_extraction(windows, fs)
+    print_feature_summary(features, labels)
+
+
+def process_split(split_name, splits_dir, output_dir, fs):
+    data_file = os.path.join(splits_dir, f'{split_name}_data.npz')
+    if not os.path.exists(data_file):
+        print(f"  ❌ {data_file} not found")
+        return None
+
+    data = np.load(data_file)
+    X, y = data['X'], data['y']
+    print(f"\n{split_name}: {X.shape}")
+    features = timed_extraction(X, fs)
+
+    output_file = os.path.join(output_dir, f'{split_name}_hrv_features.npz')
+    np.savez_compressed(output_file, features=features, feature_names=np.array(FEATURE_NAMES),
+                        y=y, record_mapping=data['record_mapping'], sampling_frequency=fs)
+    print(f"  ✅ {split_name}_hrv_features.npz: {features.shape}")
+    print_feature_summary(features, y)
+    return features
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HRV features for every window of the stratified splits")
+    parser.add_argument("--splits-dir", default=SPLITS_DIR)
+    parser.add_argument("--output-dir", default=None, help="default: --splits-dir")
+    parser.add_argument("--splits", nargs='+', default=SPLITS)
+    parser.add_argument("--fs", type=int, default=SAMPLING_RATE, help="sampling rate of the windows in X")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="benchmark on this many synthetic windows instead of the splits")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        synthetic_benchmark(args.synthetic, args.fs)
+        return
+
+    output_dir = args.output_dir or args.splits_dir
+    os.makedirs(output_dir, exist_ok=True)
+    print("=== HRV Features per Window ===")
+    print(f"Features: {', '.join(FEATURE_NAMES)}")
+    for split_name in args.splits:
+        process_split(split_name, args.splits_dir, output_dir, args.fs)
+
+
+if __name__ == "__main__":
+    main()
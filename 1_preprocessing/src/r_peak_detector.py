@@ -0,0 +1,339 @@
+"""
+R-peak detector (Pan-Tompkins style) dengan NumPy/SciPy tervektorisasi
+Pengganti nk.ecg_process untuk mencari R-peak saja: input adalah output
+apply_comprehensive_filtering (0.5-40 Hz + notch), record panjang diproses
+per chunk dengan overlap sehingga memori tetap kecil.
+
+Tahap:
+1. Bandpass QRS 5-15 Hz, derivative 5 titik, kuadrat, moving-window integration 150 ms
+2. Kandidat = puncak lokal energi dengan jarak minimal 200 ms (refractory)
+3. Threshold adaptif = 0.3 x persentil-80 tinggi kandidat di sekitarnya
+4. Search-back: jika RR > 1.66 x median RR lokal, ambil kandidat tertinggi
+   di celah tersebut yang >= setengah threshold
+5. Posisi R = sampel dengan |amplitudo| maksimum di sekitar puncak energi
+
+Benchmark (throughput + kesesuaian dengan NeuroKit2 / anotasi .qrs):
+    python r_peak_detector.py
+    python r_peak_detector.py --records 04015 08219 --data-dir D:\\dataset\\mitbih-afdb
+"""
+
+import argparse
+import importlib.util
+import os
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import ndimage, signal
+
+QRS_BAND_HZ = (5.0, 15.0)
+INTEGRATION_SEC = 0.150
+REFRACTORY_SEC = 0.200
+THRESHOLD_RATIO = 0.3
+THRESHOLD_PERCENTILE = 80
+THRESHOLD_NEIGHBORS = 16  # candidates on each side used for the local threshold
+THRESHOLD_FLOOR_RATIO = 0.1  # of the chunk-wide reference, so beat-free stretches don't pick up noise
+SEARCHBACK_RR_RATIO = 1.66
+REFINE_SEC = 0.075
+
+CHUNK_SEC = 600
+OVERLAP_SEC = 10
+
+
+def qrs_energy(ecg, fs):
+    """Moving-window integrated, squared derivative of the 5-15 Hz band (along the last axis)"""
+    high = min(QRS_BAND_HZ[1], 0.45 * fs)
+    sos = signal.butter(2, [QRS_BAND_HZ[0] / (fs / 2), high / (fs / 2)], btype='band', output='sos')
+    band = signal.sosfiltfilt(sos, ecg, axis=-1)
+
+    derivative = ndimage.convolve1d(band, np.array([1, 2, 0, -2, -1]) * (fs / 8.0), axis=-1, mode='nearest')
+    width = max(1, int(round(INTEGRATION_SEC * fs)))
+    # Centred window: the energy peak lines up with the QRS instead of lagging it
+    return ndimage.uniform_filter1d(derivative ** 2, width, axis=-1, mode='nearest')
+
+
+def _local_threshold(heights):
+    n_window = 2 * THRESHOLD_NEIGHBORS + 1
+    overall = np.percentile(heights, THRESHOLD_PERCENTILE)
+    if len(heights) < n_window:
+        return np.full(len(heights), THRESHOLD_RATIO * overall)
+    padded = np.pad(heights, THRESHOLD_NEIGHBORS, mode='edge')
+    reference = np.percentile(sliding_window_view(padded, n_window), THRESHOLD_PERCENTILE, axis=1)
+    return THRESHOLD_RATIO * np.maximum(reference, THRESHOLD_FLOOR_RATIO * overall)
+
+
+def _search_back(peaks, candidates, heights, threshold):
+    if len(peaks) < 3:
+        return peaks
+    rr = np.diff(peaks)
+    local_rr = ndimage.median_filter(rr, size=9, mode='nearest')
+    long_gaps = np.nonzero(rr > SEARCHBACK_RR_RATIO * local_rr)[0]
+    if len(long_gaps) == 0:
+        return peaks
+
+    lo = np.searchsorted(candidates, peaks[long_gaps], side='right')
+    hi = np.searchsorted(candidates, peaks[long_gaps + 1], side='left')
+    recovered = []
+    for a, b in zip(lo, hi):
+        if b <= a:
+            continue
+        inside = np.arange(a, b)
+        inside = inside[heights[inside] >= 0.5 * threshold[inside]]
+        if len(inside):
+            recovered.append(candidates[inside[np.argmax(heights[inside])]])
+    if not recovered:
+        return peaks
+    return np.sort(np.concatenate([peaks, recovered]))
+
+
+def _refine(ecg, peaks, fs):
+    half = max(1, int(REFINE_SEC * fs))
+    index = np.clip(peaks[:, None] + np.arange(-half, half + 1), 0, len(ecg) - 1)
+    best = np.argmax(np.abs(ecg[index]), axis=1)
+    return index[np.arange(len(peaks)), best]
+
+
+def _detect(ecg, fs):
+    integrated = qrs_energy(ecg, fs)
+    candidates, _ = signal.find_peaks(integrated, distance=max(1, int(REFRACTORY_SEC * fs)))
+    if len(candidates) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    heights = integrated[candidates]
+    threshold = _local_threshold(heights)
+    peaks = candidates[heights >= threshold]
+    peaks = _search_back(peaks, candidates, heights, threshold)
+    return np.unique(_refine(ecg, peaks, fs))
+
+
+def iter_r_peaks(ecg, fs, chunk_sec=CHUNK_SEC, overlap_sec=OVERLAP_SEC):
+    """Yield absolute R-peak indices chunk by chunk (works on np.memmap input)"""
+    n = len(ecg)
+    chunk = max(1, int(chunk_sec * fs))
+    overlap = int(overlap_sec * fs)
+    for start in range(0, n, chunk):
+        end = min(n, start + chunk)
+        lo, hi = max(0, start - overlap), min(n, end + overlap)
+        peaks = _detect(np.asarray(ecg[lo:hi], dtype=np.float64), fs) + lo
+        yield peaks[(peaks >= start) & (peaks < end)]
+
+
+def detect_r_peaks(ecg, fs, chunk_sec=CHUNK_SEC, overlap_sec=OVERLAP_SEC):
+    """R-peak sample indices of a filtered ECG (output of apply_comprehensive_filtering)"""
+    parts = list(iter_r_peaks(ecg, fs, chunk_sec, overlap_sec))
+    peaks = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+    if len(peaks) < 2:
+        return peaks
+    # A beat right at a chunk border may be placed on both sides of it
+    keep = np.concatenate([[True], np.diff(peaks) > int(REFRACTORY_SEC * fs) // 2])
+    return peaks[keep]
+
+
+# Vendored (with qrs_energy) into 3_gui/gui_3-fix/core/rr_screen.py; keep them in sync
+def detect_r_peaks_windows(windows, fs):
+    """R-peaks of many short windows at once (e.g. the 10 s windows of X)
+
+    Returns (peaks, counts): peaks is (n_windows, max_beats) padded with -1.
+    A window is short enough for one threshold (0.3 x 80th percentile of its
+    candidates), so there is no rolling threshold and no search-back.
+    """
+    windows = np.atleast_2d(np.asarray(windows, dtype=np.float64))
+    n_windows, n_samples = windows.shape
+    integrated = qrs_energy(windows, fs)
+
+    # Local maxima over +-refractory stand in for find_peaks(distance=...)
+    refractory = max(1, int(REFRACTORY_SEC * fs))
+    is_peak = integrated == ndimage.maximum_filter1d(integrated, 2 * refractory + 1, axis=-1, mode='nearest')
+    is_peak &= integrated > 0
+
+    # Per-row percentile of the candidate heights (np.nanpercentile loops over rows)
+    heights = np.sort(np.where(is_peak, integrated, np.nan), axis=1)
+    last = np.maximum(np.sum(is_peak, axis=1) - 1, 0)
+    position = last * (THRESHOLD_PERCENTILE / 100)
+    low = np.floor(position).astype(np.int64)
+    below = heights[np.arange(n_windows), low]
+    above = heights[np.arange(n_windows), np.minimum(low + 1, last)]
+    threshold = THRESHOLD_RATIO * (below + (position - low) * (above - below))
+    rows, positions = np.nonzero(is_peak & (integrated >= threshold[:, None]))
+
+    # Refine to the largest |amplitude| near each energy peak
+    half = max(1, int(REFINE_SEC * fs))
+    index = np.clip(positions[:, None] + np.arange(-half, half + 1), 0, n_samples - 1)
+    best = np.argmax(np.abs(windows[rows[:, None], index]), axis=1)
+    positions = index[np.arange(len(positions)), best]
+
+    counts = np.bincount(rows, minlength=n_windows)
+    first = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank = np.arange(len(rows)) - first[rows]
+    peaks = np.full((n_windows, max(1, counts.max(initial=0))), -1, dtype=np.int64)
+    peaks[rows, rank] = positions
+    return peaks, counts
+
+
+def compare_peaks(reference, detected, fs, tolerance_sec=0.05):
+    """Beat-by-beat agreement: a detection matches a reference beat within the tolerance"""
+    reference = np.sort(np.asarray(reference))
+    detected = np.sort(np.asarray(detected))
+    result = {'reference': len(reference), 'detected': len(detected), 'true_positive': 0,
+              'sensitivity': 0.0, 'ppv': 0.0, 'f1': 0.0, 'mean_offset_ms': float('nan')}
+    if len(reference) == 0 or len(detected) == 0:
+        return result
+
+    idx = np.searchsorted(detected, reference)
+    left = np.clip(idx - 1, 0, len(detected) - 1)
+    right = np.clip(idx, 0, len(detected) - 1)
+    nearest = np.where(np.abs(detected[left] - reference) <= np.abs(detected[right] - reference), left, right)
+    distance = np.abs(detected[nearest] - reference)
+    matched = distance <= tolerance_sec * fs
+
+    tp = len(np.unique(nearest[matched]))  # each detection matches at most one beat
+    sensitivity = tp / len(reference)
+    ppv = tp / len(detected)
+    result.update({
+        'true_positive': tp,
+        'sensitivity': sensitivity,
+        'ppv': ppv,
+        'f1': 2 * sensitivity * ppv / (sensitivity + ppv) if tp else 0.0,
+        'mean_offset_ms': float(np.mean(distance[matched]) / fs * 1000) if tp else float('nan')
+    })
+    return result
+
+
+def synthetic_ecg(fs, duration_sec=600, heart_rate=75, af=False, noise=0.05, seed=0):
+    """ECG-like signal (mV) and its true R-peak indices; AF = irregular RR, f-waves, no P wave"""
+    rng = np.random.default_rng(seed)
+    mean_rr = 60.0 / heart_rate
+    n_beats = int(duration_sec / mean_rr * 1.5) + 2
+    if af:
+        rr = mean_rr * rng.uniform(0.6, 1.4, n_beats)
+    else:
+        rr = rng.normal(mean_rr, 0.03, n_beats)
+    beat_times = 0.5 + np.cumsum(rr)
+    beat_times = beat_times[beat_times < duration_sec - 0.5]
+    peaks = np.round(beat_times * fs).astype(np.int64)
+
+    t = np.arange(-int(0.5 * fs), int(0.5 * fs) + 1) / fs
+    waves = [(0.0, 0.010, 1.0), (-0.025, 0.010, -0.15), (0.025, 0.010, -0.2), (0.25, 0.045, 0.3)]
+    if not af:
+        waves.append((-0.16, 0.025, 0.12))
+    template = sum(amp * np.exp(-((t - center) / width) ** 2) for center, width, amp in waves)
+
+    n = int(duration_sec * fs)
+    ecg = np.zeros(n)
+    index = peaks[:, None] + np.arange(len(t)) - len(t) // 2
+    valid = (index >= 0) & (index < n)
+    np.add.at(ecg, index[valid], np.broadcast_to(template, index.shape)[valid])
+
+    time_axis = np.arange(n) / fs
+    ecg += 0.1 * np.sin(2 * np.pi * 0.3 * time_axis)
+    if af:
+        ecg += 0.05 * np.sin(2 * np.pi * 6.0 * time_axis + rng.uniform(0, 2 * np.pi))
+    ecg += noise * rng.standard_normal(n)
+    return ecg, peaks
+
+
+def _load_preprocessing():
+    # 03_preprocessing.py is not importable by name (starts with a digit)
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '03_preprocessing.py')
+    spec = importlib.util.spec_from_file_location('preprocessing_03', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _neurokit_peaks(ecg, fs):
+    import neurokit2 as nk
+    # Same call as detect_r_peaks_neurokit in 02_preprocessing_with_features.ipynb
+    _, info = nk.ecg_process(ecg, sampling_rate=fs, method='neurokit')
+    return np.asarray(info['ECG_R_Peaks'])
+
+
+def benchmark_case(name, filtered, fs, reference=None, use_neurokit=True, neurokit_max_sec=1800):
+    start_time = time.perf_counter()
+    peaks = detect_r_peaks(filtered, fs)
+    elapsed = time.perf_counter() - start_time
+
+    result = {
+        'case': name,
+        'samples': len(filtered),
+        'beats': len(peaks),
+        'samples_per_sec': len(filtered) / elapsed,
+        'seconds': elapsed
+    }
+    if reference is not None:
+        result['vs_reference'] = compare_peaks(reference, peaks, fs)
+
+    if use_neurokit:
+        try:
+            n_nk = min(len(filtered), int(neurokit_max_sec * fs))
+            start_time = time.perf_counter()
+            nk_peaks = _neurokit_peaks(filtered[:n_nk], fs)
+            nk_elapsed = time.perf_counter() - start_time
+            result['neurokit_samples_per_sec'] = n_nk / nk_elapsed
+            result['vs_neurokit'] = compare_peaks(nk_peaks, peaks[peaks < n_nk], fs)
+            if reference is not None:
+                result['neurokit_vs_reference'] = compare_peaks(np.asarray(reference)[np.asarray(reference) < n_nk],
+                                                                nk_peaks, fs)
+        except ImportError:
+            pass
+    return result
+
+
+def print_result(result):
+    line = (f"{result['case']:<16} {result['beats']:>7} beats  "
+            f"{result['samples_per_sec'] / 1e6:>7.2f} M samples/s")
+    if 'neurokit_samples_per_sec' in result:
+        line += f"  (NeuroKit2 {result['neurokit_samples_per_sec'] / 1e6:.2f} M/s)"
+    print(line)
+    for key, label in [('vs_reference', 'reference'), ('vs_neurokit', 'NeuroKit2'),
+                       ('neurokit_vs_reference', 'NeuroKit2 vs reference')]:
+        if key in result:
+            c = result[key]
+            print(f"    {label:<24} Se {c['sensitivity'] * 100:6.2f}%  PPV {c['ppv'] * 100:6.2f}%  "
+                  f"F1 {c['f1'] * 100:6.2f}%  offset {c['mean_offset_ms']:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized R-peak detector")
+    parser.add_argument("--fs", type=int, default=250, help="sampling rate of the synthetic signals")
+    parser.add_argument("--duration", type=float, default=600, help="seconds of synthetic signal")
+    parser.add_argument("--records", nargs='*', default=[], help="local AFDB record ids")
+    parser.add_argument("--data-dir", default=None, help="AFDB directory (default: DATA_DIR of 03_preprocessing.py)")
+    parser.add_argument("--no-neurokit", action='store_true')
+    parser.add_argument("--neurokit-max-sec", type=float, default=1800,
+                        help="only the first N seconds of a record go through NeuroKit2")
+    args = parser.parse_args()
+
+    preprocessing = _load_preprocessing()
+    if args.data_dir:
+        preprocessing.DATA_DIR = args.data_dir
+
+    print("=== R-peak Detector Benchmark ===")
+    results = []
+    for af in (False, True):
+        ecg, true_peaks = synthetic_ecg(args.fs, args.duration, af=af, seed=int(af))
+        filtered = preprocessing.apply_comprehensive_filtering(ecg, args.fs)
+        results.append(benchmark_case('synthetic AF' if af else 'synthetic N', filtered, args.fs, true_peaks,
+                                      not args.no_neurokit, args.neurokit_max_sec))
+        print_result(results[-1])
+
+    for record_id in args.records:
+        ecg, fs = preprocessing.load_ecg_data(record_id)
+        if ecg is None:
+            continue
+        filtered = preprocessing.apply_comprehensive_filtering(ecg, fs)
+
+        reference = None
+        qrs_path = os.path.join(preprocessing.DATA_DIR, record_id)
+        if os.path.exists(f"{qrs_path}.qrs"):
+            reference = preprocessing.wfdb.rdann(qrs_path, 'qrs').sample
+
+        results.append(benchmark_case(record_id, filtered, fs, reference,
+                                      not args.no_neurokit, args.neurokit_max_sec))
+        print_result(results[-1])
+
+    return results
+
+
+if __name__ == "__main__":
+    main()
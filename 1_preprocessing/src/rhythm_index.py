@@ -0,0 +1,307 @@
+"""
+Index interval ritme per record + windowing langsung pada sinyal asli
+- RhythmIndex: batas interval terurut + jumlah sample kumulatif per kelas
+  (Normal/AF/lainnya), sehingga komposisi label [start, end) untuk banyak
+  window sekaligus dijawab dengan satu np.searchsorted (O(log n) per window)
+- windowing pada sinyal terfilter utuh (bukan clean_ecg hasil concatenate di
+  03_preprocessing), hop bebas, label majority atau purity, offset sample
+  absolut tiap window ikut disimpan
+- default interval = segment AF/Normal dengan aturan 03_preprocessing
+  (annotation_scanner.rhythm_segments); --annotation-intervals memakai
+  interval ritme apa adanya (tiap anotasi berlaku sampai anotasi berikutnya)
+- output record_<id>_indexed.npz punya key yang sama dengan
+  record_<id>_processed.npz yang dipakai 05_data_split.py (record_type,
+  annotation_labels, windows, labels, ...), jadi bisa langsung di-split
+  dengan PROCESSED_DIR / PROCESSED_PATTERN di 05_data_split.py
+
+Contoh:
+    python rhythm_index.py --workers 4
+    python rhythm_index.py --hop-sec 2.5 --labelling purity
+    python rhythm_index.py --labelling majority --min-fraction 0.8 --records 04015 04043
+    python rhythm_index.py --leads 0 1
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from annotation_scanner import AF_LABELS, NORMAL_LABELS, rhythm_annotations, rhythm_segments
+from rr_dataset import load_preprocessing
+
+NORMAL = 0
+AF = 1
+OTHER = 2  # other rhythms, excluded stretches and unannotated samples
+CLASS_NAMES = ('normal', 'af', 'other')
+
+WINDOW_LENGTH_SEC = 10
+HOP_SEC = 5  # 50% overlap like 03_preprocessing
+MIN_FRACTION = 0.5
+
+
+class RhythmIndex:
+    """Contiguous rhythm intervals of one record with per-class cumulative sample counts
+
+    boundaries  sorted, len(classes) + 1 values; interval i is [boundaries[i], boundaries[i + 1])
+    classes     NORMAL, AF or OTHER per interval
+    """
+
+    def __init__(self, boundaries, classes):
+        self.boundaries = np.asarray(boundaries, dtype=np.int64)
+        self.classes = np.asarray(classes, dtype=np.int8)
+        lengths = np.diff(self.boundaries)
+        per_class = np.zeros((len(self.classes), len(CLASS_NAMES)), dtype=np.int64)
+        per_class[np.arange(len(self.classes)), self.classes] = lengths
+        # cumulative[k, c] = samples of class c in [boundaries[0], boundaries[k])
+        self.cumulative = np.vstack([np.zeros((1, len(CLASS_NAMES)), dtype=np.int64), np.cumsum(per_class, axis=0)])
+
+    @classmethod
+    def from_intervals(cls, starts, ends, classes, sig_len):
+        """Index over [0, sig_len) from (possibly gapped) intervals; gaps become OTHER"""
+        order = np.argsort(starts, kind='stable')
+        starts = np.clip(np.asarray(starts, dtype=np.int64)[order], 0, sig_len)
+        ends = np.clip(np.asarray(ends, dtype=np.int64)[order], 0, sig_len)
+        classes = np.asarray(classes, dtype=np.int8)[order]
+
+        boundaries, interval_classes = [0], []
+        for start, end, label in zip(starts.tolist(), ends.tolist(), classes.tolist()):
+            start = max(start, boundaries[-1])
+            if end <= start:
+                continue
+            if start > boundaries[-1]:
+                boundaries.append(start)
+                interval_classes.append(OTHER)
+            boundaries.append(end)
+            interval_classes.append(label)
+        if boundaries[-1] < sig_len:
+            boundaries.append(sig_len)
+            interval_classes.append(OTHER)
+        return cls(boundaries, interval_classes)
+
+    @classmethod
+    def from_segments(cls, segments, sig_len):
+        """From the segment dicts of extract_af_normal_segments_enhanced"""
+        return cls.from_intervals([seg['start_sample'] for seg in segments],
+                                  [seg['end_sample'] for seg in segments],
+                                  [seg['label'] for seg in segments], sig_len)
+
+    @classmethod
+    def from_annotations(cls, samples, rhythm_labels, sig_len):
+        """Every rhythm annotation lasts until the next one (or the end of the record)"""
+        samples = np.asarray(samples, dtype=np.int64)
+        ends = np.r_[samples[1:], sig_len] if len(samples) else samples
+        classes = [AF if label in AF_LABELS else NORMAL if label in NORMAL_LABELS else OTHER
+                   for label in rhythm_labels]
+        return cls.from_intervals(samples, ends, classes, sig_len)
+
+    @classmethod
+    def from_record(cls, record_path, annotation_intervals=False):
+        """From the .hea/.atr of a record, with the 03_preprocessing segment rules by default"""
+        header, samples, rhythm_labels = rhythm_annotations(record_path)
+        return cls.from_rhythm_annotations(samples, rhythm_labels, header['sig_len'], annotation_intervals)
+
+    @classmethod
+    def from_rhythm_annotations(cls, samples, rhythm_labels, sig_len, annotation_intervals=False):
+        """From the output of annotation_scanner.rhythm_annotations (see from_record)"""
+        if annotation_intervals:
+            return cls.from_annotations(samples, rhythm_labels, sig_len)
+        segments = rhythm_segments(samples, rhythm_labels, sig_len) if rhythm_labels else None
+        if segments is None:
+            return cls([0, sig_len], [OTHER])
+        starts, ends, labels, _ = segments
+        return cls.from_intervals(starts, ends, labels, sig_len)
+
+    @property
+    def sig_len(self):
+        return int(self.boundaries[-1])
+
+    def _coverage(self, positions):
+        """Samples of each class in [boundaries[0], position), shape (n, 3)"""
+        positions = np.clip(np.asarray(positions, dtype=np.int64), self.boundaries[0], self.boundaries[-1])
+        k = np.clip(np.searchsorted(self.boundaries, positions, side='right') - 1, 0, len(self.classes) - 1)
+        coverage = self.cumulative[k].copy()
+        coverage[np.arange(len(k)), self.classes[k]] += positions - self.boundaries[k]
+        return coverage
+
+    def composition(self, starts, ends):
+        """Samples of Normal/AF/other in each [start, end), shape (n, 3)"""
+        starts = np.atleast_1d(starts)
+        return self._coverage(ends) - self._coverage(starts)
+
+    def label_at(self, positions):
+        positions = np.atleast_1d(np.asarray(positions, dtype=np.int64))
+        k = np.searchsorted(self.boundaries, positions, side='right') - 1
+        inside = (k >= 0) & (k < len(self.classes))
+        return np.where(inside, self.classes[np.clip(k, 0, len(self.classes) - 1)], OTHER)
+
+    def window_labels(self, starts, window_samples, labelling='majority', min_fraction=MIN_FRACTION):
+        """(labels, fractions) of windows [start, start + window_samples)
+
+        majority  label = the larger of Normal/AF, kept if its share > min_fraction
+                  (ties are dropped, like create_rr_sequences)
+        purity    kept only if the whole window is one of Normal/AF
+        Dropped windows get label -1. fractions is (n, 3) Normal/AF/other.
+        """
+        starts = np.atleast_1d(np.asarray(starts, dtype=np.int64))
+        fractions = self.composition(starts, starts + window_samples) / window_samples
+        normal, af = fractions[:, NORMAL], fractions[:, AF]
+        labels = (af > normal).astype(np.int8)
+        share = np.maximum(af, normal)
+
+        if labelling == 'purity':
+            keep = share >= 1.0
+        elif labelling == 'majority':
+            keep = (share > min_fraction) & (af != normal)
+        else:
+            raise ValueError(f"Unknown labelling: {labelling}")
+        return np.where(keep, labels, -1).astype(np.int8), fractions
+
+
+def zscore_windows(windows):
+    """normalize_ecg_windows(method='zscore') for all windows (and leads) at once"""
+    mean = windows.mean(axis=1, keepdims=True)
+    std = windows.std(axis=1, keepdims=True)
+    return (windows - mean) / np.where(std > 0, std, 1.0)
+
+
+def index_windows(ecg_signal, index, fs, window_sec=WINDOW_LENGTH_SEC, hop_sec=HOP_SEC,
+                  labelling='majority', min_fraction=MIN_FRACTION):
+    """Labelled windows straight from the whole (filtered) record signal
+
+    Returns (windows, labels, start_samples, fractions); windows are copies of
+    the kept rows of a strided view, start_samples are absolute positions in
+    ecg_signal. A (samples, n_leads) signal gives (n, window, n_leads) windows.
+    """
+    window_samples = int(window_sec * fs)
+    hop_samples = max(1, int(hop_sec * fs))
+    n = min(len(ecg_signal), index.sig_len)
+    if n < window_samples:
+        return (np.zeros((0, window_samples) + ecg_signal.shape[1:]), np.zeros(0, dtype=np.int8),
+                np.zeros(0, dtype=np.int64), np.zeros((0, len(CLASS_NAMES))))
+
+    starts = np.arange(0, n - window_samples + 1, hop_samples, dtype=np.int64)
+    labels, fractions = index.window_labels(starts, window_samples, labelling, min_fraction)
+    keep = labels >= 0
+    windows = sliding_window_view(ecg_signal[:n], window_samples, axis=0)[::hop_samples][keep]
+    if windows.ndim == 3:
+        windows = np.moveaxis(windows, -1, 1)  # (n, n_leads, window) -> (n, window, n_leads)
+    return windows, labels[keep], starts[keep], fractions[keep]
+
+
+def process_record(record_id, data_dir=None, window_sec=WINDOW_LENGTH_SEC, hop_sec=HOP_SEC,
+                   labelling='majority', min_fraction=MIN_FRACTION, annotation_intervals=False, leads=None):
+    """Filter one record with the 03_preprocessing chain and window it through its RhythmIndex"""
+    preprocessing = load_preprocessing()
+    if data_dir:
+        preprocessing.DATA_DIR = data_dir
+
+    ecg_signal, fs = preprocessing.load_ecg_data(record_id, leads)
+    if ecg_signal is None:
+        return None
+    header, samples, rhythm_labels = rhythm_annotations(os.path.join(preprocessing.DATA_DIR, record_id))
+    index = RhythmIndex.from_rhythm_annotations(samples, rhythm_labels, header['sig_len'], annotation_intervals)
+    # Same record_type / annotation_labels as annotation_scanner.scan_record, for 05_data_split
+    segments = rhythm_segments(samples, rhythm_labels, header['sig_len']) if rhythm_labels else None
+    filtered_ecg = preprocessing.apply_comprehensive_filtering(ecg_signal, fs)
+
+    windows, labels, starts, fractions = index_windows(filtered_ecg, index, fs, window_sec, hop_sec,
+                                                       labelling, min_fraction)
+    return {
+        'record_id': record_id,
+        'record_type': segments[3] if segments is not None else 'unusable',
+        'annotation_labels': sorted(set(rhythm_labels)),
+        'sampling_frequency': fs,
+        'window_length_sec': window_sec,
+        'hop_sec': hop_sec,
+        'labelling': labelling,
+        'min_fraction': min_fraction,
+        'normalization_method': 'zscore',
+        'leads': [0] if leads is None else list(leads),
+        'windows': zscore_windows(windows).astype(np.float32),
+        'labels': labels,
+        'start_samples': starts,
+        'class_fractions': fractions.astype(np.float32),
+        'total_windows': len(labels),
+        'af_windows': int(np.sum(labels == AF)),
+        'normal_windows': int(np.sum(labels == NORMAL)),
+        'interval_boundaries': index.boundaries,
+        'interval_classes': index.classes
+    }
+
+
+def _record_task(args):
+    record_id, output_dir, options = args
+    start_time = time.perf_counter()
+    try:
+        data = process_record(record_id, **options)
+    except Exception as e:
+        print(f"Error processing {record_id}: {e}")
+        data = None
+    if data is None:
+        return record_id, None, time.perf_counter() - start_time
+
+    output_file = os.path.join(output_dir, f"record_{record_id}_indexed.npz")
+    np.savez_compressed(output_file, **data)
+    summary = {key: data[key] for key in ('total_windows', 'af_windows', 'normal_windows')}
+    return record_id, summary, time.perf_counter() - start_time
+
+
+def main():
+    preprocessing = load_preprocessing()
+
+    parser = argparse.ArgumentParser(description="Window records through a rhythm interval index")
+    parser.add_argument("--data-dir", default=preprocessing.DATA_DIR)
+    parser.add_argument("--output-dir", default=os.path.join(preprocessing.OUTPUT_DIR, 'indexed'))
+    parser.add_argument("--records", nargs='+', default=None, help="default: all available records")
+    parser.add_argument("--window-sec", type=float, default=WINDOW_LENGTH_SEC)
+    parser.add_argument("--hop-sec", type=float, default=HOP_SEC)
+    parser.add_argument("--labelling", choices=('majority', 'purity'), default='majority')
+    parser.add_argument("--min-fraction", type=float, default=MIN_FRACTION,
+                        help="majority: minimum share of the winning label")
+    parser.add_argument("--annotation-intervals", action='store_true',
+                        help="label by raw rhythm intervals instead of the 03_preprocessing segments")
+    parser.add_argument("--leads", type=int, nargs='+', default=None,
+                        help="e.g. 0 1 for (n, window, 2) windows; default: first lead only")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    preprocessing.DATA_DIR = args.data_dir
+    print("=== Rhythm-Indexed Windowing ===")
+    print(f"Window {args.window_sec:g}s, hop {args.hop_sec:g}s, {args.labelling} labelling")
+    records = args.records or preprocessing.get_available_records()
+    if not records:
+        return
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    options = {
+        'data_dir': args.data_dir,
+        'window_sec': args.window_sec,
+        'hop_sec': args.hop_sec,
+        'labelling': args.labelling,
+        'min_fraction': args.min_fraction,
+        'annotation_intervals': args.annotation_intervals,
+        'leads': args.leads
+    }
+    tasks = [(record_id, args.output_dir, options) for record_id in records]
+
+    start_time = time.perf_counter()
+    total_windows = total_af = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for record_id, summary, elapsed in pool.map(_record_task, tasks):
+            if summary is None:
+                print(f"✗ {record_id}: skipped")
+                continue
+            total_windows += summary['total_windows']
+            total_af += summary['af_windows']
+            print(f"✓ {record_id}: {summary['total_windows']:>6} windows "
+                  f"({summary['af_windows']} AF) {elapsed:.2f}s")
+
+    print(f"\nTotal windows: {total_windows:,} (AF {total_af:,})")
+    print(f"Done in {time.perf_counter() - start_time:.1f}s -> {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
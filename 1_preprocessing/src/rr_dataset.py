@@ -0,0 +1,243 @@
+"""
+Dataset RR-interval untuk RR-BiLSTM (versi tervektorisasi)
+- label tiap RR interval dengan satu np.searchsorted atas batas segment
+  (pengganti loop calculate_rr_intervals_with_labels di notebook 02)
+- sequence dibangun sebagai strided view (sliding_window_view), label
+  dengan majority vote, seri (tie) dibuang seperti create_rr_sequences
+- semua record diproses paralel; RR array per record di-cache ke .npz
+  sehingga dataset bisa dibangun ulang (panjang sequence / overlap lain)
+  tanpa filtering dan deteksi R-peak ulang
+
+Contoh:
+    python rr_dataset.py --workers 4
+    python rr_dataset.py --sequence-length 30 --overlap 0.75
+"""
+
+import argparse
+import importlib.util
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from r_peak_detector import detect_r_peaks
+
+SEQUENCE_LENGTH = 20
+OVERLAP_RATIO = 0.5
+CACHE_VERSION = 1
+
+_preprocessing = None
+
+
+def load_preprocessing():
+    # 03_preprocessing.py is not importable by name (starts with a digit)
+    global _preprocessing
+    if _preprocessing is None:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '03_preprocessing.py')
+        spec = importlib.util.spec_from_file_location('preprocessing_03', path)
+        _preprocessing = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(_preprocessing)
+    return _preprocessing
+
+
+def segment_arrays(segments):
+    """(starts, ends, labels) arrays from the segment dicts of extract_af_normal_segments_enhanced"""
+    order = np.argsort([seg['start_sample'] for seg in segments])
+    starts = np.array([segments[i]['start_sample'] for i in order], dtype=np.int64)
+    ends = np.array([segments[i]['end_sample'] for i in order], dtype=np.int64)
+    labels = np.array([segments[i]['label'] for i in order], dtype=np.int8)
+    return starts, ends, labels
+
+
+def label_rr_intervals(r_peaks, segments, fs):
+    """RR intervals (ms) with the label of the segment holding their first R-peak
+
+    Returns (rr_ms, labels, positions, valid). `valid` is False for RR
+    intervals whose two R-peaks are not in the same segment (they span a
+    rhythm change or an excluded stretch); their label is -1.
+    """
+    r_peaks = np.asarray(r_peaks, dtype=np.int64)
+    if len(r_peaks) < 2:
+        empty = np.zeros(0)
+        return empty, empty.astype(np.int8), empty.astype(np.int64), empty.astype(bool)
+
+    starts, ends, seg_labels = segment_arrays(segments)
+    seg_index = np.searchsorted(starts, r_peaks, side='right') - 1
+    inside = seg_index >= 0
+    inside[inside] = r_peaks[inside] < ends[seg_index[inside]]
+    seg_index = np.where(inside, seg_index, -1)
+
+    rr_ms = np.diff(r_peaks) / fs * 1000
+    valid = inside[:-1] & (seg_index[:-1] == seg_index[1:])
+    labels = np.where(valid, seg_labels[np.maximum(seg_index[:-1], 0)], -1).astype(np.int8)
+    return rr_ms, labels, r_peaks[:-1], valid
+
+
+def create_rr_sequences(rr_ms, labels, sequence_length=SEQUENCE_LENGTH, overlap_ratio=OVERLAP_RATIO, valid=None):
+    """Overlapping RR sequences with majority-vote labels; returns (sequences, labels, start_index)
+
+    Sequences are rows of a strided view into rr_ms; ties and sequences
+    containing invalid RR intervals are dropped.
+    """
+    if len(rr_ms) < sequence_length:
+        return np.zeros((0, sequence_length)), np.zeros(0, dtype=np.int8), np.zeros(0, dtype=np.int64)
+
+    step = max(1, int(sequence_length * (1 - overlap_ratio)))
+    starts = np.arange(0, len(rr_ms) - sequence_length + 1, step)
+
+    windows = sliding_window_view(rr_ms, sequence_length)[::step]
+    label_windows = sliding_window_view(labels, sequence_length)[::step]
+    af_count = np.sum(label_windows == 1, axis=1)
+    normal_count = np.sum(label_windows == 0, axis=1)
+
+    keep = af_count != normal_count
+    if valid is not None:
+        keep &= sliding_window_view(valid, sequence_length)[::step].all(axis=1)
+    sequence_labels = (af_count > normal_count).astype(np.int8)
+
+    if keep.all():
+        return windows, sequence_labels, starts
+    return windows[keep], sequence_labels[keep], starts[keep]
+
+
+def _record_files(data_dir, record_id):
+    return [os.path.join(data_dir, f"{record_id}.{ext}") for ext in ('dat', 'hea', 'atr')]
+
+
+def _cache_key(data_dir, record_id):
+    stats = [os.stat(path) for path in _record_files(data_dir, record_id)]
+    return np.array([CACHE_VERSION] + [int(s.st_mtime) for s in stats] + [s.st_size for s in stats], dtype=np.int64)
+
+
+def record_rr(record_id, cache_dir, data_dir=None):
+    """Per-record RR arrays: from the cache if the record files are unchanged, else computed and cached"""
+    preprocessing = load_preprocessing()
+    if data_dir:
+        preprocessing.DATA_DIR = data_dir
+    data_dir = preprocessing.DATA_DIR
+
+    cache_file = os.path.join(cache_dir, f"record_{record_id}_rr.npz")
+    key = _cache_key(data_dir, record_id)
+    if os.path.exists(cache_file):
+        cached = np.load(cache_file)
+        if np.array_equal(cached['cache_key'], key):
+            return dict(cached), True
+
+    ecg_signal, fs = preprocessing.load_ecg_data(record_id)
+    if ecg_signal is None:
+        return None, False
+    annotations = preprocessing.load_and_process_annotations(record_id)
+    if annotations is None:
+        return None, False
+
+    filtered_ecg = preprocessing.apply_comprehensive_filtering(ecg_signal, fs)
+    _, segments = preprocessing.extract_af_normal_segments_enhanced(filtered_ecg, annotations, fs, record_id)
+    if not segments:
+        return None, False
+
+    # R-peaks on the whole record so they share the segments' sample coordinates
+    r_peaks = detect_r_peaks(filtered_ecg, fs)
+    rr_ms, labels, positions, valid = label_rr_intervals(r_peaks, segments, fs)
+
+    data = {
+        'record_id': record_id,
+        'sampling_frequency': fs,
+        'r_peaks': r_peaks,
+        'rr_ms': rr_ms,
+        'labels': labels,
+        'positions': positions,
+        'valid': valid,
+        'cache_key': key
+    }
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez(cache_file, **data)
+    return data, False
+
+
+def _record_task(args):
+    record_id, cache_dir, data_dir = args
+    start_time = time.perf_counter()
+    try:
+        data, cached = record_rr(record_id, cache_dir, data_dir)
+    except Exception as e:
+        print(f"Error processing {record_id}: {e}")
+        data, cached = None, False
+    return record_id, data, cached, time.perf_counter() - start_time
+
+
+def build_rr_dataset(records, cache_dir, data_dir=None, sequence_length=SEQUENCE_LENGTH,
+                     overlap_ratio=OVERLAP_RATIO, workers=None):
+    """RR sequences of all records, with the record id of every sequence for patient-wise splits"""
+    tasks = [(record_id, cache_dir, data_dir) for record_id in records]
+    all_sequences, all_labels, all_records, all_positions = [], [], [], []
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for record_id, data, cached, elapsed in pool.map(_record_task, tasks):
+            if data is None:
+                print(f"  {record_id}: skipped")
+                continue
+
+            sequences, labels, starts = create_rr_sequences(
+                data['rr_ms'], data['labels'], sequence_length, overlap_ratio, valid=data['valid']
+            )
+            all_sequences.append(sequences)
+            all_labels.append(labels)
+            all_records.append(np.full(len(labels), record_id))
+            all_positions.append(data['positions'][starts])
+            print(f"  {record_id}: {len(data['rr_ms']):>6} RR, {len(labels):>5} sequences "
+                  f"({int(np.sum(labels == 1))} AF) {'[cache]' if cached else ''} {elapsed:.2f}s")
+
+    if not all_sequences:
+        return None
+    return {
+        'sequences': np.concatenate(all_sequences).astype(np.float32),
+        'labels': np.concatenate(all_labels),
+        'record_ids': np.concatenate(all_records),
+        'start_samples': np.concatenate(all_positions),
+        'sequence_length': sequence_length,
+        'overlap_ratio': overlap_ratio
+    }
+
+
+def main():
+    preprocessing = load_preprocessing()
+
+    parser = argparse.ArgumentParser(description="Build the RR-interval sequence dataset for all records")
+    parser.add_argument("--data-dir", default=preprocessing.DATA_DIR)
+    parser.add_argument("--output-dir", default=preprocessing.OUTPUT_DIR)
+    parser.add_argument("--cache-dir", default=None, help="default: <output-dir>/rr_cache")
+    parser.add_argument("--sequence-length", type=int, default=SEQUENCE_LENGTH)
+    parser.add_argument("--overlap", type=float, default=OVERLAP_RATIO)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    preprocessing.DATA_DIR = args.data_dir
+    cache_dir = args.cache_dir or os.path.join(args.output_dir, 'rr_cache')
+
+    print("=== RR-Interval Dataset ===")
+    records = preprocessing.get_available_records()
+    if not records:
+        return
+
+    start_time = time.perf_counter()
+    dataset = build_rr_dataset(records, cache_dir, args.data_dir, args.sequence_length, args.overlap, args.workers)
+    if dataset is None:
+        print("No sequences created")
+        return
+
+    labels = dataset['labels']
+    print(f"\nTotal sequences: {len(labels):,} "
+          f"(AF {int(np.sum(labels == 1)):,}, Normal {int(np.sum(labels == 0)):,}), "
+          f"shape {dataset['sequences'].shape}")
+    print(f"Built in {time.perf_counter() - start_time:.1f}s")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_file = os.path.join(args.output_dir, f"rr_sequences_L{args.sequence_length}.npz")
+    np.savez_compressed(output_file, **dataset)
+    print(f"Saved: {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Optimasi alokasi record ke train/val/test (patient-level)
+- kandidat alokasi = matriks (n_kandidat, n_record) berisi 0/1/2, dinilai
+  sekaligus dengan perkalian matriks atas jumlah window dan window AF per record
+- skor = deviasi ukuran split dari target + deviasi AF ratio tiap split dari
+  AF ratio keseluruhan; split tanpa window AF atau tanpa window Normal ditolak
+- semua kombinasi dicoba bila 3^n_record <= --candidates, selain itu sampling
+  acak per chunk (paralel di process pool), lalu local search (pindah satu
+  record / tukar dua record) dari kandidat terbaik
+- profil record dari annotation_scanner (hanya .hea/.atr), format sama dengan
+  record_profiles di 05_data_split.py
+
+Contoh:
+    python split_optimizer.py
+    python split_optimizer.py --candidates 5000000 --workers 8 --compare
+    python split_optimizer.py --af-weight 2 --output allocation.json
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from annotation_scanner import DATA_DIR, OVERLAP_RATIO, WINDOW_LENGTH_SEC, load_data_split, scan_dataset
+
+SPLITS = ('train', 'val', 'test')
+N_CANDIDATES = 1_000_000
+CHUNK_SIZE = 50_000
+
+
+def split_targets(test_size=0.2, val_size=0.2):
+    return np.array([1 - test_size - val_size, val_size, test_size])
+
+
+def score_assignments(assignments, windows, af_windows, targets, af_target, size_weight=1.0, af_weight=1.0):
+    """Scores of (n_candidates, n_records) split assignments; lower is better
+
+    Returns (score, size_deviation, af_deviation). size_deviation is the sum
+    over splits of |window share - target share|, af_deviation the sum of
+    |split AF ratio - af_target|. Infeasible candidates score inf.
+    """
+    assignments = np.atleast_2d(assignments)
+    sizes = np.stack([(assignments == s) @ windows for s in range(len(SPLITS))], axis=1)
+    af = np.stack([(assignments == s) @ af_windows for s in range(len(SPLITS))], axis=1)
+
+    with np.errstate(all='ignore'):
+        size_deviation = np.abs(sizes / windows.sum() - targets).sum(axis=1)
+        af_deviation = np.abs(af / sizes - af_target).sum(axis=1)
+    score = size_weight * size_deviation + af_weight * af_deviation
+    feasible = (af > 0).all(axis=1) & ((sizes - af) > 0).all(axis=1)
+    score[~feasible] = np.inf
+    return score, size_deviation, af_deviation
+
+
+def _enumerate(first, last, n_records):
+    """Assignments first..last-1 of all 3^n_records, as base-3 digits"""
+    codes = np.arange(first, last, dtype=np.int64)
+    return ((codes[:, None] // 3 ** np.arange(n_records, dtype=np.int64)) % 3).astype(np.int8)
+
+
+def _search_chunk(args):
+    """Best (score, assignment) of one chunk of enumerated or random candidates"""
+    windows, af_windows, targets, af_target, weights, chunk = args
+    if chunk[0] == 'range':
+        assignments = _enumerate(chunk[1], chunk[2], len(windows))
+    else:
+        rng = np.random.default_rng(chunk[1])
+        assignments = rng.choice(len(SPLITS), size=(chunk[2], len(windows)), p=targets).astype(np.int8)
+
+    score, _, _ = score_assignments(assignments, windows, af_windows, targets, af_target, *weights)
+    best = int(np.argmin(score))
+    return float(score[best]), assignments[best], len(assignments)
+
+
+def local_search(assignment, windows, af_windows, targets, af_target, size_weight=1.0, af_weight=1.0):
+    """Improve an assignment by single-record moves and two-record swaps until no neighbour is better"""
+    n = len(assignment)
+    best = assignment.astype(np.int8).copy()
+    best_score = score_assignments(best, windows, af_windows, targets, af_target, size_weight, af_weight)[0][0]
+    rows_i, rows_j = np.triu_indices(n, 1)
+    evaluated = 0
+
+    while True:
+        moves = np.repeat(best[None], n * len(SPLITS), axis=0)
+        moves[np.arange(len(moves)), np.repeat(np.arange(n), len(SPLITS))] = np.tile(np.arange(len(SPLITS)), n)
+        swaps = np.repeat(best[None], len(rows_i), axis=0)
+        swaps[np.arange(len(rows_i)), rows_i] = best[rows_j]
+        swaps[np.arange(len(rows_i)), rows_j] = best[rows_i]
+        neighbours = np.vstack([moves, swaps])
+
+        score = score_assignments(neighbours, windows, af_windows, targets, af_target, size_weight, af_weight)[0]
+        evaluated += len(neighbours)
+        k = int(np.argmin(score))
+        if not score[k] < best_score - 1e-12:
+            return best, best_score, evaluated
+        best, best_score = neighbours[k].copy(), score[k]
+
+
+def optimize_allocation(record_profiles, test_size=0.2, val_size=0.2, n_candidates=N_CANDIDATES,
+                        random_seed=42, workers=None, size_weight=1.0, af_weight=1.0, chunk_size=CHUNK_SIZE):
+    """Best record-to-split assignment; returns (allocated_splits, result)
+
+    allocated_splits has the format of stratified_patient_allocation
+    ({'train': [profiles], 'val': [...], 'test': [...]}). workers=1 searches
+    in this process, otherwise chunks go to a process pool.
+    """
+    start_time = time.perf_counter()
+    windows = np.array([r['total_windows'] for r in record_profiles], dtype=np.float64)
+    af_windows = np.array([r['af_windows'] for r in record_profiles], dtype=np.float64)
+    targets = split_targets(test_size, val_size)
+    af_target = af_windows.sum() / windows.sum()
+    weights = (size_weight, af_weight)
+
+    n_records = len(record_profiles)
+    exhaustive = n_records * np.log(3) <= np.log(max(n_candidates, 1))
+    if exhaustive:
+        total = 3 ** n_records
+        chunks = [('range', first, min(first + chunk_size, total)) for first in range(0, total, chunk_size)]
+    else:
+        seeds = np.random.SeedSequence(random_seed).spawn(-(-n_candidates // chunk_size))
+        chunks = [('random', seed, min(chunk_size, n_candidates - i * chunk_size)) for i, seed in enumerate(seeds)]
+    tasks = [(windows, af_windows, targets, af_target, weights, chunk) for chunk in chunks]
+
+    if workers == 1:
+        results = [_search_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_search_chunk, tasks))
+    evaluated = sum(r[2] for r in results)
+    best = min(results, key=lambda r: r[0])[1]
+
+    best, _, neighbours = local_search(best, windows, af_windows, targets, af_target, size_weight, af_weight)
+    score, size_deviation, af_deviation = score_assignments(best, windows, af_windows, targets, af_target, *weights)
+
+    allocated_splits = {name: [r for r, s in zip(record_profiles, best) if s == i] for i, name in enumerate(SPLITS)}
+    result = {
+        'score': float(score[0]),
+        'size_deviation': float(size_deviation[0]),
+        'af_deviation': float(af_deviation[0]),
+        'target_fractions': dict(zip(SPLITS, targets.tolist())),
+        'target_af_ratio': float(af_target),
+        'assignment': {r['record_id']: SPLITS[s] for r, s in zip(record_profiles, best)},
+        'exhaustive': bool(exhaustive),
+        'evaluated': int(evaluated + neighbours),
+        'seconds': time.perf_counter() - start_time
+    }
+    return allocated_splits, result
+
+
+def score_allocation(allocated_splits, test_size=0.2, val_size=0.2, size_weight=1.0, af_weight=1.0):
+    """Score of an existing allocation (e.g. from stratified_patient_allocation)"""
+    profiles = [r for name in SPLITS for r in allocated_splits[name]]
+    assignment = np.array([i for i, name in enumerate(SPLITS) for _ in allocated_splits[name]], dtype=np.int8)
+    windows = np.array([r['total_windows'] for r in profiles], dtype=np.float64)
+    af_windows = np.array([r['af_windows'] for r in profiles], dtype=np.float64)
+    score, size_deviation, af_deviation = score_assignments(
+        assignment, windows, af_windows, split_targets(test_size, val_size),
+        af_windows.sum() / windows.sum(), size_weight, af_weight
+    )
+    return float(score[0]), float(size_deviation[0]), float(af_deviation[0])
+
+
+def print_allocation(allocated_splits, result):
+    total = sum(r['total_windows'] for records in allocated_splits.values() for r in records)
+    print(f"\nAllocation Results (score {result['score']:.4f}: size deviation {result['size_deviation']:.4f}, "
+          f"AF deviation {result['af_deviation']:.4f}; target AF ratio {result['target_af_ratio']:.1%})")
+    for split_name, records in allocated_splits.items():
+        total_windows = sum(r['total_windows'] for r in records)
+        total_af = sum(r['af_windows'] for r in records)
+        af_ratio = total_af / total_windows if total_windows > 0 else 0
+        print(f"  {split_name.title()}: {len(records)} records, {total_windows:,} windows "
+              f"({total_windows / total:.1%} of windows, {af_ratio:.1%} AF)")
+        print(f"    Records: {[r['record_id'] for r in records]}")
+    print(f"{'Exhaustive' if result['exhaustive'] else 'Sampled'} search: "
+          f"{result['evaluated']:,} candidates in {result['seconds']:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the best patient-level train/val/test allocation")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--window-sec", type=float, default=WINDOW_LENGTH_SEC)
+    parser.add_argument("--overlap", type=float, default=OVERLAP_RATIO)
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--val-size", type=float, default=0.2)
+    parser.add_argument("--candidates", type=int, default=N_CANDIDATES)
+    parser.add_argument("--size-weight", type=float, default=1.0)
+    parser.add_argument("--af-weight", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--compare", action='store_true',
+                        help="also score the 05_data_split stratified_patient_allocation result")
+    parser.add_argument("--output", default=None, help="save the allocation as JSON")
+    args = parser.parse_args()
+
+    print("=== Patient-level Split Optimizer ===")
+    profiles = [p for p in scan_dataset(args.data_dir, args.window_sec, args.overlap) if p['total_windows'] > 0]
+    if len(profiles) < len(SPLITS):
+        print("Not enough usable records!")
+        return
+    print(f"{len(profiles)} usable records, {sum(p['total_windows'] for p in profiles):,} estimated windows")
+
+    allocated_splits, result = optimize_allocation(
+        profiles, args.test_size, args.val_size, args.candidates, args.seed, args.workers,
+        args.size_weight, args.af_weight
+    )
+    print_allocation(allocated_splits, result)
+
+    if args.compare:
+        data_split = load_data_split()
+        baseline = data_split.stratified_patient_allocation(data_split.categorize_records(profiles),
+                                                            args.test_size, args.val_size)
+        score, size_deviation, af_deviation = score_allocation(baseline, args.test_size, args.val_size,
+                                                               args.size_weight, args.af_weight)
+        print(f"\nstratified_patient_allocation score: {score:.4f} "
+              f"(size deviation {size_deviation:.4f}, AF deviation {af_deviation:.4f}) "
+              f"vs optimized {result['score']:.4f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"✓ Allocation saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Random-access pembaca segment WFDB + batch export segment berlabel
+- WFDBSegmentReader: header dibaca sekali, file .dat format 212/16 di-memmap,
+  sehingga rentang waktu dan lead apa pun bisa diambil tanpa decode seluruh
+  record (format lain: wfdb.rdrecord dengan sampfrom/sampto/channels)
+- plan_test_segments: memilih segment AF/Normal dari anotasi saja
+  (annotation_scanner), posisi sample asli record
+- export_segments: menulis banyak segment sebagai record WFDB secara paralel,
+  plus manifest JSON, untuk testing GUI (pengganti extract_and_save_test_segments
+  / save_segment_as_wfdb di notebook 02)
+
+Contoh:
+    python wfdb_segments.py --output-dir dataset_dummy
+    python wfdb_segments.py --records 04015 04043 --per-label 5 --duration 30 --channels 0 1
+    python wfdb_segments.py --filtered --workers 8
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import wfdb
+
+from annotation_scanner import DATA_DIR, get_annotated_records, rhythm_annotations, rhythm_segments
+
+MEMMAP_FORMATS = {'212', '16'}
+INVALID_212 = -2048
+FILTER_MARGIN_SEC = 5  # filter context read on each side of an exported segment
+SEGMENT_DURATION_SEC = 60
+SEGMENTS_PER_LABEL = 2
+LABEL_NAMES = {0: 'normal', 1: 'af'}
+
+
+class WFDBSegmentReader:
+    """Read arbitrary sample ranges and leads of one WFDB record"""
+
+    def __init__(self, record_path):
+        self.record_path = record_path
+        header = wfdb.rdheader(record_path)
+        self.fs = header.fs
+        self.sig_len = header.sig_len
+        self.n_sig = header.n_sig
+        self.sig_name = list(header.sig_name)
+        self.units = list(header.units)
+        self.fmt = header.fmt[0]
+        self.gain = np.array([g if g else 200.0 for g in header.adc_gain], dtype=np.float64)
+        self.baseline = np.array(header.baseline, dtype=np.float64)
+
+        # Memmap only the simple layout: every signal in one file, same format, one sample per frame
+        single_file = len(set(header.file_name)) == 1 and len(set(header.fmt)) == 1
+        plain_frames = all(s in (None, 1) for s in (header.samps_per_frame or [1]))
+        no_skew = all(not s for s in (header.skew or [None]))
+        self.memmap = None
+        if single_file and plain_frames and no_skew and self.fmt in MEMMAP_FORMATS:
+            dat_path = os.path.join(os.path.dirname(record_path), header.file_name[0])
+            offset = (header.byte_offset or [None])[0] or 0
+            if self.fmt == '16':
+                self.memmap = np.memmap(dat_path, dtype='<i2', mode='r', offset=offset,
+                                        shape=(self.sig_len, self.n_sig))
+            else:
+                # An odd sample count ends with a lone sample in 2 bytes
+                total = self.sig_len * self.n_sig
+                n_bytes = total // 2 * 3 + total % 2 * 2
+                self.memmap = np.memmap(dat_path, dtype=np.uint8, mode='r', offset=offset, shape=(n_bytes,))
+
+    def _digital_212(self, sampfrom, sampto):
+        """Decode frames [sampfrom, sampto) of a format-212 file: 2 samples per 3 bytes"""
+        first = sampfrom * self.n_sig
+        last = sampto * self.n_sig
+        pair_from, pair_to = first // 2, (last + 1) // 2
+        packed = np.asarray(self.memmap[pair_from * 3:pair_to * 3])
+        if len(packed) % 3:
+            packed = np.concatenate([packed, np.zeros(3 - len(packed) % 3, dtype=np.uint8)])
+        packed = packed.reshape(-1, 3).astype(np.int16)
+
+        samples = np.empty((len(packed), 2), dtype=np.int16)
+        samples[:, 0] = packed[:, 0] | ((packed[:, 1] & 0x0F) << 8)
+        samples[:, 1] = packed[:, 2] | ((packed[:, 1] & 0xF0) << 4)
+        samples[samples > 2047] -= 4096
+        flat = samples.ravel()[first - pair_from * 2:last - pair_from * 2]
+        return flat.reshape(-1, self.n_sig)
+
+    def read_digital(self, sampfrom=0, sampto=None, channels=None):
+        """ADC values, shape (samples, channels)"""
+        sampto = self.sig_len if sampto is None else min(sampto, self.sig_len)
+        sampfrom = max(0, sampfrom)
+        channels = list(range(self.n_sig)) if channels is None else list(channels)
+        if sampto <= sampfrom:
+            return np.zeros((0, len(channels)), dtype=np.int16)
+
+        if self.memmap is None:
+            record = wfdb.rdrecord(self.record_path, sampfrom=sampfrom, sampto=sampto,
+                                   channels=channels, physical=False)
+            return record.d_signal
+        if self.fmt == '16':
+            return np.asarray(self.memmap[sampfrom:sampto, channels])
+        return self._digital_212(sampfrom, sampto)[:, channels]
+
+    def read(self, sampfrom=0, sampto=None, channels=None, dtype=np.float32):
+        """Physical values (e.g. mV), shape (samples, channels); invalid samples are NaN"""
+        channels = list(range(self.n_sig)) if channels is None else list(channels)
+        digital = self.read_digital(sampfrom, sampto, channels)
+        physical = (digital - self.baseline[channels]) / self.gain[channels]
+        if self.fmt == '212':
+            physical[digital == INVALID_212] = np.nan
+        return physical.astype(dtype)
+
+    def read_seconds(self, start_sec, end_sec, channels=None, dtype=np.float32):
+        return self.read(int(round(start_sec * self.fs)), int(round(end_sec * self.fs)), channels, dtype)
+
+
+def plan_test_segments(data_dir, records, per_label=SEGMENTS_PER_LABEL, duration_sec=SEGMENT_DURATION_SEC,
+                       min_duration_sec=10, channels=(0,)):
+    """Export requests for the first per_label AF and Normal segments of each record
+
+    Segments come from the .atr only (same rules as 03_preprocessing) and keep
+    the record's own sample positions; each is cut to at most duration_sec.
+    """
+    requests = []
+    for record_id in records:
+        header, samples, rhythm_labels = rhythm_annotations(os.path.join(data_dir, record_id))
+        segments = rhythm_segments(samples, rhythm_labels, header['sig_len']) if rhythm_labels else None
+        if segments is None:
+            continue
+
+        starts, ends, labels, _ = segments
+        fs = header['fs']
+        for label in (1, 0):
+            picked = 0
+            for start, end in zip(starts[labels == label], ends[labels == label]):
+                if picked >= per_label:
+                    break
+                if (end - start) < min_duration_sec * fs:
+                    continue
+                picked += 1
+                requests.append({
+                    'record_id': record_id,
+                    'name': f"{LABEL_NAMES[label]}_{record_id}_{picked:03d}",
+                    'label': label,
+                    'sampfrom': int(start),
+                    'sampto': int(min(end, start + duration_sec * fs)),
+                    'channels': list(channels)
+                })
+    return requests
+
+
+def _export_task(args):
+    request, data_dir, output_dir, filtered = args
+    start_time = time.perf_counter()
+    reader = WFDBSegmentReader(os.path.join(data_dir, request['record_id']))
+    sampfrom, sampto = request['sampfrom'], request['sampto']
+
+    if filtered:
+        # Filter with context on both sides so the exported span has no filter edge effects
+        from rr_dataset import load_preprocessing
+
+        margin = int(FILTER_MARGIN_SEC * reader.fs)
+        context_from = max(0, sampfrom - margin)
+        signal = reader.read(context_from, sampto + margin, request['channels'], dtype=np.float64)
+        signal = np.nan_to_num(signal)
+        filtering = load_preprocessing().apply_comprehensive_filtering
+        signal = np.column_stack([filtering(signal[:, i], reader.fs) for i in range(signal.shape[1])])
+        signal = signal[sampfrom - context_from:sampfrom - context_from + (sampto - sampfrom)]
+    else:
+        signal = np.nan_to_num(reader.read(sampfrom, sampto, request['channels'], dtype=np.float64))
+
+    wfdb.wrsamp(
+        record_name=request['name'],
+        fs=reader.fs,
+        units=[reader.units[i] for i in request['channels']],
+        sig_name=[reader.sig_name[i] for i in request['channels']],
+        p_signal=signal,
+        write_dir=output_dir
+    )
+    return dict(request, samples=len(signal), duration_sec=len(signal) / reader.fs, fs=reader.fs,
+                filtered=filtered, seconds=time.perf_counter() - start_time)
+
+
+def export_segments(requests, output_dir, data_dir=DATA_DIR, filtered=False, workers=None):
+    """Write every requested segment as a WFDB record (in parallel) and a manifest.json"""
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = [(request, data_dir, output_dir, filtered) for request in requests]
+    exported = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(_export_task, tasks):
+            exported.append(result)
+            print(f"  ✅ {result['name']}: {result['record_id']} [{result['sampfrom']}:{result['sampto']}] "
+                  f"{result['duration_sec']:.1f}s, {result['seconds'] * 1000:.0f} ms")
+
+    manifest_file = os.path.join(output_dir, 'manifest.json')
+    with open(manifest_file, 'w') as f:
+        json.dump(exported, f, indent=2)
+    return exported, manifest_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export labelled AF/Normal test segments as WFDB records")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--output-dir", default="dataset_dummy")
+    parser.add_argument("--records", nargs='+', default=None, help="default: all annotated records")
+    parser.add_argument("--per-label", type=int, default=SEGMENTS_PER_LABEL, help="AF and Normal segments per record")
+    parser.add_argument("--duration", type=float, default=SEGMENT_DURATION_SEC, help="max seconds per segment")
+    parser.add_argument("--channels", type=int, nargs='+', default=[0])
+    parser.add_argument("--filtered", action='store_true', help="apply the 03_preprocessing filters before saving")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    print("=== WFDB Test Segment Export ===")
+    records = args.records or get_annotated_records(args.data_dir)
+    requests = plan_test_segments(args.data_dir, records, args.per_label, args.duration, channels=args.channels)
+    print(f"{len(requests)} segments from {len(records)} records -> {args.output_dir}")
+    if not requests:
+        return
+
+    start_time = time.perf_counter()
+    exported, manifest_file = export_segments(requests, args.output_dir, args.data_dir, args.filtered, args.workers)
+    print(f"\nExported {len(exported)} segments in {time.perf_counter() - start_time:.2f}s")
+    print(f"✓ Manifest: {manifest_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+tf.data input pipeline dengan memory-mapped split untuk training
+- train/val/test_data.npz dikonversi sekali ke .npy float32 (n, 2500) yang bisa di-memmap,
+  dibaca per chunk sehingga tidak ada salinan penuh X di RAM
+- Batch diambil langsung dari memmap lewat tf.data (shuffle seluruh index, parallel gather, prefetch)
+- Class weight diterapkan per batch sebagai sample_weight
+- Throughput (windows/sec) dan waktu epoch dicatat setiap epoch
+"""
+
+import argparse
+import os
+import sys
+import time
+import zipfile
+import numpy as np
+import tensorflow as tf
+
+from model import DATASET_PATH, BATCH_SIZE, get_class_weights
+
+CONVERT_CHUNK_ROWS = 4096
+
+
+def _convert_npz_member(npz_path, member, output_path, dtype):
+    """Stream satu array dari .npz ke .npy tanpa load seluruh array"""
+    with zipfile.ZipFile(npz_path) as archive:
+        with archive.open(f'{member}.npy') as f:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, src_dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, src_dtype = np.lib.format.read_array_header_2_0(f)
+            if fortran_order:
+                raise ValueError(f"{npz_path}:{member} is Fortran-ordered, cannot stream")
+
+            out = np.lib.format.open_memmap(output_path, mode='w+', dtype=dtype, shape=shape)
+            row_items = int(np.prod(shape[1:])) if len(shape) > 1 else 1
+            for start in range(0, shape[0], CONVERT_CHUNK_ROWS):
+                n_rows = min(CONVERT_CHUNK_ROWS, shape[0] - start)
+                raw = f.read(n_rows * row_items * src_dtype.itemsize)
+                chunk = np.frombuffer(raw, dtype=src_dtype).reshape((n_rows,) + tuple(shape[1:]))
+                out[start:start + n_rows] = chunk.astype(dtype)
+            out.flush()
+            del out
+
+
+def prepare_memmap_splits(dataset_path=DATASET_PATH, cache_dir=None):
+    """Konversi {split}_data.npz ke {split}_X.npy (float32) dan {split}_y.npy sekali saja"""
+    cache_dir = cache_dir or os.path.join(dataset_path, 'memmap')
+    os.makedirs(cache_dir, exist_ok=True)
+
+    for split_name in ['train', 'val', 'test']:
+        npz_path = os.path.join(dataset_path, f'{split_name}_data.npz')
+        x_path = os.path.join(cache_dir, f'{split_name}_X.npy')
+        y_path = os.path.join(cache_dir, f'{split_name}_y.npy')
+
+        if os.path.exists(x_path) and os.path.getmtime(x_path) >= os.path.getmtime(npz_path):
+            continue
+
+        print(f"  Converting {split_name}_data.npz -> memmap float32...")
+        _convert_npz_member(npz_path, 'y', y_path, np.int64)
+        _convert_npz_member(npz_path, 'X', x_path, np.float32)
+
+    return cache_dir
+
+
+def load_memmap_split(cache_dir, split_name):
+    X = np.load(os.path.join(cache_dir, f'{split_name}_X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(cache_dir, f'{split_name}_y.npy'))
+    return X, y
+
+
+def make_dataset(X, y, batch_size=BATCH_SIZE, shuffle=False, class_weight=None, seed=42):
+    """
+    Dataset (x, y[, sample_weight]) yang membaca batch langsung dari memmap X.
+    Index di-shuffle dan di-batch dulu, lalu setiap batch di-gather secara paralel.
+    """
+    n_timesteps = X.shape[1]
+    labels = np.asarray(y, dtype=np.float32)
+    weights = None
+    if class_weight is not None:
+        weights = np.array([class_weight[0], class_weight[1]], dtype=np.float32)
+
+    def gather(indices):
+        # Index yang terurut membuat pembacaan memmap lebih sekuensial
+        indices = np.sort(indices)
+        batch_x = np.asarray(X[indices], dtype=np.float32)[..., np.newaxis]
+        batch_y = labels[indices]
+        if weights is None:
+            return batch_x, batch_y
+        return batch_x, batch_y, weights[batch_y.astype(np.int64)]
+
+    def tf_gather(indices):
+        if weights is None:
+            batch_x, batch_y = tf.numpy_function(gather, [indices], [tf.float32, tf.float32])
+            batch_x.set_shape([None, n_timesteps, 1])
+            batch_y.set_shape([None])
+            return batch_x, batch_y
+
+        batch_x, batch_y, batch_w = tf.numpy_function(gather, [indices], [tf.float32, tf.float32, tf.float32])
+        batch_x.set_shape([None, n_timesteps, 1])
+        batch_y.set_shape([None])
+        batch_w.set_shape([None])
+        return batch_x, batch_y, batch_w
+
+    dataset = tf.data.Dataset.range(len(labels))
+    if shuffle:
+        # Full-length buffer: the splits are stacked record by record, so a smaller
+        # buffer would fill each batch from only one or two records (int64 indices are cheap)
+        dataset = dataset.shuffle(len(labels), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size)
+    dataset = dataset.map(tf_gather, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not shuffle)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def load_datasets(dataset_path=DATASET_PATH, batch_size=BATCH_SIZE, cache_dir=None):
+    """Siapkan train/val/test tf.data.Dataset + class weights dari memmap split"""
+    cache_dir = prepare_memmap_splits(dataset_path, cache_dir)
+
+    X_train, y_train = load_memmap_split(cache_dir, 'train')
+    X_val, y_val = load_memmap_split(cache_dir, 'val')
+    X_test, y_test = load_memmap_split(cache_dir, 'test')
+
+    class_weight_dict = get_class_weights(y_train)
+
+    return {
+        'train': make_dataset(X_train, y_train, batch_size, shuffle=True, class_weight=class_weight_dict),
+        'val': make_dataset(X_val, y_val, batch_size),
+        'test': make_dataset(X_test, y_test, batch_size),
+        'arrays': {'train': (X_train, y_train), 'val': (X_val, y_val), 'test': (X_test, y_test)},
+        'class_weight': class_weight_dict
+    }
+
+
+class ThroughputLogger(tf.keras.callbacks.Callback):
+    """Log waktu epoch dan throughput training (windows/sec)"""
+
+    def __init__(self, n_train_windows):
+        super().__init__()
+        self.n_train_windows = n_train_windows
+        self.epoch_times = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoch_start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        epoch_time = time.perf_counter() - self.epoch_start
+        self.epoch_times.append(epoch_time)
+        windows_per_sec = self.n_train_windows / epoch_time
+        if logs is not None:
+            logs['epoch_time'] = epoch_time
+            logs['windows_per_sec'] = windows_per_sec
+        print(f"  Epoch {epoch + 1}: {epoch_time:.1f}s, {windows_per_sec:.1f} windows/sec")
+
+
+def peak_rss_mb():
+    """Peak resident memory proses ini dalam MB"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux melaporkan KB, macOS byte
+        return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1024**2
+
+
+def main():
+    """Benchmark epoch time dan peak RAM: memmap tf.data vs in-memory NumPy"""
+    parser = argparse.ArgumentParser(description="Compare tf.data memmap pipeline with the in-memory path")
+    parser.add_argument("--mode", choices=['memmap', 'memory'], default='memmap')
+    parser.add_argument("--dataset", default=DATASET_PATH)
+    parser.add_argument("--epochs", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    from model import create_model, load_splits
+
+    print(f"=== Training data benchmark ({args.mode}) ===")
+
+    if args.mode == 'memmap':
+        datasets = load_datasets(args.dataset, args.batch_size)
+        n_train = len(datasets['arrays']['train'][1])
+        n_timesteps = datasets['arrays']['train'][0].shape[1]
+        throughput = ThroughputLogger(n_train)
+        model = create_model(n_timesteps=n_timesteps)
+        model.fit(datasets['train'], epochs=args.epochs, validation_data=datasets['val'],
+                  callbacks=[throughput], verbose=2)
+    else:
+        splits = load_splits(args.dataset)
+        X_train, y_train = splits['train']
+        throughput = ThroughputLogger(len(y_train))
+        model = create_model(n_timesteps=X_train.shape[1])
+        model.fit(X_train, y_train, batch_size=args.batch_size, epochs=args.epochs,
+                  validation_data=splits['val'], class_weight=get_class_weights(y_train),
+                  callbacks=[throughput], verbose=2)
+
+    print(f"\nMode:            {args.mode}")
+    print(f"Mean epoch time: {np.mean(throughput.epoch_times):.1f}s")
+    print(f"Peak RSS:        {peak_rss_mb():.0f} MB")
+    print("Run once with --mode memory and once with --mode memmap to compare.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+CNN-BiLSTM model untuk deteksi AF dari window ECG 10 detik
+Diambil dari fix-pengujian.ipynb supaya bisa dipakai ulang oleh script training,
+quantization dan evaluasi tanpa menjalankan notebook.
+"""
+
+import os
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.models import Model
+from tensorflow.keras.layers import (Input, Conv1D, MaxPooling1D, Dropout,
+                                     BatchNormalization, Dense, Bidirectional, LSTM)
+from tensorflow.keras import regularizers
+from tensorflow.keras.optimizers import Adam
+from sklearn.metrics import confusion_matrix, roc_auc_score
+from sklearn.utils.class_weight import compute_class_weight
+
+DATASET_PATH = r'D:\skripsi_teknis\dataset\mitbih-afdb\stratified_splits'
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+N_TIMESTEPS = 2500
+LEARNING_RATE = 0.0003
+DROPOUT_RATE = 0.4
+L2_REG = 0.0005
+BATCH_SIZE = 128
+EPOCHS = 100
+
+
+def as_model_input(X):
+    """Reshape window (n, timesteps) ke (n, timesteps, 1); model hanya menerima satu lead"""
+    if X.ndim != 2:
+        raise ValueError(f"Expected single-lead windows (n, timesteps), got shape {X.shape}; "
+                         "multi-lead training is not supported, re-run 03 with LEADS = [0]")
+    return X.reshape(-1, X.shape[1], 1).astype(np.float32)
+
+
+def load_splits(dataset_path=DATASET_PATH):
+    """Load train/val/test split dan reshape untuk CNN"""
+    splits = {}
+    for split_name in ['train', 'val', 'test']:
+        data = np.load(os.path.join(dataset_path, f'{split_name}_data.npz'))
+        X, y = data['X'], data['y']
+        splits[split_name] = (as_model_input(X), y)
+    return splits
+
+
+def get_class_weights(y):
+    """Balanced class weights seperti di notebook"""
+    class_weights = compute_class_weight('balanced', classes=np.unique(y), y=y)
+    return {0: class_weights[0], 1: class_weights[1]}
+
+
+def create_model(lr=LEARNING_RATE, dropout=DROPOUT_RATE, l2_reg=L2_REG, n_timesteps=N_TIMESTEPS,
+                 jit_compile=False):
+    inp = Input(shape=(n_timesteps, 1))
+
+    # CNN blocks
+    x = Conv1D(32, 7, activation='relu', padding='same',
+               kernel_regularizer=regularizers.l2(l2_reg))(inp)
+    x = BatchNormalization()(x)
+    x = MaxPooling1D(3)(x)
+    x = Dropout(dropout * 0.75)(x)
+
+    x = Conv1D(64, 5, activation='relu', padding='same',
+               kernel_regularizer=regularizers.l2(l2_reg))(x)
+    x = BatchNormalization()(x)
+    x = MaxPooling1D(3)(x)
+    x = Dropout(dropout)(x)
+
+    x = Conv1D(128, 3, activation='relu', padding='same',
+               kernel_regularizer=regularizers.l2(l2_reg))(x)
+    x = BatchNormalization()(x)
+    x = MaxPooling1D(3)(x)
+    x = Dropout(dropout)(x)
+
+    # BiLSTM layer
+    x = Bidirectional(LSTM(64, return_sequences=False,
+                           dropout=dropout * 0.75,
+                           kernel_regularizer=regularizers.l2(l2_reg)))(x)
+    x = Dropout(dropout)(x)
+
+    # Dense layers
+    x = Dense(64, activation='relu', kernel_regularizer=regularizers.l2(l2_reg))(x)
+    x = Dropout(dropout * 1.25)(x)
+
+    # Output tetap float32 walaupun global policy mixed_float16/mixed_bfloat16
+    out = Dense(1, activation='sigmoid', dtype='float32')(x)
+
+    model = Model(inputs=inp, outputs=out)
+
+    model.compile(
+        optimizer=Adam(learning_rate=lr),
+        loss='binary_crossentropy',
+        metrics=['accuracy',
+                 tf.keras.metrics.Precision(name='precision'),
+                 tf.keras.metrics.Recall(name='recall'),
+                 tf.keras.metrics.AUC(name='auc')],
+        jit_compile=jit_compile
+    )
+
+    return model
+
+
+def evaluate(model, X, y, set_name, verbose=True):
+    """Evaluate model"""
+    y_proba = model.predict(X, verbose=0)
+    y_pred = (y_proba > 0.5).astype(int).flatten()
+
+    cm = confusion_matrix(y, y_pred, labels=[0, 1])
+    tn, fp, fn, tp = cm.ravel()
+
+    acc = (tp + tn) / (tp + tn + fp + fn)
+    sens = tp / (tp + fn)
+    spec = tn / (tn + fp)
+    prec = tp / (tp + fp)
+    f1 = 2 * (prec * sens) / (prec + sens)
+    auc = roc_auc_score(y, y_proba)
+
+    if verbose:
+        print(f"\n{set_name} Results:")
+        print(f"  Accuracy:    {acc:.4f} ({acc*100:.2f}%)")
+        print(f"  Sensitivity: {sens:.4f} ({sens*100:.2f}%)")
+        print(f"  Specificity: {spec:.4f} ({spec*100:.2f}%)")
+        print(f"  Precision:   {prec:.4f} ({prec*100:.2f}%)")
+        print(f"  F1-Score:    {f1:.4f}")
+        print(f"  AUC:         {auc:.4f}")
+
+    return {
+        'y_pred': y_pred, 'y_proba': y_proba,
+        'acc': acc, 'sens': sens, 'spec': spec,
+        'prec': prec, 'f1': f1, 'auc': auc,
+        'cm': {'tn': tn, 'fp': fp, 'fn': fn, 'tp': tp}
+    }
@@ -0,0 +1,162 @@
+"""
+Post-training quantization untuk model CNN-BiLSTM (final_model.h5)
+- Dynamic-range quantization (weights int8, activations float)
+- Full-integer int8 quantization dengan representative dataset
+  yang diambil secara stratified dari train_data.npz
+Report: ukuran file, latency CPU, dan delta Sens/Spec/AUC pada test_data.npz
+"""
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+from model import DATASET_PATH, MODEL_DIR, as_model_input, evaluate
+from tflite_model import TFLiteModel
+
+MODEL_PATH = os.path.join(MODEL_DIR, 'final_model.h5')
+OUTPUT_DIR = os.path.join(MODEL_DIR, 'quantized')
+
+REPRESENTATIVE_SAMPLES = 500
+LATENCY_RUNS = 100
+
+
+def representative_windows(X_train, y_train, n_samples=REPRESENTATIVE_SAMPLES, random_seed=42):
+    """Ambil window representative secara stratified (proporsi AF/Normal dipertahankan)"""
+    rng = np.random.default_rng(random_seed)
+    indices = []
+    for label in np.unique(y_train):
+        label_indices = np.flatnonzero(y_train == label)
+        n_label = max(1, int(round(n_samples * len(label_indices) / len(y_train))))
+        indices.append(rng.choice(label_indices, size=min(n_label, len(label_indices)), replace=False))
+    indices = np.sort(np.concatenate(indices))
+    return X_train[indices]
+
+
+def convert_dynamic_range(model):
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    return converter.convert()
+
+
+def convert_full_int8(model, rep_windows):
+    def representative_dataset():
+        for window in rep_windows:
+            yield [window[np.newaxis].astype(np.float32)]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+
+    try:
+        return converter.convert()
+    except Exception as e:
+        # LSTM kernels belum tentu punya versi int8 penuh; fallback ke float kernel untuk op tersebut
+        print(f"  ⚠️ Pure int8 conversion failed ({e}), allowing float fallback ops")
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8,
+                                               tf.lite.OpsSet.TFLITE_BUILTINS]
+        return converter.convert()
+
+
+def measure_latency(model, X, n_runs=LATENCY_RUNS):
+    """Latency CPU per window (batch 1) dalam ms, setelah warm-up"""
+    window = X[:1]
+    model.predict(window, verbose=0)
+
+    timings = []
+    for i in range(n_runs):
+        start_time = time.perf_counter()
+        model.predict(X[i % len(X):i % len(X) + 1], verbose=0)
+        timings.append(time.perf_counter() - start_time)
+
+    timings = np.array(timings) * 1000
+    return float(np.median(timings)), float(np.percentile(timings, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Post-training quantization for the CNN-BiLSTM model")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--dataset", default=DATASET_PATH)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--rep-samples", type=int, default=REPRESENTATIVE_SAMPLES)
+    args = parser.parse_args()
+
+    print("=== Post-Training Quantization ===")
+    print(f"Model:   {args.model}")
+    print(f"Dataset: {args.dataset}")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    train_data = np.load(os.path.join(args.dataset, 'train_data.npz'))
+    X_train, y_train = train_data['X'], train_data['y']
+    rep_windows = representative_windows(X_train, y_train, n_samples=args.rep_samples)
+    rep_windows = as_model_input(rep_windows)
+    del X_train, train_data
+    print(f"Representative dataset: {len(rep_windows)} windows (stratified)")
+
+    test_data = np.load(os.path.join(args.dataset, 'test_data.npz'))
+    X_test, y_test = test_data['X'], test_data['y']
+    X_test = as_model_input(X_test)
+
+    model = keras.models.load_model(args.model)
+    base_name = os.path.splitext(os.path.basename(args.model))[0]
+
+    variants = {'float32': (args.model, model)}
+
+    print("\nConverting dynamic-range variant...")
+    dynamic_path = os.path.join(args.output_dir, f'{base_name}_dynamic.tflite')
+    with open(dynamic_path, 'wb') as f:
+        f.write(convert_dynamic_range(model))
+    variants['dynamic_range'] = (dynamic_path, TFLiteModel(dynamic_path))
+
+    print("Converting full-int8 variant...")
+    int8_path = os.path.join(args.output_dir, f'{base_name}_int8.tflite')
+    with open(int8_path, 'wb') as f:
+        f.write(convert_full_int8(model, rep_windows))
+    variants['full_int8'] = (int8_path, TFLiteModel(int8_path))
+
+    report = {}
+    for name, (path, variant_model) in variants.items():
+        print(f"\n--- {name} ---")
+        results = evaluate(variant_model, X_test, y_test, f"Test ({name})")
+        latency_p50, latency_p95 = measure_latency(variant_model, X_test)
+        report[name] = {
+            'path': path,
+            'size_mb': os.path.getsize(path) / 1024**2,
+            'latency_ms_p50': latency_p50,
+            'latency_ms_p95': latency_p95,
+            'acc': float(results['acc']),
+            'sens': float(results['sens']),
+            'spec': float(results['spec']),
+            'auc': float(results['auc'])
+        }
+
+    baseline = report['float32']
+    print("\n" + "="*90)
+    print("QUANTIZATION REPORT (Test set)")
+    print("="*90)
+    print(f"{'Variant':<15}{'Size (MB)':>10}{'p50 (ms)':>10}{'p95 (ms)':>10}"
+          f"{'Sens':>9}{'ΔSens':>9}{'Spec':>9}{'ΔSpec':>9}{'AUC':>9}{'ΔAUC':>9}")
+    for name, row in report.items():
+        for metric in ['sens', 'spec', 'auc']:
+            row[f'delta_{metric}'] = row[metric] - baseline[metric]
+        print(f"{name:<15}{row['size_mb']:>10.2f}{row['latency_ms_p50']:>10.2f}{row['latency_ms_p95']:>10.2f}"
+              f"{row['sens']:>9.4f}{row['delta_sens']:>+9.4f}{row['spec']:>9.4f}{row['delta_spec']:>+9.4f}"
+              f"{row['auc']:>9.4f}{row['delta_auc']:>+9.4f}")
+    print("="*90)
+
+    report_file = os.path.join(args.output_dir, 'quantization_report.json')
+    with open(report_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Report saved: {report_file}")
+    print("✓ Copy a .tflite file next to the GUI and point DEFAULT_MODEL_PATH at it to use it")
+
+
+if __name__ == "__main__":
+    main()
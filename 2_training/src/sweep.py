@@ -0,0 +1,264 @@
+"""
+Hyperparameter sweep untuk CNN-BiLSTM (LEARNING_RATE / DROPOUT_RATE / L2_REG / BATCH_SIZE)
+- Grid atau random search, setiap trial jalan di process terpisah
+- Setiap process di-pin ke jumlah thread intra/inter-op (dan core) sendiri
+  supaya beberapa trial bisa berbagi CPU tanpa saling berebut thread pool
+- Trial yang jelek dihentikan lebih awal: setelah beberapa epoch, val_loss
+  dibandingkan dengan median val_loss trial lain pada epoch yang sama
+- Output: leaderboard val AUC vs wall time (CSV + plot)
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+import pandas as pd
+
+# TensorFlow (lewat model.py) sengaja tidak di-import di level module: worker
+# harus sempat membatasi thread pool sebelum TensorFlow dimuat
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'sweep')
+
+GRID = {
+    'lr': [1e-4, 3e-4, 1e-3],
+    'dropout': [0.3, 0.4, 0.5],
+    'l2_reg': [1e-4, 5e-4, 1e-3],
+    'batch_size': [64, 128, 256]
+}
+
+RANDOM_SPACE = {
+    'lr': (1e-4, 3e-3),          # log-uniform
+    'dropout': (0.2, 0.6),       # uniform
+    'l2_reg': (1e-5, 1e-3),      # log-uniform
+    'batch_size': [64, 128, 256]
+}
+
+
+def grid_trials():
+    keys = list(GRID.keys())
+    return [dict(zip(keys, values)) for values in itertools.product(*GRID.values())]
+
+
+def random_trials(n_trials, random_seed=42):
+    rng = np.random.default_rng(random_seed)
+    trials = []
+    for _ in range(n_trials):
+        trials.append({
+            'lr': float(np.exp(rng.uniform(*np.log(RANDOM_SPACE['lr'])))),
+            'dropout': float(rng.uniform(*RANDOM_SPACE['dropout'])),
+            'l2_reg': float(np.exp(rng.uniform(*np.log(RANDOM_SPACE['l2_reg'])))),
+            'batch_size': int(rng.choice(RANDOM_SPACE['batch_size']))
+        })
+    return trials
+
+
+def _pin_process(cores, intra_threads, inter_threads):
+    """Batasi thread pool (harus dipanggil sebelum TensorFlow di-import)"""
+    for var in ['OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS']:
+        os.environ[var] = str(intra_threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = str(inter_threads)
+    os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
+
+    if cores:
+        try:
+            os.sched_setaffinity(0, cores)
+        except AttributeError:
+            import psutil
+            psutil.Process().cpu_affinity(list(cores))
+
+
+def run_trial(trial_id, params, settings, cores, shared_losses):
+    """Satu trial training di process terpisah"""
+    _pin_process(cores, settings['intra_threads'], settings['inter_threads'])
+
+    import tensorflow as tf
+    from tensorflow.keras.callbacks import EarlyStopping
+    from model import create_model
+    from data_pipeline import load_datasets
+
+    tf.config.threading.set_intra_op_parallelism_threads(settings['intra_threads'])
+    tf.config.threading.set_inter_op_parallelism_threads(settings['inter_threads'])
+    tf.random.set_seed(42)
+
+    class MedianPruner(tf.keras.callbacks.Callback):
+        """Stop trial jika val_loss lebih buruk dari median trial lain di epoch yang sama"""
+
+        def __init__(self):
+            super().__init__()
+            self.val_losses = []
+            self.pruned = False
+
+        def on_epoch_end(self, epoch, logs=None):
+            self.val_losses.append(float(logs['val_loss']))
+            shared_losses[trial_id] = list(self.val_losses)
+            if epoch + 1 < settings['grace_epochs']:
+                return
+
+            others = [losses[epoch] for key, losses in shared_losses.items()
+                      if key != trial_id and len(losses) > epoch]
+            if len(others) >= settings['min_trials_to_prune'] and self.val_losses[-1] > np.median(others):
+                print(f"  [trial {trial_id}] pruned at epoch {epoch + 1}: "
+                      f"val_loss {self.val_losses[-1]:.4f} > median {np.median(others):.4f}")
+                self.pruned = True
+                self.model.stop_training = True
+
+    start_time = time.perf_counter()
+    datasets = load_datasets(settings['dataset'], params['batch_size'])
+    model = create_model(lr=params['lr'], dropout=params['dropout'], l2_reg=params['l2_reg'],
+                         n_timesteps=datasets['arrays']['train'][0].shape[1])
+
+    pruner = MedianPruner()
+    history = model.fit(
+        datasets['train'],
+        epochs=settings['epochs'],
+        validation_data=datasets['val'],
+        callbacks=[EarlyStopping(monitor='val_loss', patience=settings['patience'],
+                                 restore_best_weights=True),
+                   pruner],
+        verbose=0
+    )
+    wall_time = time.perf_counter() - start_time
+
+    best_epoch = int(np.argmin(history.history['val_loss']))
+    return {
+        'trial_id': trial_id,
+        **params,
+        'val_auc': float(history.history['val_auc'][best_epoch]),
+        'val_loss': float(history.history['val_loss'][best_epoch]),
+        'best_epoch': best_epoch + 1,
+        'epochs_run': len(history.history['val_loss']),
+        'pruned': pruner.pruned,
+        'wall_time_sec': wall_time,
+        'cores': list(cores) if cores else []
+    }
+
+
+def plot_leaderboard(leaderboard, output_file):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    for pruned, color, label in [(False, '#2C7BE5', 'Completed'), (True, '#ef4444', 'Pruned')]:
+        subset = leaderboard[leaderboard['pruned'] == pruned]
+        ax.scatter(subset['wall_time_sec'], subset['val_auc'], c=color, s=50, alpha=0.8, label=label)
+    best = leaderboard.iloc[0]
+    ax.annotate(f"lr={best['lr']:.1e}, do={best['dropout']:.2f}\nl2={best['l2_reg']:.1e}, bs={int(best['batch_size'])}",
+                (best['wall_time_sec'], best['val_auc']), textcoords='offset points', xytext=(10, -25))
+    ax.set_xlabel('Wall time (s)')
+    ax.set_ylabel('Best val AUC')
+    ax.set_title('Hyperparameter Sweep: val AUC vs Wall Time', fontweight='bold')
+    ax.grid(alpha=0.3)
+    ax.legend()
+    plt.tight_layout()
+    plt.savefig(output_file, dpi=150)
+    plt.close(fig)
+
+
+def main():
+    from model import DATASET_PATH
+
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter sweep for create_model")
+    parser.add_argument("--dataset", default=DATASET_PATH)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--search", choices=['grid', 'random'], default='random')
+    parser.add_argument("--trials", type=int, default=20, help="number of random trials")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 4))
+    parser.add_argument("--intra-threads", type=int, default=None, help="default: cores / workers")
+    parser.add_argument("--inter-threads", type=int, default=1)
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--patience", type=int, default=5)
+    parser.add_argument("--grace-epochs", type=int, default=3, help="epochs before a trial can be pruned")
+    parser.add_argument("--min-trials-to-prune", type=int, default=3)
+    parser.add_argument("--no-affinity", action='store_true', help="do not pin workers to CPU cores")
+    args = parser.parse_args()
+
+    n_cores = os.cpu_count() or 1
+    intra_threads = args.intra_threads or max(1, n_cores // args.workers)
+    trials = grid_trials() if args.search == 'grid' else random_trials(args.trials)
+
+    # Setiap slot worker mendapat blok core sendiri
+    core_slots = []
+    for slot in range(args.workers):
+        cores = range(slot * intra_threads, min((slot + 1) * intra_threads, n_cores))
+        core_slots.append(None if args.no_affinity or len(cores) == 0 else tuple(cores))
+
+    settings = {
+        'dataset': args.dataset,
+        'epochs': args.epochs,
+        'patience': args.patience,
+        'grace_epochs': args.grace_epochs,
+        'min_trials_to_prune': args.min_trials_to_prune,
+        'intra_threads': intra_threads,
+        'inter_threads': args.inter_threads
+    }
+
+    print("=== Hyperparameter Sweep ===")
+    print(f"Search:  {args.search} ({len(trials)} trials)")
+    print(f"Workers: {args.workers} x {intra_threads} intra-op / {args.inter_threads} inter-op threads")
+    print(f"Epochs:  max {args.epochs}, prune after {args.grace_epochs} epochs")
+
+    # Siapkan memmap split sekali di sini supaya worker tidak berebut konversi
+    from data_pipeline import prepare_memmap_splits
+    prepare_memmap_splits(args.dataset)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    ctx = mp.get_context('spawn')
+    manager = ctx.Manager()
+    shared_losses = manager.dict()
+
+    results = []
+    sweep_start = time.perf_counter()
+    pending = list(enumerate(trials))
+    free_slots = list(range(args.workers))
+    running = {}
+
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=ctx, max_tasks_per_child=1) as pool:
+        while pending or running:
+            while pending and free_slots:
+                trial_id, params = pending.pop(0)
+                slot = free_slots.pop(0)
+                future = pool.submit(run_trial, trial_id, params, settings, core_slots[slot], shared_losses)
+                running[future] = (slot, trial_id, params)
+                print(f"  [trial {trial_id}] started on slot {slot}: {params}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                slot, trial_id, params = running.pop(future)
+                free_slots.append(slot)
+                try:
+                    result = future.result()
+                    results.append(result)
+                    status = "pruned" if result['pruned'] else "done"
+                    print(f"  [trial {trial_id}] {status}: val_auc {result['val_auc']:.4f}, "
+                          f"{result['epochs_run']} epochs, {result['wall_time_sec']:.0f}s")
+                except Exception as e:
+                    print(f"  [trial {trial_id}] failed: {e}")
+
+    sweep_time = time.perf_counter() - sweep_start
+
+    if not results:
+        print("No trial finished successfully")
+        return
+
+    leaderboard = pd.DataFrame(results).sort_values('val_auc', ascending=False).reset_index(drop=True)
+    leaderboard_file = os.path.join(args.output_dir, 'leaderboard.csv')
+    leaderboard.to_csv(leaderboard_file, index=False)
+    plot_leaderboard(leaderboard, os.path.join(args.output_dir, 'leaderboard.png'))
+    with open(os.path.join(args.output_dir, 'sweep_config.json'), 'w') as f:
+        json.dump({'args': vars(args), 'settings': settings, 'sweep_time_sec': sweep_time}, f, indent=2)
+
+    print("\n" + "="*70)
+    print("LEADERBOARD (top 10 by val AUC)")
+    print("="*70)
+    print(leaderboard[['trial_id', 'lr', 'dropout', 'l2_reg', 'batch_size', 'val_auc',
+                       'val_loss', 'epochs_run', 'pruned', 'wall_time_sec']].head(10).to_string(index=False))
+    print(f"\nTotal sweep time: {sweep_time:.0f}s")
+    print(f"✓ Leaderboard saved: {leaderboard_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Wrapper interpreter TFLite dengan predict() seperti model Keras
+Dipakai oleh quantize_model.py (evaluasi akurasi varian .tflite) dan oleh
+ModelHandler di GUI (3_gui/gui_3-fix/core/model_handler.py), sehingga model
+yang divalidasi dan model yang dijalankan GUI memakai wrapper yang sama.
+"""
+
+import numpy as np
+import tensorflow as tf
+
+
+class TFLiteModel:
+    """Quantized (.tflite) model with the same predict() call as a Keras model"""
+
+    def __init__(self, model_path, batch_size=32, num_threads=None):
+        self.interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+        self.batch_size = batch_size
+        self.current_batch = None
+        self._resize(batch_size)
+
+    def _resize(self, n):
+        if n == self.current_batch:
+            return
+        input_detail = self.interpreter.get_input_details()[0]
+        input_shape = list(input_detail['shape'])
+        input_shape[0] = n
+        self.interpreter.resize_tensor_input(input_detail['index'], input_shape)
+        self.interpreter.allocate_tensors()
+        self.input_detail = self.interpreter.get_input_details()[0]
+        self.output_detail = self.interpreter.get_output_details()[0]
+        self.current_batch = n
+
+    def _quantize_input(self, X):
+        dtype = self.input_detail['dtype']
+        if dtype == np.float32:
+            return X.astype(np.float32)
+        # Full-int8 model: quantize input with the model's scale/zero point
+        scale, zero_point = self.input_detail['quantization']
+        info = np.iinfo(dtype)
+        return np.clip(np.round(X / scale + zero_point), info.min, info.max).astype(dtype)
+
+    def _dequantize_output(self, y):
+        if self.output_detail['dtype'] == np.float32:
+            return y
+        scale, zero_point = self.output_detail['quantization']
+        return (y.astype(np.float32) - zero_point) * scale
+
+    def predict(self, X, verbose=0):
+        outputs = []
+        for start in range(0, len(X), self.batch_size):
+            batch = X[start:start + self.batch_size]
+            self._resize(len(batch))
+
+            self.interpreter.set_tensor(self.input_detail['index'], self._quantize_input(batch))
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self.output_detail['index'])
+            outputs.append(self._dequantize_output(output))
+
+        return np.concatenate(outputs).reshape(-1, 1)
@@ -0,0 +1,165 @@
+"""
+Training script untuk CNN-BiLSTM (versi script dari fix-pengujian.ipynb)
+Opsi tambahan untuk eksperimen kecepatan di CPU:
+- --jit              : compile train/predict step dengan XLA (jit_compile=True)
+- --precision        : float32 | mixed_float16 | mixed_bfloat16 (output sigmoid tetap float32)
+- --pipeline         : memory (seperti notebook) | memmap (tf.data dari data_pipeline.py)
+Report: waktu per epoch dan metrics akhir dari evaluate() yang sama dengan notebook.
+Model disimpan ke file baru per run (run_<timestamp>.h5); model
+yang dipakai GUI (final_model.h5) hanya ditimpa dengan --save-final.
+"""
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+
+from model import (DATASET_PATH, MODEL_DIR, LEARNING_RATE, DROPOUT_RATE, L2_REG,
+                   BATCH_SIZE, EPOCHS, create_model, evaluate, load_splits, get_class_weights)
+from data_pipeline import ThroughputLogger, load_datasets, make_dataset
+
+PRECISION_POLICIES = ['float32', 'mixed_float16', 'mixed_bfloat16']
+FINAL_MODEL_PATH = os.path.join(MODEL_DIR, 'final_model.h5')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the CNN-BiLSTM AF model")
+    parser.add_argument("--dataset", default=DATASET_PATH)
+    parser.add_argument("--output", default=None,
+                        help="default: run_<timestamp>.h5 in the model directory")
+    parser.add_argument("--save-final", action='store_true',
+                        help=f"also overwrite the shipped model ({FINAL_MODEL_PATH})")
+    parser.add_argument("--pipeline", choices=['memory', 'memmap'], default='memory')
+    parser.add_argument("--precision", choices=PRECISION_POLICIES, default='float32')
+    parser.add_argument("--jit", action='store_true', help="enable XLA jit_compile")
+    parser.add_argument("--lr", type=float, default=LEARNING_RATE)
+    parser.add_argument("--dropout", type=float, default=DROPOUT_RATE)
+    parser.add_argument("--l2", type=float, default=L2_REG)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if args.output is None:
+        args.output = os.path.join(MODEL_DIR, f"run_{time.strftime('%Y%m%d_%H%M%S')}.h5")
+    return args
+
+
+def main():
+    args = parse_args()
+
+    np.random.seed(args.seed)
+    tf.random.set_seed(args.seed)
+    tf.keras.mixed_precision.set_global_policy(args.precision)
+
+    print("="*70)
+    print("TRAINING CONFIGURATION")
+    print("="*70)
+    print(f"Output:        {args.output}{' (+ final_model.h5)' if args.save_final else ''}")
+    print(f"Pipeline:      {args.pipeline}")
+    print(f"Precision:     {args.precision}")
+    print(f"XLA JIT:       {args.jit}")
+    print(f"Learning Rate: {args.lr}")
+    print(f"Dropout Rate:  {args.dropout}")
+    print(f"L2 Reg:        {args.l2}")
+    print(f"Batch Size:    {args.batch_size}")
+    print(f"Max Epochs:    {args.epochs}")
+    print("="*70)
+
+    if args.pipeline == 'memmap':
+        datasets = load_datasets(args.dataset, args.batch_size)
+        (X_train, y_train), (X_val, y_val), (X_test, y_test) = (
+            datasets['arrays']['train'], datasets['arrays']['val'], datasets['arrays']['test']
+        )
+        train_input = datasets['train']
+        fit_kwargs = {'validation_data': datasets['val']}
+        eval_inputs = {
+            'Training': (make_dataset(X_train, y_train, args.batch_size), y_train),
+            'Validation': (datasets['val'], y_val),
+            'Test': (datasets['test'], y_test)
+        }
+    else:
+        splits = load_splits(args.dataset)
+        (X_train, y_train), (X_val, y_val), (X_test, y_test) = splits['train'], splits['val'], splits['test']
+        train_input = X_train
+        fit_kwargs = {
+            'y': y_train,
+            'batch_size': args.batch_size,
+            'validation_data': (X_val, y_val),
+            'class_weight': get_class_weights(y_train)
+        }
+        eval_inputs = {
+            'Training': (X_train, y_train),
+            'Validation': (X_val, y_val),
+            'Test': (X_test, y_test)
+        }
+
+    print(f"\nTrain: {X_train.shape}, AF: {np.mean(y_train == 1):.1%}")
+    print(f"Val:   {X_val.shape}, AF: {np.mean(y_val == 1):.1%}")
+    print(f"Test:  {X_test.shape}, AF: {np.mean(y_test == 1):.1%}")
+
+    model = create_model(lr=args.lr, dropout=args.dropout, l2_reg=args.l2,
+                         n_timesteps=X_train.shape[1], jit_compile=args.jit)
+
+    throughput = ThroughputLogger(len(y_train))
+    callbacks = [
+        EarlyStopping(monitor='val_loss', patience=20, restore_best_weights=True, verbose=1),
+        ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=10, min_lr=1e-7, verbose=1),
+        throughput
+    ]
+
+    print("\nStarting training...")
+    start_time = time.perf_counter()
+    history = model.fit(train_input, epochs=args.epochs, callbacks=callbacks, verbose=2, **fit_kwargs)
+    train_time = time.perf_counter() - start_time
+
+    model.save(args.output)
+    print(f"\n✓ Model saved: {args.output}")
+    if args.save_final and os.path.abspath(args.output) != os.path.abspath(FINAL_MODEL_PATH):
+        model.save(FINAL_MODEL_PATH)
+        print(f"✓ Shipped model overwritten: {FINAL_MODEL_PATH}")
+
+    print("\n" + "="*70)
+    print("EVALUATION")
+    print("="*70)
+    results = {name: evaluate(model, X, y, name) for name, (X, y) in eval_inputs.items()}
+
+    epoch_times = np.array(throughput.epoch_times)
+    # Epoch pertama termasuk tracing/kompilasi XLA, jadi dilaporkan terpisah
+    steady_epoch_time = float(np.mean(epoch_times[1:])) if len(epoch_times) > 1 else float(epoch_times[0])
+
+    print("\n" + "="*70)
+    print("SUMMARY")
+    print("="*70)
+    print(f"Precision / JIT:     {args.precision} / {args.jit}")
+    print(f"Epochs trained:      {len(history.history['loss'])}")
+    print(f"First epoch time:    {epoch_times[0]:.1f}s")
+    print(f"Mean epoch time:     {steady_epoch_time:.1f}s (excluding first epoch)")
+    print(f"Total training time: {train_time:.1f}s")
+    test_results = results['Test']
+    print(f"Test Sensitivity:    {test_results['sens']:.4f}")
+    print(f"Test Specificity:    {test_results['spec']:.4f}")
+    print(f"Test AUC:            {test_results['auc']:.4f}")
+    print("="*70)
+
+    summary = {
+        'config': vars(args),
+        'epochs_trained': len(history.history['loss']),
+        'first_epoch_time': float(epoch_times[0]),
+        'mean_epoch_time': steady_epoch_time,
+        'total_train_time': train_time,
+        'metrics': {
+            name: {m: float(r[m]) for m in ['acc', 'sens', 'spec', 'prec', 'f1', 'auc']}
+            for name, r in results.items()
+        }
+    }
+    summary_file = os.path.splitext(args.output)[0] + f'_{args.precision}{"_xla" if args.jit else ""}.json'
+    with open(summary_file, 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f"✓ Summary saved: {summary_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Benchmark cascade inference (RR pre-screen + CNN-BiLSTM) pada test split
+- full model: semua window ke ModelHandler.predict
+- cascade: window yang jelas Normal/AF diputuskan dari iregularitas RR
+  (core/rr_screen.py), hanya window ambigu ke model
+Dilaporkan fraksi window yang melewati model, speedup end-to-end, agreement
+dengan prediksi full model dan akurasi terhadap label y. Grid threshold
+ditampilkan untuk membantu menyetel CASCADE_* di ShimmerConfig.
+
+Contoh:
+    python cascade_benchmark.py
+    python cascade_benchmark.py --data test_data.npz --normal-max 0.05 --af-min 0.2
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from core.shimmer_config import ShimmerConfig
+from core.rr_screen import screen_windows, AMBIGUOUS, HEART_RATE_RANGE
+
+DEFAULT_TEST_DATA = r'D:\skripsi_teknis\dataset\mitbih-afdb\stratified_splits\test_data.npz'
+
+
+def predict_batched(model_handler, windows, batch_size):
+    predictions = [model_handler.predict(windows[i:i + batch_size]) for i in range(0, len(windows), batch_size)]
+    return np.concatenate(predictions).astype(np.int64) if predictions else np.zeros(0, dtype=np.int64)
+
+
+def run_cascade(model_handler, windows, fs, thresholds, batch_size):
+    decisions = np.empty(len(windows), dtype=np.int64)
+    batch_metrics = []
+    screen_time = 0.0
+    for i in range(0, len(windows), batch_size):
+        t0 = time.perf_counter()
+        decisions[i:i + batch_size], metrics = screen_windows(windows[i:i + batch_size], fs, **thresholds)
+        screen_time += time.perf_counter() - t0
+        batch_metrics.append(metrics)
+
+    ambiguous = decisions == AMBIGUOUS
+    predictions = decisions.copy()
+    if ambiguous.any():
+        predictions[ambiguous] = predict_batched(model_handler, windows[ambiguous], batch_size)
+    metrics = {key: np.concatenate([m[key] for m in batch_metrics]) for key in batch_metrics[0]}
+    return predictions, ambiguous, screen_time, metrics
+
+
+def accuracy(predictions, labels):
+    return float(np.mean(predictions == labels)) if len(labels) else float('nan')
+
+
+def threshold_grid(metrics, full_predictions, labels, args):
+    """Skip fraction / agreement for other thresholds, from the screen metrics of one pass"""
+    print("\n" + "="*72)
+    print(f"{'Normal max':>10} {'AF min':>8} {'Skipped':>9} {'Agree (all)':>12} {'Agree (skipped)':>16} {'Acc':>7}")
+    print("="*72)
+    rows = []
+    with np.errstate(invalid='ignore'):
+        plausible = ((metrics['beats'] >= args.min_beats)
+                     & (metrics['heart_rate'] >= HEART_RATE_RANGE[0])
+                     & (metrics['heart_rate'] <= HEART_RATE_RANGE[1]))
+        for normal_max in (0.03, 0.04, 0.06, 0.08, 0.10):
+            for af_min in (0.10, 0.15, 0.20, 0.30):
+                decisions = np.full(len(labels), AMBIGUOUS)
+                decisions[plausible & (metrics['nrmssd'] <= normal_max)] = 0
+                decisions[plausible & (metrics['nrmssd'] >= af_min) & (metrics['pnn50'] >= args.af_min_pnn50)] = 1
+                skipped = decisions != AMBIGUOUS
+                combined = np.where(skipped, decisions, full_predictions)
+                row = {
+                    'normal_max_nrmssd': normal_max,
+                    'af_min_nrmssd': af_min,
+                    'skipped_fraction': float(np.mean(skipped)),
+                    'agreement': accuracy(combined, full_predictions),
+                    'agreement_skipped': accuracy(decisions[skipped], full_predictions[skipped]),
+                    'accuracy': accuracy(combined, labels)
+                }
+                rows.append(row)
+                print(f"{normal_max:>10.2f} {af_min:>8.2f} {row['skipped_fraction'] * 100:>8.1f}% "
+                      f"{row['agreement'] * 100:>11.2f}% {row['agreement_skipped'] * 100:>15.2f}% "
+                      f"{row['accuracy'] * 100:>6.2f}%")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cascade (RR pre-screen + model) vs full-model inference")
+    parser.add_argument("--data", default=DEFAULT_TEST_DATA, help="test_data.npz from 05_data_split.py")
+    parser.add_argument("--model", default=ShimmerConfig.DEFAULT_MODEL_PATH)
+    parser.add_argument("--fs", type=int, default=ShimmerConfig.MODEL_SAMPLING_RATE)
+    parser.add_argument("--batch", type=int, default=ShimmerConfig.OFFLINE_PREDICT_BATCH)
+    parser.add_argument("--limit", type=int, default=0, help="only the first N windows")
+    parser.add_argument("--normal-max", type=float, default=ShimmerConfig.CASCADE_NORMAL_MAX_NRMSSD)
+    parser.add_argument("--af-min", type=float, default=ShimmerConfig.CASCADE_AF_MIN_NRMSSD)
+    parser.add_argument("--af-min-pnn50", type=float, default=ShimmerConfig.CASCADE_AF_MIN_PNN50)
+    parser.add_argument("--min-beats", type=int, default=ShimmerConfig.CASCADE_MIN_BEATS)
+    parser.add_argument("--output", default="cascade_benchmark_results.json")
+    args = parser.parse_args()
+
+    from core.model_handler import ModelHandler
+
+    data = np.load(args.data)
+    windows, labels = data['X'], data['y'].astype(np.int64)
+    if args.limit:
+        windows, labels = windows[:args.limit], labels[:args.limit]
+    print("=== Cascade Inference Benchmark ===")
+    print(f"{len(windows):,} windows from {args.data} (AF {int(np.sum(labels == 1)):,})")
+
+    model_handler = ModelHandler()
+    success, message = model_handler.load_model(args.model)
+    if not success:
+        print(f"❌ {message}")
+        return
+    model_handler.predict(windows[:min(len(windows), args.batch)])  # warm-up
+
+    thresholds = {
+        'normal_max_nrmssd': args.normal_max,
+        'af_min_nrmssd': args.af_min,
+        'af_min_pnn50': args.af_min_pnn50,
+        'min_beats': args.min_beats
+    }
+
+    t0 = time.perf_counter()
+    full_predictions = predict_batched(model_handler, windows, args.batch)
+    full_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    cascade_predictions, ambiguous, screen_time, metrics = run_cascade(
+        model_handler, windows, args.fs, thresholds, args.batch
+    )
+    cascade_time = time.perf_counter() - t0
+
+    skipped = ~ambiguous
+    result = {
+        'windows': len(windows),
+        'thresholds': thresholds,
+        'skipped_fraction': float(np.mean(skipped)),
+        'screened_normal': int(np.sum(skipped & (cascade_predictions == 0))),
+        'screened_af': int(np.sum(skipped & (cascade_predictions == 1))),
+        'full_model_sec': full_time,
+        'cascade_sec': cascade_time,
+        'screen_sec': screen_time,
+        'speedup': full_time / cascade_time if cascade_time > 0 else float('nan'),
+        'agreement': accuracy(cascade_predictions, full_predictions),
+        'agreement_skipped': accuracy(cascade_predictions[skipped], full_predictions[skipped]),
+        'full_model_accuracy': accuracy(full_predictions, labels),
+        'cascade_accuracy': accuracy(cascade_predictions, labels),
+        'screen_accuracy': accuracy(cascade_predictions[skipped], labels[skipped])
+    }
+
+    print(f"\nSkipped the model: {result['skipped_fraction'] * 100:.1f}% "
+          f"({result['screened_normal']:,} Normal, {result['screened_af']:,} AF)")
+    print(f"Full model: {full_time:.2f}s ({len(windows) / full_time:,.0f} windows/s)")
+    print(f"Cascade:    {cascade_time:.2f}s (screen {screen_time:.2f}s) -> speedup {result['speedup']:.2f}x")
+    print(f"Agreement with full model: {result['agreement'] * 100:.2f}% "
+          f"(screened windows {result['agreement_skipped'] * 100:.2f}%)")
+    print(f"Accuracy vs y: full model {result['full_model_accuracy'] * 100:.2f}%, "
+          f"cascade {result['cascade_accuracy'] * 100:.2f}%, "
+          f"screened windows {result['screen_accuracy'] * 100:.2f}%")
+
+    grid = threshold_grid(metrics, full_predictions, labels, args)
+
+    with open(args.output, 'w') as f:
+        json.dump({'config': vars(args), 'result': result, 'threshold_grid': grid}, f, indent=2)
+    print(f"\n✓ Results saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import itertools
+import multiprocessing as mp
+import threading
+from multiprocessing import shared_memory
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+from core.shimmer_config import ShimmerConfig
+
+
+def _to_shared(arrays):
+    """Copy float64 arrays into one shared memory block; returns (shm, [(offset, size)])"""
+    arrays = [np.ascontiguousarray(a, dtype=np.float64).ravel() for a in arrays]
+    total = sum(a.size for a in arrays)
+    shm = shared_memory.SharedMemory(create=True, size=max(8, total * 8))
+    buffer = np.ndarray((total,), dtype=np.float64, buffer=shm.buf)
+    layout = []
+    offset = 0
+    for a in arrays:
+        buffer[offset:offset + a.size] = a
+        layout.append((offset, a.size))
+        offset += a.size
+    del buffer
+    return shm, layout
+
+
+def _from_shared(name, layout):
+    """Read the arrays of a job back out of its shared memory block"""
+    # Spawned children share the GUI's resource tracker, so attaching doesn't double-register
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        buffer = np.ndarray((sum(size for _, size in layout),), dtype=np.float64, buffer=shm.buf)
+        arrays = [buffer[offset:offset + size].copy() for offset, size in layout]
+        del buffer
+    finally:
+        shm.close()
+    return arrays
+
+
+def _build_processor(job, model_handler):
+    from core.preprocessor import ECGPreprocessor
+    from core.batch_processor import BatchProcessor
+    from core.offline_loader import OfflineCaptureProcessor, RecordingProcessor
+
+    preprocessor = ECGPreprocessor(fs=job['target_fs'])
+    if job.get('file_path'):
+        return OfflineCaptureProcessor(job['file_path'], preprocessor, model_handler,
+                                       original_fs=job['original_fs'], target_fs=job['target_fs'],
+                                       window_size=job['window_size'])
+    if job.get('spill_path'):
+        return RecordingProcessor(job['spill_path'], preprocessor, model_handler,
+                                  original_fs=job['original_fs'], target_fs=job['target_fs'],
+                                  window_size=job['window_size'])
+
+    arrays = _from_shared(job['shm_name'], job['layout'])
+    return BatchProcessor(arrays[0], preprocessor, model_handler,
+                          original_fs=job['original_fs'], target_fs=job['target_fs'],
+                          window_size=job['window_size'], mv_per_count=job.get('mv_per_count'))
+
+
+def _worker_main(conn, active_job, model_path):
+    """Worker process loop: load the model once, then analyze jobs until told to exit"""
+    from core.model_handler import ModelHandler
+    from core.resource_governor import apply_role
+
+    apply_role('inference')
+
+    model_handler = ModelHandler()
+    success, message = model_handler.load_model(model_path)
+    conn.send((0, 'ready', success, message))
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+
+        job_id = job['job_id']
+        try:
+            processor = _build_processor(job, model_handler)
+
+            def report(percent, message):
+                conn.send((job_id, 'progress', percent, message))
+                # The GUI cancels by moving active_job away from this job
+                if active_job.value != job_id:
+                    processor.should_stop = True
+
+            results = processor.analyze(report)
+            if results is None:
+                conn.send((job_id, 'stopped'))
+            else:
+                conn.send((job_id, 'result', results))
+        except Exception as e:
+            conn.send((job_id, 'error', str(e)))
+
+
+class AnalysisWorker:
+    """Long-lived analysis process that keeps the model loaded between runs
+
+    Started lazily on the first job and shared by every ProcessBatchProcessor.
+    Jobs are run one at a time; `lock` is held by the thread that owns the
+    current job so messages on the pipe are never read by two threads.
+    """
+
+    _instance = None
+
+    def __init__(self, model_path):
+        ctx = mp.get_context('spawn')  # no fork: TensorFlow and Qt are already initialised
+        self.model_path = model_path
+        self.conn, child_conn = ctx.Pipe()
+        self.active_job = ctx.Value('q', 0, lock=False)
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, self.active_job, model_path),
+                                   name="AnalysisWorker", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.lock = threading.Lock()
+        self.job_ids = itertools.count(1)
+        print(f"Analysis worker started (pid {self.process.pid})")
+
+    @classmethod
+    def get(cls, model_path):
+        if cls._instance is not None and (not cls._instance.is_alive() or cls._instance.model_path != model_path):
+            cls._instance.shutdown()
+            cls._instance = None
+        if cls._instance is None:
+            cls._instance = cls(model_path)
+        return cls._instance
+
+    @classmethod
+    def shutdown_instance(cls):
+        if cls._instance is not None:
+            cls._instance.shutdown()
+            cls._instance = None
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def shutdown(self):
+        self.active_job.value = 0
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+
+class ProcessBatchProcessor(QThread):
+    """BatchProcessor interface backed by the AnalysisWorker process
+
+    Resampling, filtering and prediction all happen in the worker, so they
+    neither hold the GUI's GIL nor compete with Qt for TensorFlow threads.
+    Recordings and captures are read by the worker from their files,
+    in-memory samples go over shared memory; only progress
+    messages and the results dict travel through the pipe. This thread just
+    waits on the pipe and re-emits the usual signals.
+    """
+
+    progress_update = pyqtSignal(int, str)
+    processing_complete = pyqtSignal(dict)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, recorded_data=None, original_fs=128, target_fs=250, window_size=2500,
+                 spill_path=None, file_path=None, model_path=None, mv_per_count=None):
+        super().__init__()
+        self.recorded_data = recorded_data
+        self.original_fs = original_fs
+        self.target_fs = target_fs
+        self.window_size = window_size
+        self.spill_path = spill_path
+        self.mv_per_count = mv_per_count
+        self.file_path = file_path
+        self.model_path = model_path or ShimmerConfig.DEFAULT_MODEL_PATH
+        self.should_stop = False
+
+    def _make_job(self):
+        job = {
+            'original_fs': self.original_fs,
+            'target_fs': self.target_fs,
+            'window_size': self.window_size,
+            'file_path': self.file_path,
+            'spill_path': self.spill_path,
+            'mv_per_count': self.mv_per_count
+        }
+        if self.file_path or self.spill_path:
+            return job, None
+
+        shm, layout = _to_shared([self.recorded_data])
+        job['shm_name'] = shm.name
+        job['layout'] = layout
+        return job, shm
+
+    def run(self):
+        shm = None
+        try:
+            self.progress_update.emit(2, "Starting analysis worker...")
+            worker = AnalysisWorker.get(self.model_path)
+            with worker.lock:
+                job, shm = self._make_job()
+                job['job_id'] = job_id = next(worker.job_ids)
+                worker.active_job.value = job_id
+                worker.conn.send(job)
+
+                while True:
+                    if self.should_stop:
+                        worker.active_job.value = 0
+                    if not worker.conn.poll(0.1):
+                        if not worker.is_alive():
+                            raise Exception("Analysis worker exited unexpectedly")
+                        continue
+
+                    message = worker.conn.recv()
+                    kind = message[1]
+                    if kind == 'ready':
+                        if not message[2]:
+                            print(f"Analysis worker: {message[3]}")
+                        continue
+                    if message[0] != job_id:
+                        continue  # leftover from a cancelled job
+
+                    if kind == 'progress':
+                        if not self.should_stop:
+                            self.progress_update.emit(message[2], message[3])
+                    elif kind == 'result':
+                        if not self.should_stop:
+                            self.processing_complete.emit(message[2])
+                        break
+                    elif kind == 'error':
+                        self.error_occurred.emit(message[2])
+                        break
+                    else:  # stopped
+                        break
+
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+    def stop(self):
+        # Cooperative, like BatchProcessor.stop(): the worker stops at its next progress report
+        self.should_stop = True
@@ -1,32 +1,83 @@
 import numpy as np
+import os
 import time
 from scipy.signal import resample
 from collections import deque
 from PyQt5.QtCore import QThread, pyqtSignal
+from core.recording_store import RecordingSpillFile, PacketTimeFile
+from core.rr_screen import screen_windows, AMBIGUOUS
+from core.signal_quality import assess_windows, summarize_flags
 
 
 class RecordingBuffer:
-    def __init__(self, max_duration_seconds=600, sampling_rate=128):
+    def __init__(self, max_duration_seconds=600, sampling_rate=128, spill_dir=None):
+        from core.shimmer_config import ShimmerConfig
+
         self.sampling_rate = sampling_rate
-        max_samples = max_duration_seconds * sampling_rate
-        self.buffer = deque(maxlen=max_samples)
+        self.spill_dir = spill_dir or ShimmerConfig.RECORDING_SPILL_DIR
+        # max_duration_seconds only sizes the first extent; the spill file keeps growing
+        self.extent_samples = max(max_duration_seconds, ShimmerConfig.RECORDING_SPILL_EXTENT_SEC) * sampling_rate
+        self.block_samples = int(ShimmerConfig.RECORDING_SPILL_BLOCK_SEC * sampling_rate)
+        self.spill = None
         self.visualization_buffer = deque(maxlen=int(10 * sampling_rate))
-        
-    def add_sample(self, value):
-        self.buffer.append(value)
+        # Arrival time of each packet, only stored when the timestamp changes, in a file next to the spill file
+        self.packets = None
+        self.last_packet_time = None
+
+    @classmethod
+    def recover(cls, spill_path):
+        """Reopen the spill file of a crashed session"""
+        spill = RecordingSpillFile.recover(spill_path)
+        buffer = cls(sampling_rate=spill.sampling_rate, spill_dir=os.path.dirname(spill_path))
+        buffer.spill = spill
+        packets_path = PacketTimeFile.path_for(spill_path)
+        if os.path.exists(packets_path):
+            buffer.packets = PacketTimeFile.recover(packets_path)
+        buffer.visualization_buffer.extend(spill.read()[-buffer.visualization_buffer.maxlen:])
+        return buffer
+
+    def add_sample(self, value, timestamp=None):
+        if self.spill is None:
+            self.spill = RecordingSpillFile.create(
+                self.spill_dir, self.sampling_rate, self.extent_samples, self.block_samples
+            )
+        if timestamp is not None and timestamp != self.last_packet_time:
+            if self.packets is None:
+                self.packets = PacketTimeFile(PacketTimeFile.path_for(self.spill.path), self.sampling_rate,
+                                              self.extent_samples, self.block_samples)
+            self.packets.append_packet(len(self.spill), timestamp)
+            self.last_packet_time = timestamp
+        self.spill.append(value)
         self.visualization_buffer.append(value)
-    
-    def get_data(self):
-        return np.array(list(self.buffer))
-    
+
+    @property
+    def spill_path(self):
+        return self.spill.path if self.spill is not None else None
+
     def get_visualization_data(self):
-        return np.array(list(self.visualization_buffer))
-    
+        return np.array(self.visualization_buffer)
+
     def get_sample_count(self):
-        return len(self.buffer)
-    
+        return len(self.spill) if self.spill is not None else 0
+
+    def flush(self):
+        """Commit pending samples (and packet times) so another reader sees them"""
+        if self.spill is not None:
+            self.spill.flush()
+        if self.packets is not None:
+            self.packets.flush()
+
+    def close(self, delete=True):
+        if self.spill is not None:
+            self.spill.close(delete=delete)
+            self.spill = None
+        if self.packets is not None:
+            self.packets.close(delete=delete)
+            self.packets = None
+        self.last_packet_time = None
+
     def clear(self):
-        self.buffer.clear()
+        self.close(delete=True)
         self.visualization_buffer.clear()
 
 
@@ -36,7 +87,7 @@ class BatchProcessor(QThread):
     error_occurred = pyqtSignal(str)
     
     def __init__(self, recorded_data, preprocessor, model_handler, 
-                 original_fs=128, target_fs=250, window_size=2500):
+                 original_fs=128, target_fs=250, window_size=2500, mv_per_count=None):
         super().__init__()
         self.recorded_data = recorded_data
         self.preprocessor = preprocessor
@@ -44,61 +95,135 @@ class BatchProcessor(QThread):
         self.original_fs = original_fs
         self.target_fs = target_fs
         self.window_size = window_size
+        # mV per unit of recorded_data for the raw SQI checks; None = Shimmer ADC counts
+        self.mv_per_count = mv_per_count
+        self.cascade_stats = None
         self.should_stop = False
         
     def run(self):
         try:
-            self.progress_update.emit(10, "Resampling data...")
-            if self.should_stop:
-                return
-            
-            target_length = int(len(self.recorded_data) * self.target_fs / self.original_fs)
-            resampled_data = resample(self.recorded_data, target_length)
-            
-            self.progress_update.emit(20, "Preprocessing signal...")
-            if self.should_stop:
-                return
-            
-            preprocessed_data = self.preprocessor.preprocess(resampled_data)
-            
-            self.progress_update.emit(30, "Splitting into windows...")
-            if self.should_stop:
-                return
-            
-            windows = self.split_into_windows(preprocessed_data)
-            total_windows = len(windows)
-            
-            if total_windows == 0:
-                raise Exception("Not enough data for analysis")
-            
-            self.progress_update.emit(40, f"Analyzing {total_windows} windows...")
-            if self.should_stop:
-                return
-
-            import time
-            computation_start_time = time.time()
-
-            # Batch predict all windows at once to reduce overhead and avoid flooding the GUI with frequent updates
-            windows_array = np.stack(windows)  # shape (n_windows, window_size)
-            preds = self.model_handler.predict(windows_array)
-            # Ensure we have a flat list of integer predictions
-            predictions = list(map(int, np.array(preds).flatten()))
-
-            computation_time = time.time() - computation_start_time
-
-            self.progress_update.emit(90, "Finalizing results...")
-            if self.should_stop:
-                return
-
-            results = self.calculate_results(predictions)
-            results['computation_time'] = computation_time
-            
-            self.progress_update.emit(100, "Complete!")
-            self.processing_complete.emit(results)
-            
+            results = self.analyze(self.progress_update.emit)
+            if results is not None:
+                self.processing_complete.emit(results)
         except Exception as e:
             self.error_occurred.emit(str(e))
-    
+
+    def analyze(self, report):
+        """Full analysis; report(percent, message) is called between stages
+
+        Returns the results dict, or None when stopped. Also used by
+        core.analysis_worker, which runs it in a separate process.
+        """
+        report(10, "Resampling data...")
+        if self.should_stop:
+            return None
+
+        target_length = int(len(self.recorded_data) * self.target_fs / self.original_fs)
+        resampled_data = resample(self.recorded_data, target_length)
+
+        report(20, "Preprocessing signal...")
+        if self.should_stop:
+            return None
+
+        preprocessed_data = self.preprocessor.preprocess(resampled_data)
+
+        report(30, "Splitting into windows...")
+        if self.should_stop:
+            return None
+
+        windows = self.split_into_windows(preprocessed_data)
+        total_windows = len(windows)
+
+        if total_windows == 0:
+            raise Exception("Not enough data for analysis")
+
+        report(40, f"Analyzing {total_windows} windows...")
+        if self.should_stop:
+            return None
+
+        import time
+        computation_start_time = time.time()
+
+        # Batch predict all windows at once to reduce overhead and avoid flooding the GUI with frequent updates
+        windows_array = np.stack(windows)  # shape (n_windows, window_size)
+        raw_windows = np.stack(self.split_into_windows(resampled_data))
+        predictions, quality_flags = self.classify_windows(windows_array, raw_windows)
+
+        computation_time = time.time() - computation_start_time
+
+        report(90, "Finalizing results...")
+        if self.should_stop:
+            return None
+
+        results = self.calculate_results(predictions, quality_flags)
+        results['computation_time'] = computation_time
+
+        report(100, "Complete!")
+        return results
+
+    def sqi_thresholds(self):
+        from core.shimmer_config import ShimmerConfig
+
+        return {
+            'flatline_mv': ShimmerConfig.SQI_FLATLINE_MV,
+            'max_flat_fraction': ShimmerConfig.SQI_MAX_FLAT_FRACTION,
+            'max_clip_fraction': ShimmerConfig.SQI_MAX_CLIP_FRACTION,
+            'max_baseline_step_mv': ShimmerConfig.SQI_MAX_BASELINE_STEP_MV,
+            'min_kurtosis': ShimmerConfig.SQI_MIN_KURTOSIS,
+            'max_hf_ratio': ShimmerConfig.SQI_MAX_HF_RATIO,
+            'min_beats': ShimmerConfig.SQI_MIN_BEATS
+        }
+
+    def classify_windows(self, windows, raw_windows=None):
+        """Signal quality check, then prediction; returns (predictions, quality flags or None)
+
+        raw_windows are the same windows before filtering (ADC counts, scaled
+        by mv_per_count); without them only the filtered-signal checks run. In SQI_MODE 'drop' bad windows
+        are not sent to the model and get prediction -1; in 'flag' they are
+        predicted but still left out of the AF percentage.
+        """
+        from core.shimmer_config import ShimmerConfig
+
+        if ShimmerConfig.SQI_MODE == 'off':
+            return self.predict_windows(windows), None
+
+        mv_per_count = self.mv_per_count or self.preprocessor.adc_to_millivolts(1.0, offset=0)
+        flags, _ = assess_windows(windows, self.target_fs, self.sqi_thresholds(), raw=raw_windows,
+                                  mv_per_count=mv_per_count)
+        if ShimmerConfig.SQI_MODE == 'flag':
+            return self.predict_windows(windows), flags
+
+        good = flags == 0
+        predictions = np.full(len(windows), -1, dtype=np.int64)
+        if good.any():
+            predictions[good] = self.predict_windows(windows[good])
+        return list(map(int, predictions)), flags
+
+    def predict_windows(self, windows):
+        """Integer predictions for a batch of windows, through the RR pre-screen if CASCADE_INFERENCE"""
+        from core.shimmer_config import ShimmerConfig
+
+        if not ShimmerConfig.CASCADE_INFERENCE:
+            return list(map(int, np.array(self.model_handler.predict(windows)).flatten()))
+
+        decisions, _ = screen_windows(
+            windows, self.target_fs,
+            normal_max_nrmssd=ShimmerConfig.CASCADE_NORMAL_MAX_NRMSSD,
+            af_min_nrmssd=ShimmerConfig.CASCADE_AF_MIN_NRMSSD,
+            af_min_pnn50=ShimmerConfig.CASCADE_AF_MIN_PNN50,
+            min_beats=ShimmerConfig.CASCADE_MIN_BEATS
+        )
+        ambiguous = decisions == AMBIGUOUS
+        if ambiguous.any():
+            decisions[ambiguous] = np.array(self.model_handler.predict(windows[ambiguous])).flatten()
+
+        if self.cascade_stats is None:
+            self.cascade_stats = {'screened_normal': 0, 'screened_af': 0, 'model_windows': 0}
+        self.cascade_stats['model_windows'] += int(np.sum(ambiguous))
+        self.cascade_stats['screened_normal'] += int(np.sum(~ambiguous & (decisions == 0)))
+        self.cascade_stats['screened_af'] += int(np.sum(~ambiguous & (decisions == 1)))
+        return list(map(int, decisions))
+
     def split_into_windows(self, data):
         windows = []
         for i in range(0, len(data) - self.window_size + 1, self.window_size):
@@ -106,19 +231,25 @@ class BatchProcessor(QThread):
             windows.append(window)
         return windows
     
-    def calculate_results(self, predictions):
+    def calculate_results(self, predictions, quality_flags=None):
         from core.shimmer_config import ShimmerConfig
         
         predictions = np.array(predictions)
+        # Windows that failed the signal quality check don't count towards the AF percentage
+        included = np.ones(len(predictions), dtype=bool) if quality_flags is None else np.asarray(quality_flags) == 0
         
-        af_count = int(np.sum(predictions == 1))
-        normal_count = int(np.sum(predictions == 0))
-        total_windows = len(predictions)
+        af_count = int(np.sum(predictions[included] == 1))
+        normal_count = int(np.sum(predictions[included] == 0))
+        total_windows = int(np.sum(included))
         
         af_percentage = (af_count / total_windows * 100) if total_windows > 0 else 0
         
         threshold = ShimmerConfig.CLASSIFICATION_THRESHOLD
-        if af_percentage >= threshold:
+        if total_windows == 0:
+            # Every window failed the quality check: no basis for a diagnosis either way
+            final_classification = "INSUFFICIENT SIGNAL QUALITY"
+            classification_color = "#64748b"
+        elif af_percentage >= threshold:
             final_classification = "ATRIAL FIBRILLATION"
             classification_color = "#ef4444"
         else:
@@ -132,10 +263,23 @@ class BatchProcessor(QThread):
             'normal_count': normal_count,
             'total_windows': total_windows,
             'af_percentage': af_percentage,
+            'inconclusive': total_windows == 0,
             'predictions': predictions.tolist(),
             'window_size': self.window_size,
-            'sampling_rate': self.target_fs
+            'sampling_rate': self.target_fs,
+            'excluded_windows': int(np.sum(~included))
         }
+
+        if quality_flags is not None:
+            results['signal_quality'] = dict(summarize_flags(quality_flags),
+                                             mode=ShimmerConfig.SQI_MODE,
+                                             flags=np.asarray(quality_flags).tolist())
+
+        if self.cascade_stats is not None:
+            skipped = self.cascade_stats['screened_normal'] + self.cascade_stats['screened_af']
+            screened = skipped + self.cascade_stats['model_windows']
+            results['cascade'] = dict(self.cascade_stats,
+                                      skipped_fraction=skipped / screened if screened > 0 else 0)
         
         return results
     
@@ -0,0 +1,294 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from scipy.signal import resample
+
+from core.shimmer_config import ShimmerConfig
+
+
+class _BatchRequest:
+    def __init__(self, windows):
+        self.windows = windows
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class MicroBatcher:
+    """Coalesce concurrent predict requests into one ModelHandler call"""
+
+    def __init__(self, model_handler, max_batch_size=64, max_latency_ms=20,
+                 latency_history=10000):
+        self.model_handler = model_handler
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+
+        self.queue = queue.Queue()
+        self.running = False
+        self.worker = None
+
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=latency_history)
+        self.batch_sizes = deque(maxlen=latency_history)
+        self.request_count = 0
+        self.window_count = 0
+        self.batch_count = 0
+        self.error_count = 0
+        self.pending_windows = 0
+        self.started_at = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.started_at = time.monotonic()
+        self.worker = threading.Thread(target=self._run, name="MicroBatcher", daemon=True)
+        self.worker.start()
+
+    def stop(self):
+        self.running = False
+        if self.worker:
+            self.worker.join(timeout=1.0)
+            self.worker = None
+
+    def submit(self, windows):
+        windows = np.asarray(windows, dtype=np.float32)
+        if windows.ndim == 1:
+            windows = windows.reshape(1, -1)
+
+        request = _BatchRequest(windows)
+        with self.lock:
+            self.pending_windows += len(windows)
+        self.queue.put(request)
+        return request.future
+
+    def _collect_batch(self, first):
+        batch = [first]
+        n_windows = len(first.windows)
+        deadline = first.enqueued_at + self.max_latency
+
+        while n_windows < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            n_windows += len(request.windows)
+
+        return batch, n_windows
+
+    def _run(self):
+        while self.running:
+            try:
+                first = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            batch, n_windows = self._collect_batch(first)
+            windows = np.concatenate([r.windows for r in batch])
+
+            try:
+                probabilities = self.model_handler.predict_proba(windows)
+            except Exception as e:
+                with self.lock:
+                    self.error_count += len(batch)
+                    self.pending_windows -= n_windows
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            finished_at = time.monotonic()
+            offset = 0
+            with self.lock:
+                self.batch_count += 1
+                self.batch_sizes.append(n_windows)
+                self.request_count += len(batch)
+                self.window_count += n_windows
+                self.pending_windows -= n_windows
+                for request in batch:
+                    self.latencies.append(finished_at - request.enqueued_at)
+
+            for request in batch:
+                count = len(request.windows)
+                request.future.set_result(probabilities[offset:offset + count])
+                offset += count
+
+    def get_metrics(self):
+        with self.lock:
+            latencies_ms = np.array(self.latencies) * 1000
+            batch_sizes = np.array(self.batch_sizes)
+            uptime = time.monotonic() - self.started_at if self.started_at else 0
+
+            metrics = {
+                'uptime_sec': uptime,
+                'requests': self.request_count,
+                'windows': self.window_count,
+                'batches': self.batch_count,
+                'errors': self.error_count,
+                'queue_depth_requests': self.queue.qsize(),
+                'queue_depth_windows': self.pending_windows,
+                'throughput_windows_per_sec': self.window_count / uptime if uptime > 0 else 0,
+                'throughput_requests_per_sec': self.request_count / uptime if uptime > 0 else 0,
+                'avg_batch_size': float(np.mean(batch_sizes)) if len(batch_sizes) else 0,
+                'max_batch_size': self.max_batch_size,
+                'max_latency_ms': self.max_latency * 1000,
+            }
+
+        if len(latencies_ms):
+            p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+            metrics.update({
+                'latency_ms_p50': float(p50),
+                'latency_ms_p95': float(p95),
+                'latency_ms_p99': float(p99),
+                'latency_ms_max': float(np.max(latencies_ms)),
+            })
+
+        return metrics
+
+
+class _InferenceRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        # Per-request logging on stdout would dominate the server under load
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send_json(200, self.server.app.batcher.get_metrics())
+        elif self.path == "/health":
+            self._send_json(200, {'status': 'ok', 'model_loaded': self.server.app.model_handler.model is not None})
+        else:
+            self._send_json(404, {'error': f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {'error': f"Unknown path: {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length)
+            windows = self.server.app.parse_request(body, self.headers)
+        except Exception as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        start_time = time.monotonic()
+        try:
+            probabilities = self.server.app.batcher.submit(windows).result(
+                timeout=self.server.app.request_timeout
+            )
+        except Exception as e:
+            self._send_json(500, {'error': str(e)})
+            return
+
+        self._send_json(200, {
+            'probabilities': probabilities.tolist(),
+            'predictions': (probabilities > 0.5).astype(int).tolist(),
+            'latency_ms': (time.monotonic() - start_time) * 1000
+        })
+
+
+class InferenceServer:
+    """Local HTTP service sharing one loaded ModelHandler between stations
+
+    POST /predict accepts either model-ready windows or a raw ADC chunk:
+      - JSON {"windows": [[...2500 values...], ...]} or {"window": [...]}
+      - JSON {"samples": [...], "fs": 128}: resampled, preprocessed and
+        split into windows exactly like BatchProcessor
+      - application/octet-stream: float32 windows, row-major (n, 2500)
+    GET /metrics returns throughput, latency percentiles and queue depth.
+    """
+
+    def __init__(self, model_handler, preprocessor,
+                 host=ShimmerConfig.INFERENCE_SERVER_HOST,
+                 port=ShimmerConfig.INFERENCE_SERVER_PORT,
+                 max_batch_size=ShimmerConfig.INFERENCE_MAX_BATCH_SIZE,
+                 max_latency_ms=ShimmerConfig.INFERENCE_MAX_LATENCY_MS,
+                 window_size=ShimmerConfig.WINDOW_SIZE_SAMPLES,
+                 target_fs=ShimmerConfig.MODEL_SAMPLING_RATE,
+                 request_timeout=30.0):
+        self.model_handler = model_handler
+        self.preprocessor = preprocessor
+        self.window_size = window_size
+        self.target_fs = target_fs
+        self.request_timeout = request_timeout
+
+        self.batcher = MicroBatcher(model_handler, max_batch_size, max_latency_ms)
+        self.httpd = ThreadingHTTPServer((host, port), _InferenceRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.app = self
+
+    @property
+    def address(self):
+        return self.httpd.server_address
+
+    def parse_request(self, body, headers):
+        content_type = headers.get("Content-Type", "application/json")
+
+        if content_type.startswith("application/octet-stream"):
+            windows = np.frombuffer(body, dtype=np.float32)
+            if len(windows) == 0 or len(windows) % self.window_size != 0:
+                raise ValueError(f"Binary payload must hold n x {self.window_size} float32 values")
+            return windows.reshape(-1, self.window_size)
+
+        payload = json.loads(body)
+        if 'samples' in payload:
+            return self.windows_from_chunk(payload['samples'], payload.get('fs', ShimmerConfig.SHIMMER_SAMPLING_RATE))
+
+        windows = payload.get('windows', payload.get('window'))
+        if windows is None:
+            raise ValueError("Request needs 'windows', 'window' or 'samples'")
+
+        windows = np.asarray(windows, dtype=np.float32)
+        if windows.ndim == 1:
+            windows = windows.reshape(1, -1)
+        if windows.ndim != 2 or windows.shape[1] != self.window_size:
+            raise ValueError(f"Expected windows of {self.window_size} samples, got shape {windows.shape}")
+        return windows
+
+    def windows_from_chunk(self, samples, fs):
+        samples = np.asarray(samples, dtype=np.float64)
+        target_length = int(len(samples) * self.target_fs / fs)
+        if target_length < self.window_size:
+            raise ValueError(f"Chunk too short: {len(samples)} samples @ {fs} Hz is less than one window")
+
+        resampled = resample(samples, target_length)
+        preprocessed = self.preprocessor.preprocess(resampled)
+
+        n_windows = len(preprocessed) // self.window_size
+        windows = preprocessed[:n_windows * self.window_size].reshape(n_windows, self.window_size)
+        return windows.astype(np.float32)
+
+    def serve_forever(self):
+        self.batcher.start()
+        host, port = self.address[:2]
+        print(f"Inference server listening on http://{host}:{port}")
+        print(f"  Max batch size: {self.batcher.max_batch_size} windows")
+        print(f"  Max latency:    {self.batcher.max_latency * 1000:.0f} ms")
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.batcher.stop()
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.batcher.stop()
@@ -0,0 +1,128 @@
+import json
+import os
+import time
+import numpy as np
+from core.time_reconstruction import host_time
+
+
+class LatencyTracer:
+    """Age of the newest sample at each stage of the live path
+
+    Every sample carries the host_time() stamped in
+    ShimmerReader.stream_callback. Each stage records how old the newest
+    sample it has handled is:
+
+        buffer          on_data_received -> RecordingBuffer (every
+                        buffer_every-th sample)
+        preprocess      chunk filtered for the plot
+        plot            processed_curve.setData (how stale the display is)
+        classification  AF label available after the recording stops
+
+    Latencies go into fixed-size ring buffers (one float store per event),
+    so tracing costs about a microsecond per sample and a bounded amount of
+    memory; percentiles are only computed when a summary is requested.
+    Once a ring wraps, its percentiles only cover the latest `capacity`
+    events; the summary reports the time span they cover.
+    """
+
+    STAGES = ['buffer', 'preprocess', 'plot', 'classification']
+
+    def __init__(self, capacity=20000, enabled=True, buffer_every=1):
+        self.capacity = capacity
+        self.enabled = enabled
+        self.buffer_every = max(1, int(buffer_every))
+        self.reset()
+
+    def reset(self):
+        self.rings = {stage: np.zeros(self.capacity) for stage in self.STAGES}
+        self.ring_times = {stage: np.zeros(self.capacity) for stage in self.STAGES}
+        self.buffer_pending = 0
+        self.counts = {stage: 0 for stage in self.STAGES}
+        self.max_ms = {stage: 0.0 for stage in self.STAGES}
+        self.last_arrival = None
+        self.preprocessed_arrival = None
+        self.plotted_arrival = None
+        self.session_start = time.time()
+
+    def record(self, stage, arrival_time, now=None):
+        if not self.enabled or arrival_time is None:
+            return
+        now = now or host_time()
+        latency_ms = (now - arrival_time) * 1000
+        count = self.counts[stage]
+        self.rings[stage][count % self.capacity] = latency_ms
+        self.ring_times[stage][count % self.capacity] = now
+        self.counts[stage] = count + 1
+        if latency_ms > self.max_ms[stage]:
+            self.max_ms[stage] = latency_ms
+
+    def on_buffer_insert(self, arrival_time):
+        self.last_arrival = arrival_time
+        # Once per block of samples, so the ring spans minutes rather than seconds
+        self.buffer_pending += 1
+        if self.buffer_pending >= self.buffer_every:
+            self.buffer_pending = 0
+            self.record('buffer', arrival_time)
+
+    def on_preprocessed(self):
+        self.record('preprocess', self.last_arrival)
+        self.preprocessed_arrival = self.last_arrival
+
+    def on_plotted(self):
+        # Only count refreshes that put new samples on screen
+        if self.preprocessed_arrival is not None and self.preprocessed_arrival != self.plotted_arrival:
+            self.record('plot', self.preprocessed_arrival)
+            self.plotted_arrival = self.preprocessed_arrival
+
+    def on_classified(self):
+        self.record('classification', self.last_arrival)
+
+    def summary(self):
+        stats = {}
+        for stage in self.STAGES:
+            count = self.counts[stage]
+            if count == 0:
+                continue
+            values = self.rings[stage][:min(count, self.capacity)]
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            # Events the percentiles cover: all of them, or the latest `capacity`
+            oldest = self.ring_times[stage][count % self.capacity if count > self.capacity else 0]
+            newest = self.ring_times[stage][(count - 1) % self.capacity]
+            stats[stage] = {
+                'count': count,
+                'window_events': int(len(values)),
+                'window_sec': float(newest - oldest),
+                'whole_session': count <= self.capacity,
+                'p50_ms': float(p50),
+                'p95_ms': float(p95),
+                'p99_ms': float(p99),
+                'max_ms': float(self.max_ms[stage])
+            }
+        return stats
+
+    def format_summary(self):
+        stats = self.summary()
+        if not stats:
+            return "Latency: --"
+        lines = ["Latency p50 / p95 / p99 (ms)"]
+        for stage, s in stats.items():
+            window = "" if s['whole_session'] else f"  (last {s['window_sec']:.0f} s)"
+            lines.append(f"{stage:<14} {s['p50_ms']:>7.1f} / {s['p95_ms']:>7.1f} / {s['p99_ms']:>7.1f}{window}")
+        return "\n".join(lines)
+
+    def dump(self, directory, extra=None):
+        """Write the summary to <directory>/latency_YYYYmmdd_HHMMSS.json"""
+        stats = self.summary()
+        if not stats:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, time.strftime('latency_%Y%m%d_%H%M%S.json',
+                                                     time.localtime(self.session_start)))
+        with open(path, 'w') as f:
+            json.dump({
+                'session_start': self.session_start,
+                'session_end': time.time(),
+                'stages': stats,
+                **(extra or {})
+            }, f, indent=2)
+        return path
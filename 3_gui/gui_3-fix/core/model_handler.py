@@ -1,27 +1,56 @@
+import os
+import sys
 import numpy as np
 from tensorflow import keras
+from core.resource_governor import configure_tensorflow, inference_threads
+from core.shimmer_config import ShimmerConfig
+
+TRAINING_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '2_training', 'src')
+
+
+def _tflite_model(model_path):
+    # Same wrapper quantize_model.py validates the .tflite variants with; only
+    # needed for .tflite models, so the GUI still starts without 2_training
+    if TRAINING_DIR not in sys.path:
+        sys.path.append(TRAINING_DIR)
+    try:
+        from tflite_model import TFLiteModel
+    except ImportError as e:
+        raise ImportError(f".tflite models need 2_training/src/tflite_model.py next to the GUI "
+                          f"(looked in {os.path.normpath(TRAINING_DIR)}): {e}") from e
+    num_threads = inference_threads() if ShimmerConfig.CPU_GOVERNOR else None
+    return TFLiteModel(model_path, num_threads=num_threads)
 
 class ModelHandler:
     def __init__(self):
         self.model = None
-        
+        # TF reads its thread settings once, before the first op
+        configure_tensorflow()
+
     def load_model(self, model_path):
         try:
-            self.model = keras.models.load_model(model_path)
+            if str(model_path).endswith('.tflite'):
+                self.model = _tflite_model(model_path)
+            else:
+                self.model = keras.models.load_model(model_path)
             return True, "Model loaded successfully"
         except Exception as e:
             return False, f"Failed to load model: {str(e)}"
-    
-    def predict(self, data):
+
+    def predict_proba(self, data):
         if self.model is None:
             raise Exception("Model not loaded")
-        
+
         if len(data.shape) == 1:
             data = data.reshape(1, -1, 1)
         elif len(data.shape) == 2:
             data = data.reshape(data.shape[0], data.shape[1], 1)
-        
+
         prediction = self.model.predict(data, verbose=0)
+        return np.asarray(prediction).flatten()
+
+    def predict(self, data):
+        prediction = self.predict_proba(data)
         binary_pred = (prediction > 0.5).astype(int).flatten()
-        
+
         return binary_pred
\ No newline at end of file
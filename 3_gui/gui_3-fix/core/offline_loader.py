@@ -0,0 +1,340 @@
+import os
+import sys
+import tempfile
+import time
+from fractions import Fraction
+import numpy as np
+from scipy import signal
+from core.batch_processor import BatchProcessor
+from core.recording_store import PacketTimeFile, open_spill_samples
+from core.shimmer_config import ShimmerConfig
+from core.time_reconstruction import estimate_clock, iter_resampled
+
+POSTPROCESSING_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '4_postprocessing')
+
+
+def _session_reader(path):
+    # session_format.py lives next to ambil_data.py, which writes the .ecgs files
+    if POSTPROCESSING_DIR not in sys.path:
+        sys.path.append(POSTPROCESSING_DIR)
+    from session_format import SessionReader
+    return SessionReader(path)
+
+
+def get_capture_info(path, default_fs=None):
+    """Sampling rate and size of a Shimmer capture without reading its samples"""
+    info = {
+        'path': path,
+        'format': 'session' if path.lower().endswith('.ecgs') else 'csv',
+        'file_size': os.path.getsize(path),
+        'sampling_rate': default_fs or ShimmerConfig.SHIMMER_SAMPLING_RATE
+    }
+    if info['format'] == 'session':
+        header = _session_reader(path).header
+        info['sampling_rate'] = header['fs']
+        info['gain'] = header.get('gain', ShimmerConfig.ECG_GAIN)
+        info['adc_offset'] = header.get('adc_offset', ShimmerConfig.ADC_OFFSET)
+    return info
+
+
+def iter_capture_chunks(path, chunk_samples=None, value_column='ECG_CH1'):
+    """Yield (adc_values, fraction_read) from a CSV or .ecgs capture, chunk by chunk"""
+    chunk_samples = chunk_samples or ShimmerConfig.OFFLINE_CHUNK_SAMPLES
+    file_size = max(1, os.path.getsize(path))
+
+    if path.lower().endswith('.ecgs'):
+        reader = _session_reader(path)
+        for _, values in reader.iter_blocks():
+            yield values, reader.position / file_size
+        return
+
+    with open(path, 'rb') as f:
+        try:
+            import pyarrow.csv as pa_csv
+        except ImportError:
+            pa_csv = None
+
+        if pa_csv is not None:
+            stream = pa_csv.open_csv(
+                f,
+                read_options=pa_csv.ReadOptions(block_size=chunk_samples * 32),
+                convert_options=pa_csv.ConvertOptions(include_columns=[value_column])
+            )
+            for batch in stream:
+                yield batch.column(0).to_numpy(zero_copy_only=False), f.tell() / file_size
+        else:
+            import pandas as pd
+            for chunk in pd.read_csv(f, usecols=[value_column], chunksize=chunk_samples):
+                yield chunk[value_column].to_numpy(), f.tell() / file_size
+
+
+class StreamingPreprocessor:
+    """Resample + bandpass/notch of an unbounded signal in overlapping segments
+
+    Each segment is filtered with filtfilt including `margin` samples of
+    context on both sides and only its core is emitted, so the output matches
+    whole-signal filtering away from the edges. Z-score normalisation needs
+    global statistics and is left to the caller.
+    """
+
+    def __init__(self, preprocessor, original_fs, target_fs, margin_sec=None, core_sec=60):
+        ratio = Fraction(target_fs / original_fs).limit_denominator(1000)
+        self.up, self.down = ratio.numerator, ratio.denominator
+        self.preprocessor = preprocessor
+
+        margin_sec = margin_sec if margin_sec is not None else ShimmerConfig.OFFLINE_FILTER_MARGIN_SEC
+        # Segment boundaries on multiples of `down` keep the resampled grid continuous
+        self.margin = int(np.ceil(margin_sec * original_fs / self.down)) * self.down
+        self.core_len = max(1, int(core_sec * original_fs) // self.down) * self.down
+
+        self.raw = np.zeros(0)
+        self.core_start = 0
+
+    def process_range(self, raw, core_start, core_end, with_resampled=False):
+        """Filtered output for raw[core_start:core_end] of a fully available signal
+
+        core_start must be a multiple of `down` (or have `margin` samples before it).
+        with_resampled also returns the same span resampled but not filtered.
+        """
+        seg_start = max(0, core_start - self.margin)
+        seg_end = min(len(raw), core_end + self.margin)
+        segment = raw[seg_start:seg_end]
+
+        resampled = signal.resample_poly(segment, self.up, self.down)
+        centered = resampled - np.mean(resampled)  # DC Removal
+        padlen = min(3 * max(len(self.preprocessor.a_band), len(self.preprocessor.b_band)), len(centered) - 1)
+        filtered = signal.filtfilt(self.preprocessor.b_band, self.preprocessor.a_band, centered, padlen=padlen)
+        filtered = signal.filtfilt(self.preprocessor.b_notch, self.preprocessor.a_notch, filtered, padlen=padlen)
+
+        out_start = (core_start - seg_start) * self.up // self.down
+        out_end = out_start + int(np.ceil((core_end - core_start) * self.up / self.down))
+        if with_resampled:
+            return filtered[out_start:out_end], resampled[out_start:out_end]
+        return filtered[out_start:out_end]
+
+    def feed(self, values, final=False, with_resampled=False):
+        """Add raw samples; returns the filtered samples that are now final
+
+        with_resampled returns (filtered, resampled-but-unfiltered) instead.
+        """
+        self.raw = np.concatenate([self.raw, np.asarray(values, dtype=np.float64)])
+        outputs = []
+        resampled = []
+
+        while True:
+            available = len(self.raw) - self.core_start
+            if available >= self.core_len + self.margin:
+                core_end = self.core_start + self.core_len
+            elif final and available > 0:
+                core_end = len(self.raw)
+            else:
+                break
+            if with_resampled:
+                filtered, core_resampled = self.process_range(self.raw, self.core_start, core_end, True)
+                resampled.append(core_resampled)
+            else:
+                filtered = self.process_range(self.raw, self.core_start, core_end)
+            outputs.append(filtered)
+            self.core_start = core_end
+
+        # Keep only the context the next segment needs
+        drop = max(0, self.core_start - self.margin)
+        if drop:
+            self.raw = self.raw[drop:]
+            self.core_start -= drop
+
+        filtered = np.concatenate(outputs) if outputs else np.zeros(0)
+        if with_resampled:
+            return filtered, np.concatenate(resampled) if resampled else np.zeros(0)
+        return filtered
+
+
+class StreamingBatchProcessor(BatchProcessor):
+    """Two-pass analysis of a signal that is read chunk by chunk, never whole
+
+    Pass 1 filters the chunks from open_source() with StreamingPreprocessor
+    into a temporary float32 file while accumulating the z-score statistics
+    (and, with keep_raw, stores the resampled unfiltered signal for the raw
+    SQI checks). Pass 2 reads windows back from those files and classifies
+    them in batches. Subclasses provide open_source().
+    """
+
+    keep_raw = False
+
+    def __init__(self, preprocessor, model_handler, original_fs, target_fs=250, window_size=2500):
+        super().__init__(None, preprocessor, model_handler,
+                         original_fs=original_fs, target_fs=target_fs, window_size=window_size)
+        # Rate of the chunks open_source() yields
+        self.stream_fs = original_fs
+
+    def open_source(self):
+        """Iterable of (values, fraction_read); may set self.stream_fs first"""
+        raise NotImplementedError
+
+    def extra_results(self):
+        return {}
+
+    def analyze(self, report):
+        temp_paths = []
+        try:
+            computation_start_time = time.time()
+            report(5, "Reading signal...")
+            chunks = self.open_source()
+            streamer = StreamingPreprocessor(self.preprocessor, self.stream_fs, self.target_fs)
+
+            fd, filtered_path = tempfile.mkstemp(suffix='.f32')
+            temp_paths.append(filtered_path)
+            raw_out = None
+            if self.keep_raw:
+                raw_fd, raw_path = tempfile.mkstemp(suffix='.f64')
+                temp_paths.append(raw_path)
+                raw_out = os.fdopen(raw_fd, 'wb')
+            n_read = 0
+            stats = {'n': 0, 'sum': 0.0, 'sum_sq': 0.0}
+
+            def write_output(out, output):
+                filtered, resampled = output if self.keep_raw else (output, None)
+                if len(filtered):
+                    out.write(filtered.astype(np.float32).tobytes())
+                    stats['n'] += len(filtered)
+                    stats['sum'] += float(np.sum(filtered))
+                    stats['sum_sq'] += float(np.sum(filtered ** 2))
+                if resampled is not None and len(resampled):
+                    raw_out.write(resampled.astype(np.float64).tobytes())
+
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    for values, fraction in chunks:
+                        if self.should_stop:
+                            return None
+                        n_read += len(values)
+                        write_output(out, streamer.feed(values, with_resampled=self.keep_raw))
+                        report(5 + int(45 * min(fraction, 1.0)),
+                               f"Preprocessing... {n_read / self.stream_fs / 60:.1f} min read")
+                    write_output(out, streamer.feed([], final=True, with_resampled=self.keep_raw))
+            finally:
+                if raw_out is not None:
+                    raw_out.close()
+
+            n_filtered = stats['n']
+            total_windows = n_filtered // self.window_size
+            if total_windows == 0:
+                raise Exception("Not enough data for analysis")
+
+            mean = stats['sum'] / n_filtered
+            std = np.sqrt(max(stats['sum_sq'] / n_filtered - mean ** 2, 1e-12))
+
+            filtered_signal = np.memmap(filtered_path, dtype=np.float32, mode='r', shape=(n_filtered,))
+            raw_signal = (np.memmap(raw_path, dtype=np.float64, mode='r', shape=(n_filtered,))
+                          if self.keep_raw else None)
+            batch_windows = ShimmerConfig.OFFLINE_PREDICT_BATCH
+            predictions = []
+            quality_flags = []
+            for start in range(0, total_windows, batch_windows):
+                if self.should_stop:
+                    return None
+                stop = min(start + batch_windows, total_windows)
+                span = slice(start * self.window_size, stop * self.window_size)
+                windows = (filtered_signal[span].reshape(-1, self.window_size) - mean) / std  # Z-score Normalization
+                raw_windows = np.asarray(raw_signal[span]).reshape(-1, self.window_size) if self.keep_raw else None
+                batch_predictions, batch_flags = self.classify_windows(windows, raw_windows)
+                predictions.extend(batch_predictions)
+                if batch_flags is not None:
+                    quality_flags.append(batch_flags)
+                report(50 + int(40 * stop / total_windows), f"Analyzing windows {stop}/{total_windows}...")
+            del filtered_signal, raw_signal
+
+            report(90, "Finalizing results...")
+            results = self.calculate_results(predictions, np.concatenate(quality_flags) if quality_flags else None)
+            results['computation_time'] = time.time() - computation_start_time
+            results['duration_sec'] = n_read / self.stream_fs
+            results.update(self.extra_results())
+
+            report(100, "Complete!")
+            return results
+
+        finally:
+            for path in temp_paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+class OfflineCaptureProcessor(StreamingBatchProcessor):
+    """Classify a saved Shimmer capture (CSV or .ecgs) without loading it whole
+
+    The file is streamed chunk by chunk and converted from ADC to mV. Saved
+    captures are filtered while streaming, so only the filtered-signal SQI
+    checks apply.
+    """
+
+    def __init__(self, file_path, preprocessor, model_handler,
+                 original_fs=None, target_fs=250, window_size=2500):
+        info = get_capture_info(file_path, original_fs)
+        super().__init__(preprocessor, model_handler, info['sampling_rate'], target_fs, window_size)
+        self.file_path = file_path
+        self.capture_info = info
+
+    def open_source(self):
+        gain = self.capture_info.get('gain', ShimmerConfig.ECG_GAIN)
+        offset = self.capture_info.get('adc_offset', ShimmerConfig.ADC_OFFSET)
+        for values, fraction in iter_capture_chunks(self.file_path):
+            yield self.preprocessor.adc_to_millivolts(values.astype(np.float64), gain=gain, offset=offset), fraction
+
+    def extra_results(self):
+        return {'source_file': self.file_path}
+
+
+class RecordingProcessor(StreamingBatchProcessor):
+    """Classify a live recording straight from its spill file, in blocks
+
+    Samples are read from a read-only memmap of RecordingBuffer's spill file
+    and packet arrival times from the packet file next to it, so memory does
+    not grow with the session length. With packet times the device clock is
+    estimated from the packets alone and the samples are put on the uniform
+    target-rate grid chunk by chunk; without them they are resampled by
+    StreamingPreprocessor. Samples are ADC counts, so the raw SQI checks run.
+    """
+
+    keep_raw = True
+
+    def __init__(self, spill_path, preprocessor, model_handler,
+                 original_fs=128, target_fs=250, window_size=2500):
+        super().__init__(preprocessor, model_handler, original_fs, target_fs, window_size)
+        self.spill_path = spill_path
+        self.time_reconstruction = None
+
+    def open_source(self):
+        samples, _ = open_spill_samples(self.spill_path)
+        packets = PacketTimeFile.read_packets(PacketTimeFile.path_for(self.spill_path))
+        chunk_samples = ShimmerConfig.OFFLINE_CHUNK_SAMPLES
+        n = len(samples)
+
+        if packets is not None and n >= 2:
+            # After a crash the packet file can run ahead of the committed samples
+            inside = packets[0] < n
+            clock = estimate_clock(packets[0][inside], packets[1][inside], n,
+                                   fs_nominal=self.original_fs, gap_factor=ShimmerConfig.TIME_GAP_FACTOR)
+            self.time_reconstruction = {
+                'fs_estimated': clock['fs_estimated'],
+                'dropped_samples': clock['dropped_samples'],
+                'gaps': clock['gaps'],
+                'jitter_ms_p95': clock['jitter_ms_p95'],
+                'timestamp_resolution_ms': clock['timestamp_resolution_ms']
+            }
+            print(f"Time grid: fs {clock['fs_estimated']:.3f} Hz (nominal {self.original_fs}), "
+                  f"{len(clock['gaps'])} gaps, {clock['dropped_samples']} dropped samples, "
+                  f"timestamp resolution {clock['timestamp_resolution_ms']:.2f} ms")
+            self.stream_fs = self.target_fs
+            return ((output, fraction) for output, _, fraction in iter_resampled(
+                samples, clock, self.target_fs, ShimmerConfig.TIME_RECONSTRUCTION_METHOD,
+                chunk_samples=chunk_samples))
+
+        return ((np.asarray(samples[start:start + chunk_samples]), min(start + chunk_samples, n) / n)
+                for start in range(0, n, chunk_samples))
+
+    def extra_results(self):
+        if self.time_reconstruction is not None:
+            return {'time_reconstruction': self.time_reconstruction}
+        return {}
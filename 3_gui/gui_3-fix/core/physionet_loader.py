@@ -2,15 +2,24 @@ import numpy as np
 from pathlib import Path
 
 class PhysioNetLoader:
+    # convert_to_shimmer_format: counts * SHIMMER_SCALE + SHIMMER_OFFSET
+    SHIMMER_SCALE = 95.0
+    SHIMMER_OFFSET = 195000
+    DEFAULT_ADC_GAIN = 200.0  # WFDB default, also the AFDB gain (counts per mV)
+
     @staticmethod
-    def load_physionet_record(file_path, sampling_rate=250):
+    def load_physionet_record(file_path, sampling_rate=250, leads=None):
+        # leads=None or one lead -> 1-D; e.g. leads=[0, 1] -> (samples, n_leads) from the same read
         try:
             with open(file_path, 'rb') as f:
                 raw_data = np.fromfile(f, dtype=np.int16)
             
             num_samples = len(raw_data) // 2
             signals = raw_data.reshape(num_samples, 2)
-            ecg_signal = signals[:, 0].astype(np.float64)
+            columns = [0] if leads is None else list(leads)
+            ecg_signal = signals[:, columns].astype(np.float64)
+            if len(columns) == 1:
+                ecg_signal = ecg_signal[:, 0]
             
             fs = sampling_rate
             duration = len(ecg_signal) / fs
@@ -18,6 +27,8 @@ class PhysioNetLoader:
             print(f"\n=== LOADED PHYSIONET FILE ===")
             print(f"File: {Path(file_path).name}")
             print(f"Samples: {len(ecg_signal):,}")
+            if leads is not None:
+                print(f"Leads: {list(leads)}")
             print(f"Sampling Rate: {fs} Hz")
             print(f"Duration: {duration:.2f} seconds ({duration/60:.2f} minutes)")
             print(f"Value Range: [{ecg_signal.min():.0f}, {ecg_signal.max():.0f}]")
@@ -29,10 +40,28 @@ class PhysioNetLoader:
         except Exception as e:
             return None, None, False, f"Error loading file: {str(e)}"
     
+    @staticmethod
+    def read_adc_gain(file_path):
+        """ADC gain (counts per mV) of the first signal, from the .hea next to the .dat"""
+        header_path = Path(file_path).with_suffix('.hea')
+        try:
+            with open(header_path) as f:
+                lines = [line.split() for line in f if line.strip() and not line.startswith('#')]
+            # Signal lines: file format gain(baseline)/units ...; the gain may be missing or 0
+            gain = float(lines[1][2].split('/')[0].split('(')[0])
+            return gain if gain > 0 else PhysioNetLoader.DEFAULT_ADC_GAIN
+        except (OSError, IndexError, ValueError):
+            return PhysioNetLoader.DEFAULT_ADC_GAIN
+
+    @staticmethod
+    def mv_per_count(adc_gain):
+        """mV per unit of the convert_to_shimmer_format output"""
+        return 1.0 / (adc_gain * PhysioNetLoader.SHIMMER_SCALE)
+
     @staticmethod
     def convert_to_shimmer_format(signals):
-        scale_factor = 95.0
-        offset = 195000
+        scale_factor = PhysioNetLoader.SHIMMER_SCALE
+        offset = PhysioNetLoader.SHIMMER_OFFSET
         scaled_signals = signals * scale_factor + offset
         
         print(f"Converted to Shimmer format:")
@@ -0,0 +1,155 @@
+import threading
+import time
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+from core.offline_loader import StreamingPreprocessor
+from core.shimmer_config import ShimmerConfig
+
+
+class PlaybackEngine(QThread):
+    """Plays a loaded recording back at a configurable speed on a worker thread
+
+    The playback position follows the monotonic clock (position advances by
+    elapsed time x speed), not the number of timer ticks. Each step filters
+    only the newly reached samples with StreamingPreprocessor and appends
+    them to a display ring of `display_window` seconds. When more than one
+    display window was reached since the last step (high speed, or the
+    thread was starved) the older samples are skipped instead of processed.
+    The GUI pulls the latest frame with get_frame() on its own timer, so a
+    busy GUI simply sees fewer frames.
+    """
+
+    position_changed = pyqtSignal(float)  # seconds
+    playback_finished = pyqtSignal()
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, data, fs, preprocessor, target_fs=250, speed=1.0, display_window=10):
+        super().__init__()
+        self.data = np.asarray(data, dtype=np.float64)
+        self.fs = fs
+        self.target_fs = target_fs
+        self.display_window = display_window
+        self.streamer = StreamingPreprocessor(preprocessor, fs, target_fs,
+                                              margin_sec=ShimmerConfig.PLAYBACK_FILTER_MARGIN_SEC)
+        # Processing boundaries on multiples of `down` keep the 250 Hz grid continuous
+        self.step = self.streamer.down
+
+        self.lock = threading.Lock()
+        self.display_len = int(display_window * target_fs)
+        self.display = np.zeros(self.display_len)
+        self.display_fill = 0
+        self.display_end_time = 0.0
+
+        self.speed = self._clamp_speed(speed)
+        self.index = 0
+        self.anchor_index = 0
+        self.anchor_time = time.monotonic()
+        self.generation = 0
+        self.paused = False
+        self.running = False
+        self.stats = {'samples_processed': 0, 'samples_skipped': 0, 'steps': 0}
+
+    @staticmethod
+    def _clamp_speed(speed):
+        return float(np.clip(speed, ShimmerConfig.PLAYBACK_MIN_SPEED, ShimmerConfig.PLAYBACK_MAX_SPEED))
+
+    @property
+    def duration(self):
+        return len(self.data) / self.fs
+
+    def _target_index(self):
+        elapsed = time.monotonic() - self.anchor_time
+        return min(len(self.data), self.anchor_index + int(elapsed * self.speed * self.fs))
+
+    def _reanchor(self, index):
+        self.anchor_index = index
+        self.anchor_time = time.monotonic()
+
+    def set_speed(self, speed):
+        with self.lock:
+            self._reanchor(self._target_index())
+            self.speed = self._clamp_speed(speed)
+
+    def seek(self, seconds):
+        index = int(np.clip(seconds, 0, self.duration) * self.fs) // self.step * self.step
+        with self.lock:
+            self.generation += 1
+            self.index = index
+            self.display_fill = 0
+            self.display_end_time = index / self.fs
+            self._reanchor(index)
+
+    def set_paused(self, paused):
+        with self.lock:
+            if not paused:
+                self._reanchor(self.index)
+            self.paused = paused
+
+    def get_frame(self):
+        """(time, processed) arrays of the display window, or None before the first step"""
+        with self.lock:
+            if self.display_fill == 0:
+                return None
+            data = self.display[self.display_len - self.display_fill:].copy()
+            end_time = self.display_end_time
+        time_axis = end_time - np.arange(len(data))[::-1] / self.target_fs
+        return time_axis, data
+
+    def _advance(self):
+        with self.lock:
+            if self.paused:
+                return
+            start = self.index
+            target = self._target_index()
+            if target < len(self.data):
+                target = target // self.step * self.step
+            if target <= start:
+                return
+
+            # Only the last display window reached can be seen; skip the rest
+            keep_from = target - int(self.display_window * self.fs)
+            if keep_from > start:
+                keep_from = keep_from // self.step * self.step
+                self.stats['samples_skipped'] += keep_from - start
+                self.display_fill = 0
+                start = keep_from
+
+            generation = self.generation
+
+        processed = self.streamer.process_range(self.data, start, target)
+
+        with self.lock:
+            # A seek during processing makes this batch stale
+            if generation != self.generation:
+                return
+            n = min(len(processed), self.display_len)
+            self.display = np.roll(self.display, -n)
+            self.display[-n:] = processed[-n:]
+            self.display_fill = min(self.display_len, self.display_fill + n)
+            self.display_end_time = target / self.fs
+            self.index = target
+            self.stats['samples_processed'] += target - start
+            self.stats['steps'] += 1
+
+        self.position_changed.emit(target / self.fs)
+
+    def run(self):
+        self.running = True
+        frame_interval = 1.0 / ShimmerConfig.PLAYBACK_FPS
+        try:
+            self._reanchor(self.index)
+            while self.running:
+                step_start = time.monotonic()
+                self._advance()
+                if self.index >= len(self.data):
+                    self.playback_finished.emit()
+                    break
+                time.sleep(max(0.0, frame_interval - (time.monotonic() - step_start)))
+        except Exception as e:
+            self.error_occurred.emit(f"Playback error: {str(e)}")
+        finally:
+            self.running = False
+
+    def stop(self):
+        self.running = False
+        self.wait(1000)
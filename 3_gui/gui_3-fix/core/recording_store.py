@@ -0,0 +1,222 @@
+import glob
+import os
+import struct
+import time
+import numpy as np
+
+class RecordingSpillFile:
+    """Append-only memory-mapped sample file behind RecordingBuffer
+
+    Layout: 64-byte header followed by float64 samples. The file grows in
+    preallocated extents and samples are written in blocks; the header's
+    sample count is only advanced after a block's data has been flushed, so
+    after a crash everything up to the last flushed block can be reopened.
+    """
+
+    MAGIC = b'ECGSPILL'
+    VERSION = 1
+    HEADER_FORMAT = '<8sIIQQQI'
+    HEADER_SIZE = 64
+    DTYPE = np.float64
+    EXTENSION = '.ecgspill'
+
+    def __init__(self, path, sampling_rate, extent_samples, block_samples, _recover=False):
+        self.path = path
+        self.sampling_rate = sampling_rate
+        self.extent_samples = max(1, int(extent_samples))
+        self.block_samples = max(1, int(block_samples))
+
+        self.block = np.empty(self.block_samples, dtype=self.DTYPE)
+        self.block_fill = 0
+        self.data = None
+
+        if _recover:
+            self.file = open(path, 'r+b')
+            header = self._read_header(self.file)
+            self.sampling_rate = header['sampling_rate']
+            self.count = header['count']
+            self.capacity = header['capacity']
+            self.created_ns = header['created_ns']
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.file = open(path, 'w+b')
+            self.count = 0
+            self.capacity = 0
+            self.created_ns = time.time_ns()
+            self._grow(self.extent_samples)
+
+        self._map()
+        self.closed = False
+
+    @classmethod
+    def create(cls, directory, sampling_rate, extent_samples, block_samples):
+        name = time.strftime('session_%Y%m%d_%H%M%S') + f'_{os.getpid()}' + cls.EXTENSION
+        return cls(os.path.join(directory, name), sampling_rate, extent_samples, block_samples)
+
+    @classmethod
+    def recover(cls, path, extent_samples=None, block_samples=None):
+        """Reopen a spill file left behind by a crashed session"""
+        with open(path, 'rb') as f:
+            header = cls._read_header(f)
+        fs = header['sampling_rate']
+        return cls(path, fs,
+                   extent_samples or max(header['capacity'], fs),
+                   block_samples or fs,
+                   _recover=True)
+
+    @classmethod
+    def find_unfinished(cls, directory):
+        """Spill files whose session never closed cleanly"""
+        unfinished = []
+        for path in sorted(glob.glob(os.path.join(directory, '*' + cls.EXTENSION))):
+            try:
+                with open(path, 'rb') as f:
+                    header = cls._read_header(f)
+                if not header['closed'] and header['count'] > 0:
+                    unfinished.append((path, header))
+            except (OSError, ValueError):
+                continue
+        return unfinished
+
+    @classmethod
+    def _read_header(cls, f):
+        f.seek(0)
+        raw = f.read(struct.calcsize(cls.HEADER_FORMAT))
+        if len(raw) < struct.calcsize(cls.HEADER_FORMAT):
+            raise ValueError("Truncated spill file header")
+        magic, version, fs, count, capacity, created_ns, closed = struct.unpack(cls.HEADER_FORMAT, raw)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError("Not a recording spill file")
+        # Never trust a count beyond what is physically in the file
+        data_bytes = os.fstat(f.fileno()).st_size - cls.HEADER_SIZE
+        count = min(count, max(0, data_bytes) // np.dtype(cls.DTYPE).itemsize)
+        return {
+            'sampling_rate': fs,
+            'count': count,
+            'capacity': capacity,
+            'created_ns': created_ns,
+            'closed': bool(closed),
+            'duration_sec': count / fs if fs else 0
+        }
+
+    def _write_header(self, closed=False):
+        header = struct.pack(self.HEADER_FORMAT, self.MAGIC, self.VERSION, self.sampling_rate,
+                             self.count, self.capacity, self.created_ns, int(closed))
+        self.file.seek(0)
+        self.file.write(header.ljust(self.HEADER_SIZE, b'\0'))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def _grow(self, min_capacity):
+        new_capacity = self.capacity
+        while new_capacity < min_capacity:
+            new_capacity += self.extent_samples
+        if new_capacity == self.capacity:
+            return
+
+        if self.data is not None:
+            self.data.flush()
+            self.data = None
+        self.file.truncate(self.HEADER_SIZE + new_capacity * np.dtype(self.DTYPE).itemsize)
+        self.capacity = new_capacity
+        self._write_header()
+        self._map()
+
+    def _map(self):
+        self.data = np.memmap(self.file, dtype=self.DTYPE, mode='r+',
+                              offset=self.HEADER_SIZE, shape=(self.capacity,))
+
+    def append(self, value):
+        self.block[self.block_fill] = value
+        self.block_fill += 1
+        if self.block_fill == self.block_samples:
+            self.flush()
+
+    def extend(self, values):
+        for value in np.asarray(values, dtype=self.DTYPE).ravel():
+            self.append(value)
+
+    def flush(self):
+        """Write the pending block, then commit the new sample count"""
+        if self.block_fill == 0:
+            return
+        end = self.count + self.block_fill
+        if end > self.capacity:
+            self._grow(end)
+        self.data[self.count:end] = self.block[:self.block_fill]
+        self.data.flush()
+        self.count = end
+        self.block_fill = 0
+        self._write_header()
+
+    def __len__(self):
+        return self.count + self.block_fill
+
+    def read(self):
+        """Memory-mapped view of every sample recorded so far"""
+        self.flush()
+        return self.data[:self.count]
+
+    def close(self, delete=False):
+        if self.closed:
+            return
+        self.flush()
+        self._write_header(closed=True)
+        self.data = None
+        self.file.close()
+        self.closed = True
+        if delete:
+            try:
+                os.remove(self.path)
+            except OSError:
+                # Windows refuses while a BatchProcessor still maps the file;
+                # it is already marked closed so it won't be offered for recovery
+                pass
+
+
+class PacketTimeFile(RecordingSpillFile):
+    """(packet start index, arrival time) pairs of a recording, next to its spill file
+
+    Same layout and crash behaviour as RecordingSpillFile; values are stored
+    as interleaved float64 pairs (sample indices are exact up to 2^53).
+    """
+
+    MAGIC = b'ECGPACKT'
+    EXTENSION = '.ecgpkt'
+
+    def __init__(self, path, sampling_rate, extent_samples, block_samples, _recover=False):
+        # Even sizes so a flushed block never ends in the middle of a pair
+        super().__init__(path, sampling_rate, 2 * max(1, int(extent_samples) // 2),
+                         2 * max(1, int(block_samples) // 2), _recover=_recover)
+
+    @classmethod
+    def path_for(cls, spill_path):
+        return os.path.splitext(spill_path)[0] + cls.EXTENSION
+
+    def append_packet(self, index, timestamp):
+        self.append(index)
+        self.append(timestamp)
+
+    @classmethod
+    def read_packets(cls, path):
+        """(packet start index, arrival time) arrays from a packet file, or None"""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            header = cls._read_header(f)
+        count = header['count'] // 2 * 2
+        if count < 4:
+            return None
+        pairs = np.fromfile(path, dtype=cls.DTYPE, count=count, offset=cls.HEADER_SIZE).reshape(-1, 2)
+        return pairs[:, 0].astype(np.int64), pairs[:, 1]
+
+
+def open_spill_samples(path):
+    """Read-only memmap of the committed samples of a spill file (e.g. from the analysis worker)"""
+    with open(path, 'rb') as f:
+        header = RecordingSpillFile._read_header(f)
+    if header['count'] == 0:
+        return np.zeros(0, dtype=RecordingSpillFile.DTYPE), header
+    samples = np.memmap(path, dtype=RecordingSpillFile.DTYPE, mode='r',
+                        offset=RecordingSpillFile.HEADER_SIZE, shape=(header['count'],))
+    return samples, header
@@ -0,0 +1,169 @@
+import os
+import sys
+import threading
+from core.shimmer_config import ShimmerConfig
+
+ROLES = ['ui', 'acquisition', 'inference']
+THREAD_ENV_VARS = ['OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS']
+
+_tf_configured = False
+_pin_warned = set()
+
+
+def available_cores():
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def role_cores(role):
+    """Cores configured for a role (CPU_AFFINITY_<ROLE>), or None for no pinning"""
+    return getattr(ShimmerConfig, f"CPU_AFFINITY_{role.upper()}")
+
+
+def _target_cores(role):
+    cores = role_cores(role)
+    if cores:
+        return cores
+    # Threads and child processes inherit affinity; an unpinned role must not stay on another role's cores
+    if any(role_cores(other) for other in ROLES):
+        return list(range(os.cpu_count() or 1))
+    return None
+
+
+def inference_threads():
+    """TF intra-op threads: configured value, else the inference cores, else all but two cores"""
+    if ShimmerConfig.TF_INTRA_OP_THREADS:
+        return ShimmerConfig.TF_INTRA_OP_THREADS
+    cores = role_cores('inference')
+    if cores:
+        return len(cores)
+    # Leave one core each for the Qt main thread and the Shimmer callback thread
+    return max(1, len(available_cores()) - 2)
+
+
+def configure_thread_env():
+    """Thread pool sizes through the environment (read when numpy/TensorFlow start their pools)"""
+    if not ShimmerConfig.CPU_GOVERNOR:
+        return
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(ShimmerConfig.BLAS_THREADS)
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(inference_threads())
+    os.environ['TF_NUM_INTEROP_THREADS'] = str(ShimmerConfig.TF_INTER_OP_THREADS)
+
+    if 'numpy' in sys.modules:
+        # BLAS already loaded: the env vars are too late, limit it at runtime if possible
+        try:
+            from threadpoolctl import threadpool_limits
+            threadpool_limits(ShimmerConfig.BLAS_THREADS)
+        except ImportError:
+            pass
+
+
+def configure_tensorflow():
+    """tf.config.threading from ShimmerConfig; must run before the first TF op"""
+    global _tf_configured
+    if not ShimmerConfig.CPU_GOVERNOR or _tf_configured:
+        return
+    import tensorflow as tf
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(inference_threads())
+        tf.config.threading.set_inter_op_parallelism_threads(ShimmerConfig.TF_INTER_OP_THREADS)
+    except RuntimeError as e:
+        print(f"TensorFlow thread pools already initialised: {e}")
+    _tf_configured = True
+
+
+def thread_pinning_supported():
+    """Per-thread affinity: sched_setaffinity on Linux, SetThreadAffinityMask (pywin32) on Windows"""
+    if hasattr(os, 'sched_setaffinity'):
+        return True
+    if sys.platform == 'win32':
+        try:
+            import win32process  # noqa: F401
+            return True
+        except ImportError:
+            return False
+    return False
+
+
+def pin_current_thread(role):
+    """Restrict the calling thread to the role's cores
+
+    On Linux threads started afterwards inherit the affinity; on Windows
+    they start with the process affinity. Without per-thread affinity (see
+    thread_pinning_supported) a warning is printed once per role and
+    nothing is pinned.
+    """
+    cores = _target_cores(role)
+    if not ShimmerConfig.CPU_GOVERNOR or not cores:
+        return False
+    try:
+        if hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(threading.get_native_id(), cores)
+        else:
+            import win32api
+            import win32process
+            win32process.SetThreadAffinityMask(win32api.GetCurrentThread(), sum(1 << c for c in cores))
+        return True
+    except ImportError:
+        if role not in _pin_warned:
+            _pin_warned.add(role)
+            print(f"Warning: CPU_AFFINITY_{role.upper()} is set but thread pinning is not supported "
+                  f"on {sys.platform} (install pywin32 on Windows); {role} thread not pinned")
+        return False
+    except Exception as e:  # OSError on Linux, pywintypes.error on Windows
+        print(f"Could not pin {role} thread to cores {cores}: {e}")
+        return False
+
+
+def pin_process(role):
+    """Restrict the whole process to the role's cores"""
+    cores = _target_cores(role)
+    if not ShimmerConfig.CPU_GOVERNOR or not cores:
+        return False
+    try:
+        try:
+            os.sched_setaffinity(0, cores)
+        except AttributeError:
+            import psutil
+            psutil.Process().cpu_affinity(list(cores))
+        return True
+    except (ImportError, OSError) as e:
+        print(f"Could not pin {role} process to cores {cores}: {e}")
+        return False
+
+
+def apply_role(role):
+    """Apply the thread and affinity settings for one role in the calling thread/process
+
+    ui           main.py, before the QApplication and the model are created
+    acquisition  ShimmerReader thread, before pyshimmer starts its reader thread
+    inference    AnalysisWorker process, before the model is loaded
+    """
+    if role == 'ui':
+        configure_thread_env()
+        # Threads inherit the main thread's affinity; only pin the UI when inference runs elsewhere
+        if ShimmerConfig.ANALYSIS_IN_PROCESS:
+            pin_current_thread('ui')
+    elif role == 'acquisition':
+        pin_current_thread('acquisition')
+    elif role == 'inference':
+        pin_process('inference')
+        configure_thread_env()
+        configure_tensorflow()
+    else:
+        raise ValueError(f"Unknown role: {role}")
+
+
+def describe():
+    return {
+        'enabled': ShimmerConfig.CPU_GOVERNOR,
+        'available_cores': available_cores(),
+        'tf_intra_op_threads': inference_threads(),
+        'tf_inter_op_threads': ShimmerConfig.TF_INTER_OP_THREADS,
+        'blas_threads': ShimmerConfig.BLAS_THREADS,
+        'thread_pinning': thread_pinning_supported(),
+        **{f'{role}_cores': role_cores(role) for role in ROLES}
+    }
@@ -0,0 +1,147 @@
+"""RR-irregularity pre-screen for the cascade inference mode
+
+AF is, first of all, an irregularly irregular ventricular rhythm. A window
+whose RR intervals are almost constant is Normal, and one whose successive
+intervals jump around almost every beat is AF, without asking the network.
+Only windows in between (ectopic beats, borderline variability, too few
+detected beats) are sent to the CNN-BiLSTM.
+
+R-peaks are found on the already filtered (and z-scored) model windows, all
+windows of a batch at once. The detector and the RR statistics are vendored
+from the preprocessing pipeline so the GUI runs without that tree; only
+NumPy/SciPy are used, like core/time_reconstruction.py.
+"""
+
+import warnings
+import numpy as np
+from scipy import ndimage, signal
+
+# --- Vendored from 1_preprocessing/src/r_peak_detector.py (qrs_energy, detect_r_peaks_windows)
+# --- and 1_preprocessing/src/hrv_features.py (rr_matrix, rr_time_domain); keep them in sync.
+
+QRS_BAND_HZ = (5.0, 15.0)
+INTEGRATION_SEC = 0.150
+REFRACTORY_SEC = 0.200
+THRESHOLD_RATIO = 0.3
+THRESHOLD_PERCENTILE = 80
+REFINE_SEC = 0.075
+NN50_MS = 50
+
+
+def qrs_energy(ecg, fs):
+    """Moving-window integrated, squared derivative of the 5-15 Hz band (along the last axis)"""
+    high = min(QRS_BAND_HZ[1], 0.45 * fs)
+    sos = signal.butter(2, [QRS_BAND_HZ[0] / (fs / 2), high / (fs / 2)], btype='band', output='sos')
+    band = signal.sosfiltfilt(sos, ecg, axis=-1)
+
+    derivative = ndimage.convolve1d(band, np.array([1, 2, 0, -2, -1]) * (fs / 8.0), axis=-1, mode='nearest')
+    width = max(1, int(round(INTEGRATION_SEC * fs)))
+    # Centred window: the energy peak lines up with the QRS instead of lagging it
+    return ndimage.uniform_filter1d(derivative ** 2, width, axis=-1, mode='nearest')
+
+
+def detect_r_peaks_windows(windows, fs):
+    """R-peaks of many short windows at once (e.g. the 10 s windows of X)
+
+    Returns (peaks, counts): peaks is (n_windows, max_beats) padded with -1.
+    A window is short enough for one threshold (0.3 x 80th percentile of its
+    candidates), so there is no rolling threshold and no search-back.
+    """
+    windows = np.atleast_2d(np.asarray(windows, dtype=np.float64))
+    n_windows, n_samples = windows.shape
+    integrated = qrs_energy(windows, fs)
+
+    # Local maxima over +-refractory stand in for find_peaks(distance=...)
+    refractory = max(1, int(REFRACTORY_SEC * fs))
+    is_peak = integrated == ndimage.maximum_filter1d(integrated, 2 * refractory + 1, axis=-1, mode='nearest')
+    is_peak &= integrated > 0
+
+    # Per-row percentile of the candidate heights (np.nanpercentile loops over rows)
+    heights = np.sort(np.where(is_peak, integrated, np.nan), axis=1)
+    last = np.maximum(np.sum(is_peak, axis=1) - 1, 0)
+    position = last * (THRESHOLD_PERCENTILE / 100)
+    low = np.floor(position).astype(np.int64)
+    below = heights[np.arange(n_windows), low]
+    above = heights[np.arange(n_windows), np.minimum(low + 1, last)]
+    threshold = THRESHOLD_RATIO * (below + (position - low) * (above - below))
+    rows, positions = np.nonzero(is_peak & (integrated >= threshold[:, None]))
+
+    # Refine to the largest |amplitude| near each energy peak
+    half = max(1, int(REFINE_SEC * fs))
+    index = np.clip(positions[:, None] + np.arange(-half, half + 1), 0, n_samples - 1)
+    best = np.argmax(np.abs(windows[rows[:, None], index]), axis=1)
+    positions = index[np.arange(len(positions)), best]
+
+    counts = np.bincount(rows, minlength=n_windows)
+    first = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank = np.arange(len(rows)) - first[rows]
+    peaks = np.full((n_windows, max(1, counts.max(initial=0))), -1, dtype=np.int64)
+    peaks[rows, rank] = positions
+    return peaks, counts
+
+
+def rr_matrix(peaks, counts, fs):
+    """Padded RR intervals (ms) from detect_r_peaks_windows output; NaN past each window's last beat"""
+    if peaks.shape[1] < 2:
+        return np.full((len(peaks), 1), np.nan)
+    rr = np.diff(peaks, axis=1).astype(np.float64) / fs * 1000
+    valid = np.arange(rr.shape[1]) < (counts - 1)[:, None]
+    return np.where(valid, rr, np.nan)
+
+
+def rr_time_domain(rr):
+    """mean_rr, rmssd (ms) and pnn50 (%) per window from padded RR intervals (ms)"""
+    with np.errstate(all='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN rows -> NaN
+        successive = np.diff(rr, axis=1)
+        n_successive = np.sum(~np.isnan(successive), axis=1)
+        return {
+            'mean_rr': np.nanmean(rr, axis=1),
+            'rmssd': np.sqrt(np.nanmean(successive ** 2, axis=1)),
+            'pnn50': np.sum(np.abs(successive) > NN50_MS, axis=1) / n_successive * 100
+        }
+
+# --- End of vendored code
+
+
+HEART_RATE_RANGE = (30, 220)  # bpm; outside -> detection is not trusted
+
+NORMAL = 0
+AF = 1
+AMBIGUOUS = -1
+
+
+def rr_irregularity(windows, fs):
+    """Per-window beats, heart rate, normalized RMSSD (RMSSD / mean RR) and pNN50 (%)"""
+    peaks, counts = detect_r_peaks_windows(windows, fs)
+    time_domain = rr_time_domain(rr_matrix(peaks, counts, fs))
+    mean_rr = time_domain['mean_rr']
+    with np.errstate(all='ignore'):
+        return {
+            'beats': counts,
+            'heart_rate': 60000 / mean_rr,
+            'nrmssd': time_domain['rmssd'] / mean_rr,
+            'pnn50': time_domain['pnn50']
+        }
+
+
+def screen_windows(windows, fs, normal_max_nrmssd, af_min_nrmssd, af_min_pnn50,
+                   min_beats=6, heart_rate_range=HEART_RATE_RANGE):
+    """NORMAL / AF for clear-cut windows, AMBIGUOUS for the ones the model must decide
+
+    Returns (decisions, metrics). Windows with too few beats or an
+    implausible heart rate are always AMBIGUOUS.
+    """
+    metrics = rr_irregularity(windows, fs)
+    nrmssd = metrics['nrmssd']
+    with np.errstate(invalid='ignore'):
+        plausible = ((metrics['beats'] >= min_beats)
+                     & (metrics['heart_rate'] >= heart_rate_range[0])
+                     & (metrics['heart_rate'] <= heart_rate_range[1]))
+        normal = plausible & (nrmssd <= normal_max_nrmssd)
+        af = plausible & (nrmssd >= af_min_nrmssd) & (metrics['pnn50'] >= af_min_pnn50)
+
+    decisions = np.full(len(nrmssd), AMBIGUOUS, dtype=np.int64)
+    decisions[normal] = NORMAL
+    decisions[af] = AF
+    return decisions, metrics
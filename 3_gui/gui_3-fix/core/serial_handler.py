@@ -2,9 +2,11 @@ from serial import Serial
 import serial.tools.list_ports
 from PyQt5.QtCore import QThread, pyqtSignal
 from pyshimmer import ShimmerBluetooth, DEFAULT_BAUDRATE, DataPacket, EChannelType
+from core.resource_governor import apply_role
+from core.time_reconstruction import host_time
 
 class ShimmerReader(QThread):
-    data_received = pyqtSignal(float)
+    data_received = pyqtSignal(float, float)  # value, packet arrival time
     error_occurred = pyqtSignal(str)
     
     def __init__(self, port, baudrate=DEFAULT_BAUDRATE, channel=None):
@@ -15,15 +17,21 @@ class ShimmerReader(QThread):
         self.shim_dev = None
         self.ecg_channel = channel if channel else EChannelType.EXG_ADS1292R_1_CH1_24BIT
         
+    def host_arrival_time(self, timestamp):
+        """host_time() at which the sample stamped `timestamp` was emitted"""
+        return timestamp
+
     def stream_callback(self, pkt: DataPacket) -> None:
         try:
             if self.ecg_channel in pkt.channels:
                 value = pkt[self.ecg_channel]
-                self.data_received.emit(float(value))
+                self.data_received.emit(float(value), host_time())
         except Exception as e:
             self.error_occurred.emit(f"Callback error: {str(e)}")
     
     def run(self):
+        # pyshimmer's reader thread (which calls stream_callback) inherits this affinity
+        apply_role('acquisition')
         try:
             serial_conn = Serial(self.port, self.baudrate)
             self.shim_dev = ShimmerBluetooth(serial_conn)
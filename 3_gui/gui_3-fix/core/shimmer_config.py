@@ -26,8 +26,65 @@ class ShimmerConfig:
         "10 minutes": 600,
         "15 minutes": 900
     }
+
+    RECORDING_SPILL_DIR = "recordings"
+    RECORDING_SPILL_EXTENT_SEC = 300  # spill file grows in 5-minute extents
+    RECORDING_SPILL_BLOCK_SEC = 1  # samples are flushed to disk once per second
     
+    TIME_RECONSTRUCTION_METHOD = "cubic"  # "cubic" or "linear"
+    TIME_GAP_FACTOR = 0.6  # envelope rise (in sample periods) counted as dropped samples
+
+    OFFLINE_CHUNK_SAMPLES = 65536  # rows read per chunk from a saved capture
+    OFFLINE_FILTER_MARGIN_SEC = 5  # filter context on each side of a chunk
+    OFFLINE_PREDICT_BATCH = 256  # windows per model call for saved captures
+
+    LATENCY_TRACING = True
+    LATENCY_DEBUG_PANEL = False  # show live p50/p95/p99 under Performance
+    LATENCY_TRACE_DIR = "latency_traces"  # JSON summary per live session
+    LATENCY_TRACE_CAPACITY = 20000  # latest events kept per stage
+    LATENCY_BUFFER_EVERY = 32  # buffer stage: one event per this many samples
+
+    PLAYBACK_SPEEDS = [0.5, 1, 2, 5, 10, 25, 50, 100]  # PhysioNet playback speed choices
+    PLAYBACK_MIN_SPEED = 0.5
+    PLAYBACK_MAX_SPEED = 100
+    PLAYBACK_FPS = 20  # playback steps / plot refreshes per second
+    PLAYBACK_FILTER_MARGIN_SEC = 2  # filter context around each playback batch
+
+    ANALYSIS_IN_PROCESS = True  # run BatchProcessor analysis in a separate worker process
+
+    # CPU governor (core/resource_governor.py), compare settings with cpu_benchmark.py
+    CPU_GOVERNOR = True
+    TF_INTRA_OP_THREADS = 0  # 0 = inference cores, or all cores minus 2 (UI + acquisition)
+    TF_INTER_OP_THREADS = 1
+    BLAS_THREADS = 1  # OpenMP/MKL/OpenBLAS threads for numpy/scipy
+    CPU_AFFINITY_UI = None  # list of core ids, e.g. [0]; None = not pinned
+    CPU_AFFINITY_ACQUISITION = None  # e.g. [1]
+    CPU_AFFINITY_INFERENCE = None  # e.g. [2, 3]
+
     PREPROCESSING_CHUNK_SIZE = 128
     RESAMPLED_CHUNK_SIZE = 250
     
-    CLASSIFICATION_THRESHOLD = 5  # 5% AF windows for AF classification
\ No newline at end of file
+    CLASSIFICATION_THRESHOLD = 5  # 5% AF windows for AF classification
+
+    # Signal quality index (core/signal_quality.py), applied to every window before prediction
+    SQI_MODE = "drop"  # "drop": bad windows are not classified, "flag": classified but not counted, "off"
+    SQI_FLATLINE_MV = 0.01  # a 0.5 s block with less peak-to-peak than this is flat
+    SQI_MAX_FLAT_FRACTION = 0.5  # of the blocks in a window
+    SQI_MAX_CLIP_FRACTION = 0.01  # of the samples at the 24-bit ADC rails
+    SQI_MAX_BASELINE_STEP_MV = 3.0  # between adjacent 0.5 s block medians
+    SQI_MIN_KURTOSIS = 4.0  # clean ECG is well above, Gaussian noise is 3
+    SQI_MAX_HF_RATIO = 0.5  # power above 40 Hz (mains excluded) / power 1-40 Hz
+    SQI_MIN_BEATS = 5  # detected R-peaks per 10 s window (30 bpm)
+
+    # Cascade inference (core/rr_screen.py): clear-cut windows are labelled from RR irregularity,
+    # only ambiguous ones go to the model. Tune on the test split with cascade_benchmark.py
+    CASCADE_INFERENCE = False
+    CASCADE_NORMAL_MAX_NRMSSD = 0.06  # RMSSD / mean RR at or below this -> Normal
+    CASCADE_AF_MIN_NRMSSD = 0.15  # AF needs RMSSD / mean RR at or above this ...
+    CASCADE_AF_MIN_PNN50 = 60  # ... and at least this % of successive RR changes > 50 ms
+    CASCADE_MIN_BEATS = 6  # fewer detected beats in a window -> always ask the model
+
+    INFERENCE_SERVER_HOST = "127.0.0.1"
+    INFERENCE_SERVER_PORT = 8765
+    INFERENCE_MAX_BATCH_SIZE = 64  # windows per model call
+    INFERENCE_MAX_LATENCY_MS = 20  # max wait to fill a micro-batch
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""Signal quality index (SQI) for analysis windows
+
+Lead-off periods and motion artefacts from the Shimmer (flat ADC values,
+saturation near +-2^23, large baseline steps, EMG bursts) would otherwise be
+z-scored and classified like any other window. Every window is scored in
+one vectorized pass and gets a bit flag per failed check:
+
+  flatline  most 0.5 s blocks of the raw signal are (almost) constant
+  clipping  raw ADC values at the 24-bit rails
+  baseline  step between the medians of adjacent 0.5 s blocks (raw, mV)
+  kurtosis  filtered window is not peaky like an ECG (noise is ~3)
+  hf_noise  power above the ECG band (mains excluded) vs. 1-40 Hz, raw signal
+  r_peaks   too few detected beats or an implausible heart rate
+
+Raw checks need the resampled signal before filtering; without it (saved
+captures are filtered while streaming) only the filtered checks run.
+Thresholds are passed in by the caller from ShimmerConfig.SQI_*.
+"""
+
+import numpy as np
+from scipy import stats
+
+from core.rr_screen import rr_irregularity, HEART_RATE_RANGE
+
+FLATLINE = 1
+CLIPPING = 2
+BASELINE = 4
+KURTOSIS = 8
+HF_NOISE = 16
+R_PEAKS = 32
+CHECKS = {
+    'flatline': FLATLINE,
+    'clipping': CLIPPING,
+    'baseline': BASELINE,
+    'kurtosis': KURTOSIS,
+    'hf_noise': HF_NOISE,
+    'r_peaks': R_PEAKS
+}
+
+ADC_FULL_SCALE = 2 ** 23
+BLOCK_SEC = 0.5
+ECG_BAND_HZ = (1.0, 40.0)
+MAINS_HZ = (50.0, 60.0)
+MAINS_EXCLUDE_HZ = 2.0
+
+
+def _blocks(windows, fs):
+    """(n_windows, n_blocks, block) view of each window in BLOCK_SEC blocks (tail dropped)"""
+    block = max(1, int(BLOCK_SEC * fs))
+    n_blocks = windows.shape[1] // block
+    return windows[:, :n_blocks * block].reshape(len(windows), n_blocks, block)
+
+
+def hf_power_ratio(raw, fs):
+    """Power above the ECG band (mains +-2 Hz excluded) relative to 1-40 Hz, per window"""
+    spectrum = np.abs(np.fft.rfft(raw - raw.mean(axis=1, keepdims=True), axis=1)) ** 2
+    freqs = np.fft.rfftfreq(raw.shape[1], 1 / fs)
+    band = (freqs >= ECG_BAND_HZ[0]) & (freqs <= ECG_BAND_HZ[1])
+    high = freqs > ECG_BAND_HZ[1]
+    for mains in MAINS_HZ:
+        high &= np.abs(freqs - mains) > MAINS_EXCLUDE_HZ
+    with np.errstate(all='ignore'):
+        return spectrum[:, high].sum(axis=1) / spectrum[:, band].sum(axis=1)
+
+
+def assess_windows(filtered, fs, thresholds, raw=None, mv_per_count=None):
+    """Score windows; returns (flags, metrics)
+
+    filtered      (n, window) windows as given to the model
+    raw           (n, window) same windows before filtering, in ADC counts
+    mv_per_count  ADC -> mV factor for the raw checks given in mV
+    thresholds    dict with flatline_mv, max_flat_fraction, max_clip_fraction,
+                  max_baseline_step_mv, min_kurtosis, max_hf_ratio, min_beats
+    flags is 0 for a usable window, else an OR of the check bits.
+    """
+    filtered = np.atleast_2d(np.asarray(filtered, dtype=np.float64))
+    flags = np.zeros(len(filtered), dtype=np.int64)
+    metrics = {}
+
+    with np.errstate(all='ignore'):
+        metrics['kurtosis'] = stats.kurtosis(filtered, axis=1, fisher=True) + 3
+        rhythm = rr_irregularity(filtered, fs)
+        metrics['beats'] = rhythm['beats']
+        metrics['heart_rate'] = rhythm['heart_rate']
+
+        flags[~(metrics['kurtosis'] >= thresholds['min_kurtosis'])] |= KURTOSIS
+        plausible = ((metrics['beats'] >= thresholds['min_beats'])
+                     & (metrics['heart_rate'] >= HEART_RATE_RANGE[0])
+                     & (metrics['heart_rate'] <= HEART_RATE_RANGE[1]))
+        flags[~plausible] |= R_PEAKS
+
+        if raw is not None:
+            raw = np.atleast_2d(np.asarray(raw, dtype=np.float64))
+            raw_mv = raw * (mv_per_count or 1.0)
+            blocks = _blocks(raw_mv, fs)
+
+            metrics['flat_fraction'] = np.mean(np.ptp(blocks, axis=2) < thresholds['flatline_mv'], axis=1)
+            metrics['clip_fraction'] = np.mean(np.abs(raw) >= 0.99 * ADC_FULL_SCALE, axis=1)
+            medians = np.median(blocks, axis=2)
+            metrics['baseline_step_mv'] = (np.max(np.abs(np.diff(medians, axis=1)), axis=1)
+                                           if medians.shape[1] > 1 else np.zeros(len(raw)))
+            metrics['hf_ratio'] = hf_power_ratio(raw, fs)
+
+            flags[metrics['flat_fraction'] > thresholds['max_flat_fraction']] |= FLATLINE
+            flags[metrics['clip_fraction'] > thresholds['max_clip_fraction']] |= CLIPPING
+            flags[metrics['baseline_step_mv'] > thresholds['max_baseline_step_mv']] |= BASELINE
+            # NaN ratio = no power in the ECG band at all, i.e. a flat window
+            flags[~(metrics['hf_ratio'] <= thresholds['max_hf_ratio'])] |= HF_NOISE
+
+    return flags, metrics
+
+
+def summarize_flags(flags):
+    """Excluded-window count and the number of windows failing each check"""
+    flags = np.asarray(flags)
+    return {
+        'excluded_windows': int(np.sum(flags != 0)),
+        'reasons': {name: int(np.sum((flags & bit) != 0)) for name, bit in CHECKS.items()}
+    }
+
+
+def describe_flags(flag):
+    return ', '.join(name for name, bit in CHECKS.items() if flag & bit) or 'ok'
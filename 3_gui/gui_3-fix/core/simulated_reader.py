@@ -0,0 +1,154 @@
+import time
+from fractions import Fraction
+import numpy as np
+from scipy.signal import resample_poly
+from PyQt5.QtCore import QThread, pyqtSignal
+from core.physionet_loader import PhysioNetLoader
+from core.resource_governor import apply_role
+from core.time_reconstruction import host_time
+
+
+def load_replay_signal(path, source_fs=None):
+    """ADC samples and sampling rate of a PhysioNet .dat, CSV or .ecgs file"""
+    if path.lower().endswith('.dat'):
+        signals, fs, success, message = PhysioNetLoader.load_physionet_record(path, sampling_rate=source_fs or 250)
+        if not success:
+            raise Exception(message)
+        return PhysioNetLoader.convert_to_shimmer_format(signals), fs
+
+    from core.offline_loader import get_capture_info, iter_capture_chunks
+    info = get_capture_info(path, source_fs)
+    values = np.concatenate([chunk for chunk, _ in iter_capture_chunks(path)])
+    return values.astype(np.float64), info['sampling_rate']
+
+
+def synthetic_ecg(fs, duration_sec=60, heart_rate=75, seed=0):
+    """Simple ECG-like test signal in Shimmer ADC units (no file needed)"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration_sec * fs)) / fs
+    beat_times = np.cumsum(rng.normal(60 / heart_rate, 0.03, int(duration_sec * heart_rate / 60) + 2))
+    ecg = np.zeros_like(t)
+    for center, width, amp in [(0.0, 0.012, 1.0), (-0.2, 0.04, 0.12), (0.25, 0.06, 0.25)]:
+        distance = t[:, None] - (beat_times[None, :] + center)
+        ecg += amp * np.exp(-(distance / width) ** 2).sum(axis=1)
+    ecg += 0.05 * np.sin(2 * np.pi * 0.3 * t) + 0.01 * rng.standard_normal(len(t))
+    return ecg * 20000 - 380000
+
+
+class SimulatedShimmerReader(QThread):
+    """Drop-in replacement for ShimmerReader that replays a recording
+
+    Samples are emitted through the same `data_received(value, timestamp)`
+    signal, in packets of `samples_per_packet`, at `speed` times real time.
+    Timestamps are on the device time scale (not compressed by `speed`) so
+    downstream time reconstruction still sees the configured rate;
+    host_arrival_time maps them back to the host clock for latency tracing.
+    Optional
+    delivery jitter (exponential, in ms) and random packet loss mimic the
+    Bluetooth link.
+    """
+
+    data_received = pyqtSignal(float, float)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, port=None, baudrate=None, channel=None, source_path=None, signal=None,
+                 source_fs=None, sampling_rate=128, speed=1.0, samples_per_packet=1,
+                 jitter_ms=0.0, packet_loss=0.0, loop=True, seed=0):
+        super().__init__()
+        self.port = port
+        self.source_path = source_path
+        self.source_signal = signal
+        self.source_fs = source_fs
+        self.sampling_rate = sampling_rate
+        self.speed = speed
+        self.samples_per_packet = max(1, int(samples_per_packet))
+        self.jitter_ms = jitter_ms
+        self.packet_loss = packet_loss
+        self.loop = loop
+        self.rng = np.random.default_rng(seed)
+        self.running = False
+        self.device_start = None
+        self.stats = {
+            'packets_sent': 0,
+            'packets_lost': 0,
+            'samples_emitted': 0,
+            'samples_lost': 0,
+            'max_schedule_lag_ms': 0.0
+        }
+
+    def host_arrival_time(self, timestamp):
+        """host_time() at which the sample stamped `timestamp` was scheduled for emission"""
+        if self.device_start is None:
+            return timestamp
+        return self.device_start + (timestamp - self.device_start) / self.speed
+
+    def _prepare_signal(self):
+        if self.source_signal is not None:
+            values, fs = np.asarray(self.source_signal, dtype=np.float64), self.source_fs or self.sampling_rate
+        elif self.source_path:
+            values, fs = load_replay_signal(self.source_path, self.source_fs)
+        else:
+            values, fs = synthetic_ecg(self.sampling_rate), self.sampling_rate
+
+        if fs != self.sampling_rate:
+            ratio = Fraction(self.sampling_rate / fs).limit_denominator(1000)
+            values = resample_poly(values, ratio.numerator, ratio.denominator)
+        return np.round(values)
+
+    def run(self):
+        apply_role('acquisition')
+        try:
+            values = self._prepare_signal()
+            n_packets = len(values) // self.samples_per_packet
+            if n_packets == 0:
+                raise Exception("Replay source is empty")
+
+            packet_period = self.samples_per_packet / self.sampling_rate
+            start = time.perf_counter()
+            self.device_start = device_start = host_time()
+            last_arrival = 0.0
+            k = 0
+            self.running = True
+            print(f"Simulated Shimmer: {self.sampling_rate} Hz x{self.speed:g}, "
+                  f"{self.samples_per_packet} samples/packet, jitter {self.jitter_ms} ms, loss {self.packet_loss:.1%}")
+
+            while self.running:
+                if k >= n_packets and not self.loop:
+                    break
+
+                # Device time at which packet k is complete, plus link delay; delivery stays in order
+                device_time = (k + 1) * packet_period
+                delay = self.rng.exponential(self.jitter_ms / 1000) if self.jitter_ms else 0.0
+                arrival = max(last_arrival, device_time + delay)
+                last_arrival = arrival
+
+                due = arrival / self.speed
+                now = time.perf_counter() - start
+                if due > now:
+                    time.sleep(due - now)
+                else:
+                    self.stats['max_schedule_lag_ms'] = max(self.stats['max_schedule_lag_ms'], (now - due) * 1000)
+
+                offset = (k % n_packets) * self.samples_per_packet
+                packet = values[offset:offset + self.samples_per_packet]
+                k += 1
+
+                if self.packet_loss and self.rng.random() < self.packet_loss:
+                    self.stats['packets_lost'] += 1
+                    self.stats['samples_lost'] += len(packet)
+                    continue
+
+                timestamp = device_start + arrival
+                for value in packet:
+                    self.data_received.emit(float(value), timestamp)
+                self.stats['packets_sent'] += 1
+                self.stats['samples_emitted'] += len(packet)
+
+        except Exception as e:
+            self.error_occurred.emit(f"Simulator error: {str(e)}")
+        finally:
+            self.running = False
+
+    def stop(self):
+        self.running = False
+        self.wait(1000)
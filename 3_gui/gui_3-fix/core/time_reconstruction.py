@@ -0,0 +1,272 @@
+"""Uniform time-grid reconstruction for Shimmer captures
+
+Samples are stamped on the host when their Bluetooth packet arrives, so
+several samples share one timestamp and arrival times carry delivery
+jitter. Delivery can only delay a packet, so the device clock is the lower
+envelope of (sample index, arrival time): a dropped packet lifts that
+envelope permanently, jitter only briefly. From the envelope we estimate
+the real sampling rate, locate gaps and the number of missing samples, and
+interpolate onto an evenly sampled grid, in one pass (reconstruct_uniform)
+or chunk by chunk from the packet arrays alone (estimate_clock +
+iter_resampled).
+
+Only NumPy/SciPy are used so the notebooks in 4_postprocessing can import
+this file directly without pulling in the GUI.
+"""
+
+import time
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.interpolate import CubicSpline
+
+# time.time() only ticks every ~15.6 ms on Windows; perf_counter is sub-microsecond everywhere
+_HOST_CLOCK_OFFSET = time.time() - time.perf_counter()
+
+
+def host_time():
+    """High-resolution wall-clock time for stamping packet arrivals"""
+    return _HOST_CLOCK_OFFSET + time.perf_counter()
+
+
+def packets_from_timestamps(timestamps):
+    """Per-sample arrival timestamps -> (packet start index, packet arrival time)"""
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    if len(timestamps) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    starts = np.flatnonzero(np.r_[True, np.diff(timestamps) != 0])
+    return starts, timestamps[starts]
+
+
+def estimate_timestamp_resolution(packet_time, tolerance=1e-4, max_diffs=4096):
+    """Tick of the clock that stamped packet_time, in seconds
+
+    Arrival times from a coarse clock are all multiples of its tick, so the
+    tick is the (tolerant) GCD of the differences between them; for a
+    fine-grained clock the GCD runs down to `tolerance`.
+    """
+    diffs = np.diff(np.unique(np.asarray(packet_time, dtype=np.float64)))[:max_diffs]
+    resolution = 0.0
+    for d in diffs[diffs > tolerance]:
+        a, b = max(resolution, d), min(resolution, d)
+        while b > tolerance:
+            r = a % b
+            a, b = b, (0.0 if r < tolerance or b - r < tolerance else r)
+        resolution = a
+        if resolution <= tolerance:
+            return tolerance
+    return resolution if resolution > 0 else tolerance
+
+
+def _forward_min(x, window):
+    """min(x[k:k+window]) for each k; the last window is reused for the tail"""
+    if len(x) <= window:
+        return np.full(len(x), x.min())
+    baseline = sliding_window_view(x, window).min(axis=1)
+    return np.r_[baseline, np.full(window - 1, baseline[-1])]
+
+
+def _detect_gaps(packet_end, packet_time, fs, window, gap_factor, gap_min_sec, resolution=0.0,
+                 merge_packets=3):
+    """Missing samples before each packet, from permanent rises of the envelope"""
+    period = 1.0 / fs
+    residual = packet_time - packet_end / fs
+    baseline = _forward_min(residual, window)
+    jumps = np.diff(baseline, prepend=baseline[0])
+
+    # One drop can lift the envelope over a few neighbouring packets; merge those steps
+    missing = np.zeros(len(packet_end), dtype=np.int64)
+    rising = np.flatnonzero(jumps > 0.15 * period)
+    if len(rising):
+        group_start = np.flatnonzero(np.r_[True, np.diff(rising) > merge_packets])
+        group_end = np.r_[group_start[1:], len(rising)] - 1
+        total = np.add.reduceat(jumps[rising], group_start)
+        # A step of one clock tick is quantization, not a dropped packet
+        threshold = max(gap_factor * period, gap_min_sec, 2 * resolution)
+        is_gap = total > threshold
+        missing[rising[group_end[is_gap]]] = np.round(total[is_gap] * fs).astype(np.int64)
+    return missing, residual - baseline
+
+
+def estimate_clock(packet_start, packet_time, n, fs_nominal=None, gap_factor=0.6, gap_min_sec=0.0,
+                   envelope_sec=1.0, timestamp_resolution=None):
+    """Device clock of a capture from its packet arrival times alone
+
+    Needs only the packet arrays, not the samples, so long recordings can be
+    resampled afterwards chunk by chunk (iter_resampled). Arguments are those
+    of reconstruct_uniform; n is the number of samples.
+    """
+    packet_start = np.asarray(packet_start, dtype=np.int64)
+    packet_time = np.asarray(packet_time, dtype=np.float64)
+
+    if n < 2 or len(packet_start) < 2:
+        raise ValueError("Not enough samples to reconstruct a time grid")
+
+    counts = np.diff(np.r_[packet_start, n])
+    packet_end = packet_start + counts - 1
+
+    # Lower envelope of arrival time vs. sample index gives the device clock
+    if fs_nominal is None:
+        fs_nominal = (packet_end[-1] - packet_end[0]) / (packet_time[-1] - packet_time[0])
+    fs_est = float(fs_nominal)
+    samples_per_packet = float(np.median(counts))
+    if timestamp_resolution is None:
+        timestamp_resolution = estimate_timestamp_resolution(packet_time)
+    window = max(8, int(round(envelope_sec * fs_est / samples_per_packet)))
+
+    for _ in range(2):
+        missing, excess = _detect_gaps(packet_end, packet_time, fs_est, window, gap_factor, gap_min_sec,
+                                       timestamp_resolution)
+        missing_cum = np.cumsum(missing)
+        corrected_end = packet_end + missing_cum
+
+        # Refit the clock on packets delivered close to the envelope
+        prompt = excess <= np.percentile(excess, 25)
+        slope, _ = np.polyfit(corrected_end[prompt], packet_time[prompt], 1)
+        fs_est = 1.0 / slope
+
+    offsets = packet_time - corrected_end / fs_est
+    t0 = np.percentile(offsets, 5)
+    jitter = offsets - t0
+
+    clock = {
+        'n': int(n),
+        'packet_start': packet_start,
+        'missing': missing,
+        'missing_cum': missing_cum,
+        'origin': int(missing_cum[0]),
+        'fs_nominal': float(fs_nominal),
+        'fs_estimated': float(fs_est),
+        'dropped_samples': int(missing_cum[-1]),
+        'n_packets': len(packet_start),
+        'samples_per_packet': samples_per_packet,
+        'clock_start': float(t0),
+        'timestamp_resolution_ms': float(timestamp_resolution * 1000),
+        'jitter_ms_p50': float(np.median(jitter) * 1000),
+        'jitter_ms_p95': float(np.percentile(jitter, 95) * 1000)
+    }
+
+    # Holes in the sample clock: between the last sample before and the first after each gap
+    gap_packets = np.flatnonzero(missing)
+    clock['gap_start_time'] = sample_times(clock, packet_start[gap_packets] - 1)
+    clock['gap_end_time'] = sample_times(clock, packet_start[gap_packets])
+    clock['gaps'] = [{
+        'start_time': float(start),
+        'duration_sec': float(end - start),
+        'missing_samples': int(missing[k])
+    } for k, start, end in zip(gap_packets, clock['gap_start_time'], clock['gap_end_time'])]
+    return clock
+
+
+def sample_times(clock, index):
+    """Reconstructed time (seconds from the first sample) of the given sample indices"""
+    index = np.asarray(index, dtype=np.int64)
+    packet = np.maximum(np.searchsorted(clock['packet_start'], index, side='right') - 1, 0)
+    return (index + clock['missing_cum'][packet] - clock['origin']) / clock['fs_estimated']
+
+
+def output_length(clock, fs_target):
+    return int(np.floor(sample_times(clock, clock['n'] - 1) * fs_target)) + 1
+
+
+def iter_resampled(values, clock, fs_target=250, method='cubic', fill_gaps=True, chunk_samples=65536,
+                   margin_samples=256):
+    """Yield (signal, valid_mask, fraction done) of the uniform grid, chunk by chunk
+
+    values only needs slicing (e.g. a np.memmap), so a recording never has to
+    be in memory at once. Each chunk is interpolated with margin_samples of
+    context on both sides; a cubic spline's end effects decay within a few
+    samples, so the chunks join like a whole-signal spline.
+    """
+    n = clock['n']
+    n_out = output_length(clock, fs_target)
+    gap_start, gap_end = clock['gap_start_time'], clock['gap_end_time']
+    grid_pos = 0
+
+    for start in range(0, n, chunk_samples):
+        stop = min(n, start + chunk_samples)
+        lo, hi = max(0, start - margin_samples), min(n, stop + margin_samples)
+        t = sample_times(clock, np.arange(lo, hi))
+        v = np.asarray(values[lo:hi], dtype=np.float64)
+
+        # Grid points up to (not including) the first sample of the next chunk
+        grid_end = n_out if stop == n else int(np.ceil(sample_times(clock, stop) * fs_target))
+        grid = np.arange(grid_pos, max(grid_pos, grid_end)) / fs_target
+        grid_pos = max(grid_pos, grid_end)
+
+        if method == 'cubic':
+            output = CubicSpline(t, v)(grid)
+        elif method == 'linear':
+            output = np.interp(grid, t, v)
+        else:
+            raise ValueError(f"Unknown interpolation method: {method}")
+
+        # Grid points that fall inside a gap
+        valid_mask = np.ones(len(grid), dtype=bool)
+        if len(gap_start):
+            k = np.searchsorted(gap_start, grid, side='left') - 1
+            valid_mask = ~((k >= 0) & (grid < gap_end[np.maximum(k, 0)]))
+            if not fill_gaps:
+                output[~valid_mask] = np.nan
+            elif method == 'cubic':
+                # A spline overshoots across long holes; bridge them linearly instead
+                output[~valid_mask] = np.interp(grid[~valid_mask], t, v)
+
+        yield output, valid_mask, stop / n
+
+
+def reconstruct_uniform(values, packet_start, packet_time, fs_nominal=None, fs_target=250,
+                        method='cubic', gap_factor=0.6, gap_min_sec=0.0, envelope_sec=1.0,
+                        fill_gaps=True, timestamp_resolution=None):
+    """Resample packet-stamped samples onto an evenly spaced grid
+
+    Args:
+        values: samples in arrival order
+        packet_start: index of the first sample of each packet
+        packet_time: host arrival time of each packet (seconds)
+        fs_nominal: configured device rate; estimated from the data if None
+        fs_target: output sampling rate
+        method: 'cubic' or 'linear' interpolation
+        gap_factor: envelope rise, in sample periods, counted as dropped samples
+        gap_min_sec: lower bound for the gap threshold in seconds
+        timestamp_resolution: tick of the arrival clock in seconds; estimated
+            if None. Gaps must be at least two ticks
+        envelope_sec: look-ahead used for the lower envelope (no gaps are
+            detected in the last envelope_sec of the capture)
+        fill_gaps: interpolate across gaps (True) or leave NaN (False)
+
+    Returns:
+        dict with 'signal', 'time' (seconds from the first sample), 'sample_time'
+        (reconstructed time of each input sample), 'fs', 'fs_estimated',
+        'valid_mask', 'gaps' and summary statistics
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    clock = estimate_clock(packet_start, packet_time, n, fs_nominal, gap_factor, gap_min_sec, envelope_sec,
+                           timestamp_resolution)
+
+    # One chunk over the whole capture
+    output, valid_mask, _ = next(iter_resampled(values, clock, fs_target, method, fill_gaps, chunk_samples=n))
+
+    return {
+        'signal': output,
+        'time': np.arange(len(output)) / fs_target,
+        'sample_time': sample_times(clock, np.arange(n)),
+        'fs': fs_target,
+        'fs_nominal': clock['fs_nominal'],
+        'fs_estimated': clock['fs_estimated'],
+        'valid_mask': valid_mask,
+        'gaps': clock['gaps'],
+        'dropped_samples': clock['dropped_samples'],
+        'n_packets': clock['n_packets'],
+        'samples_per_packet': clock['samples_per_packet'],
+        'clock_start': clock['clock_start'],
+        'timestamp_resolution_ms': clock['timestamp_resolution_ms'],
+        'jitter_ms_p50': clock['jitter_ms_p50'],
+        'jitter_ms_p95': clock['jitter_ms_p95']
+    }
+
+
+def reconstruct_from_timestamps(timestamps, values, **kwargs):
+    """Same as reconstruct_uniform for per-sample timestamps (e.g. shimmer_data.csv)"""
+    packet_start, packet_time = packets_from_timestamps(timestamps)
+    return reconstruct_uniform(values, packet_start, packet_time, **kwargs)
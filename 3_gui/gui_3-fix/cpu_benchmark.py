@@ -0,0 +1,224 @@
+"""
+Benchmark CPU governor: throughput inference vs jitter frame UI
+Setiap setting dijalankan di process baru (thread pool TensorFlow hanya bisa
+diatur sekali per process). Di dalamnya:
+- loop "UI" mengulang pekerjaan plot (filter 10 s sinyal) setiap --frame-ms
+  dan mengukur jitter interval frame
+- inference berjalan terus dengan batch window acak, di worker process
+  (seperti ANALYSIS_IN_PROCESS) atau di thread yang sama process-nya
+Dilaporkan windows/detik dan jitter frame p50/p95/max per setting.
+
+Contoh:
+    python cpu_benchmark.py --intra 1 2 4 --pin
+    python cpu_benchmark.py --modes process thread --duration 15
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import threading
+import time
+
+import numpy as np
+
+from core.shimmer_config import ShimmerConfig
+
+
+def apply_settings(settings):
+    """Override the governor entries of ShimmerConfig for this process"""
+    ShimmerConfig.CPU_GOVERNOR = settings['governor']
+    ShimmerConfig.TF_INTRA_OP_THREADS = settings.get('intra', 0)
+    ShimmerConfig.CPU_AFFINITY_UI = settings.get('ui_cores')
+    ShimmerConfig.CPU_AFFINITY_INFERENCE = settings.get('inference_cores')
+    ShimmerConfig.ANALYSIS_IN_PROCESS = settings['mode'] == 'process'
+
+
+def run_inference(model_path, batch, duration, ready, start, results):
+    from core.model_handler import ModelHandler
+
+    model_handler = ModelHandler()
+    success, message = model_handler.load_model(model_path)
+    if not success:
+        results.put({'error': message})
+        ready.set()
+        return
+
+    rng = np.random.default_rng(0)
+    windows = rng.standard_normal((batch, ShimmerConfig.WINDOW_SIZE_SAMPLES)).astype(np.float32)
+    model_handler.predict(windows)  # warm-up: builds the graph and thread pools
+    ready.set()
+    start.wait()
+
+    latencies = []
+    end_time = time.perf_counter() + duration
+    while time.perf_counter() < end_time:
+        t0 = time.perf_counter()
+        model_handler.predict(windows)
+        latencies.append(time.perf_counter() - t0)
+
+    results.put({
+        'windows': len(latencies) * batch,
+        'batch_latency_ms_p50': float(np.percentile(latencies, 50) * 1000),
+        'batch_latency_ms_p95': float(np.percentile(latencies, 95) * 1000)
+    })
+
+
+def inference_process(settings, model_path, batch, duration, ready, start, results):
+    from core.resource_governor import apply_role
+
+    apply_settings(settings)
+    apply_role('inference')
+    run_inference(model_path, batch, duration, ready, start, results)
+
+
+def ui_frames(duration, frame_ms):
+    """Plot-like work every frame_ms; returns (interval jitter ms, work ms)"""
+    from core.preprocessor import ECGPreprocessor
+
+    preprocessor = ECGPreprocessor(fs=ShimmerConfig.MODEL_SAMPLING_RATE)
+    data = np.random.default_rng(1).standard_normal(ShimmerConfig.WINDOW_SIZE_SAMPLES)
+    period = frame_ms / 1000
+
+    jitter, work = [], []
+    next_frame = time.perf_counter() + period
+    end_time = time.perf_counter() + duration
+    while next_frame < end_time:
+        delay = next_frame - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        t0 = time.perf_counter()
+        jitter.append(max(0.0, t0 - next_frame) * 1000)
+        preprocessor.preprocess_for_plot(data)
+        work.append((time.perf_counter() - t0) * 1000)
+        # Like QTimer: a late frame is not made up for, the schedule moves on
+        next_frame = max(next_frame + period, time.perf_counter())
+    return np.array(jitter), np.array(work)
+
+
+def run_case(settings, args, out_queue):
+    """One benchmark setting, in its own process"""
+    from core.resource_governor import apply_role, describe, configure_tensorflow, pin_current_thread
+
+    apply_settings(settings)
+    ctx = mp.get_context('spawn')
+    ready, start, results = ctx.Event(), ctx.Event(), ctx.Queue()
+
+    if settings['mode'] == 'process':
+        worker = ctx.Process(target=inference_process,
+                             args=(settings, args.model, args.batch, args.duration, ready, start, results))
+        worker.start()
+        apply_role('ui')
+    else:
+        configure_tensorflow()
+
+        def inference_thread():
+            pin_current_thread('inference')
+            run_inference(args.model, args.batch, args.duration, ready, start, results)
+
+        worker = threading.Thread(target=inference_thread, daemon=True)
+        worker.start()
+
+    ready.wait(timeout=300)
+
+    # Reference: UI frames with inference idle
+    idle_jitter, idle_work = ui_frames(min(3.0, args.duration), args.frame_ms)
+    if settings['mode'] == 'thread':
+        pin_current_thread('ui')
+
+    start.set()
+    jitter, work = ui_frames(args.duration, args.frame_ms)
+    inference = results.get(timeout=args.duration + 120)
+    worker.join(timeout=10)
+
+    out_queue.put({
+        **settings,
+        'governor_state': describe(),
+        'windows_per_sec': inference.get('windows', 0) / args.duration,
+        **{k: v for k, v in inference.items() if k != 'windows'},
+        'frame_jitter_ms_p50': float(np.percentile(jitter, 50)),
+        'frame_jitter_ms_p95': float(np.percentile(jitter, 95)),
+        'frame_jitter_ms_max': float(np.max(jitter)),
+        'frame_work_ms_p95': float(np.percentile(work, 95)),
+        'idle_frame_jitter_ms_p95': float(np.percentile(idle_jitter, 95)),
+        'idle_frame_work_ms_p95': float(np.percentile(idle_work, 95))
+    })
+
+
+def build_settings(args):
+    from core.resource_governor import thread_pinning_supported
+
+    n_cores = os.cpu_count() or 1
+    pin = args.pin and n_cores > 1 and thread_pinning_supported()
+    if args.pin and not pin:
+        print("Warning: thread pinning is not supported here (single core, or no pywin32 on Windows); "
+              "skipping the pinned settings")
+    settings = []
+    for mode in args.modes:
+        settings.append({'name': 'tf-default', 'mode': mode, 'governor': False})
+        for intra in args.intra:
+            settings.append({'name': f'intra={intra}', 'mode': mode, 'governor': True, 'intra': intra})
+            if pin:
+                # Core 0 for the UI, the next `intra` cores for inference
+                inference_cores = list(range(1, min(n_cores, intra + 1)))
+                settings.append({'name': f'intra={intra} pinned', 'mode': mode, 'governor': True,
+                                 'intra': intra, 'ui_cores': [0], 'inference_cores': inference_cores})
+    return settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference throughput vs UI frame jitter per CPU governor setting")
+    parser.add_argument("--model", default=ShimmerConfig.DEFAULT_MODEL_PATH)
+    parser.add_argument("--intra", type=int, nargs='+', default=[1, 2, max(1, (os.cpu_count() or 1) - 2)],
+                        help="TF intra-op thread counts to compare")
+    parser.add_argument("--pin", action='store_true', help="also run each setting with UI/inference core pinning")
+    parser.add_argument("--modes", nargs='+', choices=['process', 'thread'], default=['process'],
+                        help="inference in a worker process (ANALYSIS_IN_PROCESS) or a thread of the UI process")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per setting")
+    parser.add_argument("--batch", type=int, default=64, help="windows per predict call")
+    parser.add_argument("--frame-ms", type=float, default=1000 / ShimmerConfig.PLAYBACK_FPS)
+    parser.add_argument("--output", default="cpu_benchmark_results.json")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        print(f"Error: Model file not found at {args.model}")
+        return
+
+    settings = build_settings(args)
+    print("=== CPU Governor Benchmark ===")
+    print(f"{os.cpu_count()} cores, {len(settings)} settings, {args.duration:g}s each, "
+          f"frame every {args.frame_ms:g} ms, batch {args.batch}")
+
+    ctx = mp.get_context('spawn')
+    results = []
+    for setting in settings:
+        out_queue = ctx.Queue()
+        case = ctx.Process(target=run_case, args=(setting, args, out_queue))
+        case.start()
+        try:
+            result = out_queue.get(timeout=args.duration * 2 + 600)
+        except Exception as e:
+            print(f"  {setting['mode']:<8} {setting['name']:<20} failed: {e}")
+            case.terminate()
+            continue
+        case.join()
+        results.append(result)
+        print(f"  {result['mode']:<8} {result['name']:<20} {result['windows_per_sec']:>8.1f} windows/s, "
+              f"frame jitter p95 {result['frame_jitter_ms_p95']:.1f} ms (idle {result['idle_frame_jitter_ms_p95']:.1f})")
+
+    print("\n" + "="*96)
+    print(f"{'Mode':<8} {'Setting':<20} {'Win/s':>8} {'Batch p95':>10} "
+          f"{'Jit p50':>8} {'Jit p95':>8} {'Jit max':>8} {'Work p95':>9}")
+    print("="*96)
+    for r in results:
+        print(f"{r['mode']:<8} {r['name']:<20} {r['windows_per_sec']:>8.1f} "
+              f"{r.get('batch_latency_ms_p95', float('nan')):>10.1f} {r['frame_jitter_ms_p50']:>8.1f} "
+              f"{r['frame_jitter_ms_p95']:>8.1f} {r['frame_jitter_ms_max']:>8.1f} {r['frame_work_ms_p95']:>9.2f}")
+
+    with open(args.output, 'w') as f:
+        json.dump({'config': vars(args), 'results': results}, f, indent=2)
+    print(f"\n✓ Results saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
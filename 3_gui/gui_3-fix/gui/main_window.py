@@ -7,7 +7,12 @@ from core.preprocessor import ECGPreprocessor
 from core.model_handler import ModelHandler
 from core.serial_handler import SerialHandler, ShimmerReader
 from core.batch_processor import RecordingBuffer, BatchProcessor
+from core.recording_store import RecordingSpillFile
 from core.physionet_loader import PhysioNetLoader
+from core.offline_loader import OfflineCaptureProcessor, RecordingProcessor, get_capture_info
+from core.analysis_worker import AnalysisWorker, ProcessBatchProcessor
+from core.latency_tracer import LatencyTracer
+from core.playback_engine import PlaybackEngine
 from core.shimmer_config import ShimmerConfig
 from pathlib import Path
 import numpy as np
@@ -20,6 +25,7 @@ class MainWindow(QMainWindow):
         
         self.preprocessor = ECGPreprocessor(fs=ShimmerConfig.MODEL_SAMPLING_RATE)
         self.model_handler = ModelHandler()
+        self.model_path = None
         
         # Auto-load model
         self.auto_load_model()
@@ -33,9 +39,16 @@ class MainWindow(QMainWindow):
         self.is_physionet_mode = False
         self.physionet_data = None
         self.physionet_fs = None
-        self.physionet_playback_index = 0
+        self.physionet_mv_per_count = None
+        self.playback_engine = None
+
+        # Saved Shimmer capture mode (CSV / .ecgs)
+        self.is_capture_mode = False
+        self.capture_info = None
 
         self.shimmer_reader = None
+        # Swapped for SimulatedShimmerReader by simulate_load.py
+        self.reader_factory = ShimmerReader
         self.batch_processor = None
         
         self.is_recording = False
@@ -53,11 +66,47 @@ class MainWindow(QMainWindow):
         self.fs_viz = ShimmerConfig.MODEL_SAMPLING_RATE
 
         self.mv_values_buffer = []
+
+        self.latency_tracer = LatencyTracer(
+            capacity=ShimmerConfig.LATENCY_TRACE_CAPACITY,
+            enabled=ShimmerConfig.LATENCY_TRACING,
+            buffer_every=ShimmerConfig.LATENCY_BUFFER_EVERY
+        )
+        self._status_updates = 0
         
         self.init_ui()
         self.apply_styles()
         self.setup_timers()
+
+        # Offer crashed sessions once the window is up
+        QTimer.singleShot(0, self.check_recovered_sessions)
     
+    def check_recovered_sessions(self):
+        """Offer to analyze recordings left behind by a crashed session"""
+        unfinished = RecordingSpillFile.find_unfinished(ShimmerConfig.RECORDING_SPILL_DIR)
+        for path, header in unfinished:
+            started = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(header['created_ns'] / 1e9))
+            duration_min = header['duration_sec'] / 60
+            reply = QMessageBox.question(
+                self,
+                'Recover Recording',
+                f"Found an unfinished recording:\n\n"
+                f"Started: {started}\n"
+                f"Samples: {header['count']:,} @ {header['sampling_rate']} Hz\n"
+                f"Duration: {duration_min:.2f} minutes\n\n"
+                f"Analyze it now? Choosing No discards it.",
+                QMessageBox.Yes | QMessageBox.No,
+                QMessageBox.Yes
+            )
+
+            if reply == QMessageBox.Yes and self.model_handler.model is not None and not self.is_processing:
+                print(f"Recovering recording: {path}")
+                self.recording_buffer.close()
+                self.recording_buffer = RecordingBuffer.recover(path)
+                self.start_batch_processing()
+            elif reply == QMessageBox.No:
+                RecordingSpillFile.recover(path).close(delete=True)
+
     def auto_load_model(self):
         """Auto-load model from default path"""
         try:
@@ -66,6 +115,7 @@ class MainWindow(QMainWindow):
                 print(f"Auto-loading model from: {model_path}")
                 success, message = self.model_handler.load_model(model_path)
                 if success:
+                    self.model_path = model_path
                     print("Model loaded successfully!")
                 else:
                     print(f"Failed to load model: {message}")
@@ -74,6 +124,25 @@ class MainWindow(QMainWindow):
         except Exception as e:
             print(f"Error auto-loading model: {e}")
         
+    def create_batch_processor(self, recorded_data=None, original_fs=128, spill_path=None, file_path=None,
+                               mv_per_count=None):
+        """Analysis thread for in-memory samples (recorded_data), a recording's spill file (spill_path)
+        or a saved capture (file_path); mv_per_count scales recorded_data when it isn't Shimmer ADC counts"""
+        common = dict(original_fs=original_fs,
+                      target_fs=ShimmerConfig.MODEL_SAMPLING_RATE,
+                      window_size=ShimmerConfig.WINDOW_SIZE_SAMPLES)
+
+        if ShimmerConfig.ANALYSIS_IN_PROCESS and self.model_path:
+            return ProcessBatchProcessor(recorded_data=recorded_data, spill_path=spill_path,
+                                         file_path=file_path, model_path=self.model_path,
+                                         mv_per_count=mv_per_count, **common)
+        if file_path:
+            return OfflineCaptureProcessor(file_path, self.preprocessor, self.model_handler, **common)
+        if spill_path:
+            return RecordingProcessor(spill_path, self.preprocessor, self.model_handler, **common)
+        return BatchProcessor(recorded_data, self.preprocessor, self.model_handler,
+                              mv_per_count=mv_per_count, **common)
+
     def init_ui(self):
         self.setWindowTitle("AF Detection System - Shimmer ECG")
         self.setGeometry(100, 100, 1600, 900)
@@ -136,6 +205,7 @@ class MainWindow(QMainWindow):
         self.source_combo.setFixedHeight(35)
         self.source_combo.addItem("Shimmer Device", "shimmer")
         self.source_combo.addItem("PhysioNet File", "physionet")
+        self.source_combo.addItem("Shimmer Capture File", "capture")
         self.source_combo.currentIndexChanged.connect(self.on_source_changed)
         source_layout.addWidget(self.source_combo)
 
@@ -171,10 +241,63 @@ class MainWindow(QMainWindow):
         self.load_file_btn.clicked.connect(self.load_physionet_file)
         physionet_layout.addWidget(self.load_file_btn)
 
+        speed_label = QLabel("Playback Speed:")
+        speed_label.setStyleSheet("font-weight: normal; font-size: 12px; margin-top: 5px;")
+        physionet_layout.addWidget(speed_label)
+
+        self.playback_speed_combo = QComboBox()
+        self.playback_speed_combo.setFixedHeight(35)
+        for speed in ShimmerConfig.PLAYBACK_SPEEDS:
+            self.playback_speed_combo.addItem(f"{speed:g}x", speed)
+        self.playback_speed_combo.setCurrentIndex(ShimmerConfig.PLAYBACK_SPEEDS.index(1))
+        self.playback_speed_combo.currentIndexChanged.connect(self.on_playback_speed_changed)
+        physionet_layout.addWidget(self.playback_speed_combo)
+
+        self.playback_position_label = QLabel("00:00 / 00:00")
+        self.playback_position_label.setStyleSheet("font-weight: normal; font-size: 12px; margin-top: 5px;")
+        physionet_layout.addWidget(self.playback_position_label)
+
+        # Slider in seconds; seeking only moves the display, classification covers the whole file
+        self.playback_slider = QSlider(Qt.Horizontal)
+        self.playback_slider.setEnabled(False)
+        self.playback_slider.sliderReleased.connect(self.on_playback_seek)
+        physionet_layout.addWidget(self.playback_slider)
+
         self.physionet_group.setLayout(physionet_layout)
         self.physionet_group.setVisible(False)
         layout.addWidget(self.physionet_group)
 
+        # Saved Shimmer capture (CSV from ambil_data.py or .ecgs session)
+        self.capture_group = QGroupBox("Shimmer Capture File")
+        self.capture_group.setObjectName("groupBox")
+        capture_layout = QVBoxLayout()
+
+        self.capture_path_label = QLabel("No file loaded")
+        self.capture_path_label.setStyleSheet("color: #64748b; font-size: 11px; padding: 5px; word-wrap: break-word;")
+        self.capture_path_label.setWordWrap(True)
+        capture_layout.addWidget(self.capture_path_label)
+
+        capture_fs_label = QLabel("Sampling Rate (Hz, CSV only):")
+        capture_fs_label.setStyleSheet("font-weight: normal; font-size: 12px; margin-top: 5px;")
+        capture_layout.addWidget(capture_fs_label)
+
+        self.capture_fs_combo = QComboBox()
+        self.capture_fs_combo.setFixedHeight(35)
+        for rate in ShimmerConfig.AVAILABLE_SAMPLING_RATES:
+            self.capture_fs_combo.addItem(f"{rate} Hz", rate)
+        default_index = self.capture_fs_combo.findData(ShimmerConfig.DEFAULT_SAMPLING_RATE)
+        if default_index >= 0:
+            self.capture_fs_combo.setCurrentIndex(default_index)
+        capture_layout.addWidget(self.capture_fs_combo)
+
+        self.load_capture_btn = self.create_button("📁 Load Capture File", "#8b5cf6")
+        self.load_capture_btn.clicked.connect(self.load_capture_file)
+        capture_layout.addWidget(self.load_capture_btn)
+
+        self.capture_group.setLayout(capture_layout)
+        self.capture_group.setVisible(False)
+        layout.addWidget(self.capture_group)
+
         
         # Serial Port
         self.port_group = QGroupBox("Serial Port")
@@ -436,6 +559,12 @@ class MainWindow(QMainWindow):
         self.comp_time_label.setWordWrap(True)
         self.comp_time_label.setStyleSheet("background: #f1f5f9; padding: 15px; border-radius: 5px; font-size: 14px; color: #475569; font-weight: bold;")
         comp_layout.addWidget(self.comp_time_label)
+
+        # Debug panel: end-to-end latency per stage
+        self.latency_label = QLabel("Latency: --")
+        self.latency_label.setStyleSheet("background: #f1f5f9; padding: 10px; border-radius: 5px; font-family: monospace; font-size: 11px; color: #475569;")
+        self.latency_label.setVisible(ShimmerConfig.LATENCY_DEBUG_PANEL)
+        comp_layout.addWidget(self.latency_label)
         
         comp_group.setLayout(comp_layout)
         layout.addWidget(comp_group)
@@ -530,6 +659,8 @@ class MainWindow(QMainWindow):
     
     def on_source_changed(self, index):
         source = self.source_combo.currentData()
+        self.is_capture_mode = source == "capture"
+        self.capture_group.setVisible(self.is_capture_mode)
         if source == "physionet":
             self.is_physionet_mode = True
             self.physionet_group.setVisible(True)
@@ -537,6 +668,12 @@ class MainWindow(QMainWindow):
             self.sampling_group.setVisible(False)
             self.start_btn.setText("▶ Process File")
             self.plot_title_label.setText("Preprocessed ECG Signal (First 10 seconds)")
+        elif source == "capture":
+            self.is_physionet_mode = False
+            self.physionet_group.setVisible(False)
+            self.port_group.setVisible(False)
+            self.sampling_group.setVisible(False)
+            self.start_btn.setText("▶ Process File")
         else:
             self.is_physionet_mode = False
             self.physionet_group.setVisible(False)
@@ -558,6 +695,8 @@ class MainWindow(QMainWindow):
                 self.physionet_data = signals
                 self.physionet_fs = fs
                 self.physionet_data = PhysioNetLoader.convert_to_shimmer_format(self.physionet_data)
+                # The raw SQI checks need the record's own scale, not the Shimmer ADC factor
+                self.physionet_mv_per_count = PhysioNetLoader.mv_per_count(PhysioNetLoader.read_adc_gain(file_path))
                 duration_min = len(signals) / fs / 60
                 self.file_path_label.setText(f"✓ Loaded: {Path(file_path).name}\n{len(signals):,} samples @ {fs} Hz\nDuration: {duration_min:.2f} min")
                 self.file_path_label.setStyleSheet("color: #10b981; font-size: 11px; padding: 5px; word-wrap: break-word;")
@@ -571,6 +710,66 @@ class MainWindow(QMainWindow):
                 QMessageBox.critical(self, "Load Error", message)
             self.check_ready_state()
 
+    def load_capture_file(self):
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Load Shimmer Capture", "",
+            "Shimmer Captures (*.csv *.ecgs);;All Files (*)"
+        )
+        if file_path:
+            try:
+                self.capture_info = get_capture_info(file_path, self.capture_fs_combo.currentData())
+                size_mb = self.capture_info['file_size'] / 1024 / 1024
+                self.capture_path_label.setText(
+                    f"✓ Loaded: {Path(file_path).name}\n{size_mb:.1f} MB @ {self.capture_info['sampling_rate']} Hz"
+                )
+                self.capture_path_label.setStyleSheet("color: #10b981; font-size: 11px; padding: 5px; word-wrap: break-word;")
+            except Exception as e:
+                self.capture_info = None
+                self.capture_path_label.setText(f"✗ {e}")
+                self.capture_path_label.setStyleSheet("color: #ef4444; font-size: 11px; padding: 5px; word-wrap: break-word;")
+                QMessageBox.critical(self, "Load Error", str(e))
+            self.check_ready_state()
+
+    def process_capture_file(self):
+        """Classify a saved Shimmer capture, streamed from disk in chunks"""
+        print("\n=== PROCESSING SHIMMER CAPTURE ===")
+
+        if self.capture_info is None:
+            QMessageBox.warning(self, "Error", "No file loaded")
+            return
+
+        self.processing_results = None
+        self.final_classification_label.setText("--")
+        self.af_count_label.setText("AF: --")
+        self.normal_count_label.setText("Normal: --")
+        self.total_segments_label.setText("Total: -- segments")
+        self.comp_time_label.setText("Computation Time:\n--")
+        self.avg_voltage_label.setText("-- mV")
+
+        self.start_btn.setEnabled(False)
+        self.load_capture_btn.setEnabled(False)
+        self.source_combo.setEnabled(False)
+
+        self.connection_status.setText("● Processing File...")
+        self.connection_status.setStyleSheet("color: #f59e0b; font-weight: bold; font-size: 13px;")
+
+        self.is_processing = True
+        self.processing_widget.setVisible(True)
+        self.processing_progress_bar.setValue(0)
+        self.processing_status_label.setText("Initializing...")
+
+        print(f"Processing {self.capture_info['path']} @ {self.capture_info['sampling_rate']} Hz...")
+
+        self.batch_processor = self.create_batch_processor(
+            file_path=self.capture_info['path'],
+            original_fs=self.capture_info['sampling_rate']
+        )
+
+        self.batch_processor.progress_update.connect(self.on_processing_progress)
+        self.batch_processor.processing_complete.connect(self.on_processing_complete)
+        self.batch_processor.error_occurred.connect(self.on_processing_error)
+        self.batch_processor.start()
+
     def process_physionet_file(self):
         """Process PhysioNet file with visualization"""
         print("\n=== PROCESSING PHYSIONET FILE ===")
@@ -603,7 +802,6 @@ class MainWindow(QMainWindow):
         
         # ✅ TAMBAH INI: Setup untuk visualisasi
         self.is_recording = True  # Aktifkan mode "recording" untuk plot
-        self.physionet_playback_index = 0
         self.processed_data_buffer.clear()
         self.time_buffer.clear()
         self.current_time = 0
@@ -613,11 +811,27 @@ class MainWindow(QMainWindow):
             pen=pg.mkPen(color='#2C7BE5', width=1.5)
         )
         
-        # ✅ Start visualization timer
-        self.viz_timer.start(50)
+        # Playback berjalan di thread sendiri; GUI hanya mengambil frame terbaru
+        self.stop_playback()
+        self.playback_engine = PlaybackEngine(
+            raw_mv,
+            self.physionet_fs,
+            self.preprocessor,
+            target_fs=ShimmerConfig.MODEL_SAMPLING_RATE,
+            speed=self.playback_speed_combo.currentData(),
+            display_window=self.display_window
+        )
+        self.playback_engine.position_changed.connect(self.on_playback_position)
+        self.playback_engine.playback_finished.connect(self.on_playback_finished)
+        self.playback_engine.error_occurred.connect(lambda msg: print(msg))
+        self.playback_slider.setRange(0, int(self.playback_engine.duration))
+        self.playback_slider.setValue(0)
+        self.playback_slider.setEnabled(True)
+        self.playback_engine.start()
+
         self.physionet_viz_timer = QTimer()
         self.physionet_viz_timer.timeout.connect(self.playback_physionet_data)
-        self.physionet_viz_timer.start(50)  # Update setiap 50ms
+        self.physionet_viz_timer.start(int(1000 / ShimmerConfig.PLAYBACK_FPS))
         
         # Start batch processing (background)
         self.is_processing = True
@@ -627,13 +841,10 @@ class MainWindow(QMainWindow):
         
         print(f"Processing {len(self.physionet_data)} samples from PhysioNet file...")
         
-        self.batch_processor = BatchProcessor(
+        self.batch_processor = self.create_batch_processor(
             recorded_data=self.physionet_data,
-            preprocessor=self.preprocessor,
-            model_handler=self.model_handler,
             original_fs=self.physionet_fs,
-            target_fs=ShimmerConfig.MODEL_SAMPLING_RATE,
-            window_size=ShimmerConfig.WINDOW_SIZE_SAMPLES
+            mv_per_count=self.physionet_mv_per_count
         )
         
         self.batch_processor.progress_update.connect(self.on_processing_progress)
@@ -642,72 +853,58 @@ class MainWindow(QMainWindow):
         self.batch_processor.start()
 
     def playback_physionet_data(self):
-        """Simulate streaming from PhysioNet file"""
-        if not self.is_recording or self.physionet_data is None:
-            return
-        
-        # Ambil chunk data (simulasi streaming)
-        chunk_size = ShimmerConfig.PREPROCESSING_CHUNK_SIZE  # 128 samples
-        
-        if self.physionet_playback_index >= len(self.physionet_data):
-            # Sudah selesai semua data
-            if hasattr(self, 'physionet_viz_timer'):
-                self.physionet_viz_timer.stop()
+        """Show the latest frame from the playback engine (frames in between are skipped)"""
+        if self.playback_engine is None:
             return
-        
-        # Get chunk
-        end_index = min(self.physionet_playback_index + chunk_size, len(self.physionet_data))
-        chunk = self.physionet_data[self.physionet_playback_index:end_index]
-        
-        if len(chunk) < chunk_size:
-            # Last chunk, pad or skip
-            if hasattr(self, 'physionet_viz_timer'):
-                self.physionet_viz_timer.stop()
+
+        frame = self.playback_engine.get_frame()
+        if frame is None:
             return
-        
-        self.physionet_playback_index = end_index
-        
-        try:
-            # Resample chunk
-            from scipy.signal import resample
-            resampled = resample(chunk, ShimmerConfig.RESAMPLED_CHUNK_SIZE)
-            
-            # Konversi ke mV
-            raw_mv = self.preprocessor.adc_to_millivolts(
-                resampled, 
-                gain=ShimmerConfig.ECG_GAIN,
-                offset=ShimmerConfig.ADC_OFFSET
-            )
-            self.mv_values_buffer.extend(raw_mv)
-            
-            # ✅ GANTI DENGAN INI (input sudah mV):
-            processed_chunk = self.preprocessor.preprocess_for_plot(raw_mv)
-            
-            # Add to buffer
-            for i, val in enumerate(processed_chunk):
-                self.processed_data_buffer.append(val)
-                self.time_buffer.append(self.current_time)
-                self.current_time += 1 / ShimmerConfig.MODEL_SAMPLING_RATE
-            
-            # Limit buffer to 10 seconds for display
-            max_samples = int(self.display_window * ShimmerConfig.MODEL_SAMPLING_RATE)
-            if len(self.processed_data_buffer) > max_samples:
-                excess = len(self.processed_data_buffer) - max_samples
-                self.processed_data_buffer = self.processed_data_buffer[excess:]
-                self.time_buffer = self.time_buffer[excess:]
-        
-        except Exception as e:
-            print(f"Playback error: {e}")
+
+        time_array, data_array = frame
+        if self.processed_curve:
+            self.processed_curve.setData(time_array, data_array)
+
+        max_time = time_array[-1]
+        self.processed_plot.setXRange(max_time - self.display_window, max_time, padding=0)
+
+    def on_playback_speed_changed(self):
+        if self.playback_engine is not None:
+            self.playback_engine.set_speed(self.playback_speed_combo.currentData())
+
+    def on_playback_seek(self):
+        if self.playback_engine is not None:
+            self.playback_engine.seek(self.playback_slider.value())
+            if not self.playback_engine.isRunning():
+                self.playback_engine.start()
+
+    def on_playback_position(self, seconds):
+        if not self.playback_slider.isSliderDown():
+            self.playback_slider.setValue(int(seconds))
+        duration = self.playback_engine.duration if self.playback_engine else 0
+        self.playback_position_label.setText(
+            f"{int(seconds // 60):02d}:{int(seconds % 60):02d} / {int(duration // 60):02d}:{int(duration % 60):02d}"
+        )
+
+    def on_playback_finished(self):
+        if self.playback_engine is not None:
+            print(f"Playback finished: {self.playback_engine.stats}")
+
+    def stop_playback(self):
+        if hasattr(self, 'physionet_viz_timer'):
+            self.physionet_viz_timer.stop()
+        if self.playback_engine is not None:
+            self.playback_engine.stop()
+            self.playback_engine = None
+        self.playback_slider.setEnabled(False)
 
     def on_processing_complete_physionet(self, results):
         """Handle completion for PhysioNet mode"""
         print("\n=== PROCESSING COMPLETE (PHYSIONET) ===")
         
-        # Stop visualization
+        # Playback keeps running for review until reset or the end of the file
         self.is_recording = False
         self.viz_timer.stop()
-        if hasattr(self, 'physionet_viz_timer'):
-            self.physionet_viz_timer.stop()
         
         # Call original completion handler
         self.on_processing_complete(results)
@@ -784,6 +981,7 @@ class MainWindow(QMainWindow):
         ShimmerConfig.SHIMMER_SAMPLING_RATE = selected_rate
         
         # Update recording buffer
+        self.recording_buffer.close()
         self.recording_buffer = RecordingBuffer(
             max_duration_seconds=ShimmerConfig.MAX_RECORDING_DURATION_SEC,
             sampling_rate=selected_rate
@@ -794,6 +992,8 @@ class MainWindow(QMainWindow):
         if self.is_physionet_mode:
             file_loaded = self.physionet_data is not None
             ready = model_loaded and file_loaded and not self.is_recording
+        elif self.is_capture_mode:
+            ready = model_loaded and self.capture_info is not None and not self.is_processing
         else:
             port_available = self.port_combo.count() > 0
             ready = model_loaded and port_available and not self.is_recording
@@ -866,14 +1066,18 @@ class MainWindow(QMainWindow):
 
             self.physionet_data = None
             self.physionet_fs = None
-            self.physionet_playback_index = 0
             self.file_path_label.setText("No file loaded")
             self.file_path_label.setStyleSheet("color: #64748b; font-size: 11px; padding: 5px; word-wrap: break-word;")
             self.source_combo.setEnabled(True)
             self.load_file_btn.setEnabled(True)
 
-            if hasattr(self, 'physionet_viz_timer'):
-                self.physionet_viz_timer.stop()
+            self.capture_info = None
+            self.capture_path_label.setText("No file loaded")
+            self.capture_path_label.setStyleSheet("color: #64748b; font-size: 11px; padding: 5px; word-wrap: break-word;")
+            self.load_capture_btn.setEnabled(True)
+
+            self.stop_playback()
+            self.playback_position_label.setText("00:00 / 00:00")
 
             self.processed_plot.clear()
             self.processed_curve = None
@@ -903,6 +1107,8 @@ class MainWindow(QMainWindow):
     def start_recording(self):
         if self.is_physionet_mode:
             self.process_physionet_file()
+        elif self.is_capture_mode:
+            self.process_capture_file()
         else:
             self.start_shimmer_recording()
     
@@ -918,6 +1124,8 @@ class MainWindow(QMainWindow):
         self._last_processed_count = 0
 
         self.mv_values_buffer = []
+        self.latency_tracer.reset()
+        self.latency_label.setText("Latency: --")
 
         self.avg_voltage_label.setText("-- mV")
         
@@ -944,7 +1152,7 @@ class MainWindow(QMainWindow):
             return
         
         try:
-            self.shimmer_reader = ShimmerReader(
+            self.shimmer_reader = self.reader_factory(
                 port=port,
                 baudrate=ShimmerConfig.DEFAULT_BAUDRATE,
                 channel=ShimmerConfig.DEFAULT_ECG_CHANNEL
@@ -1051,16 +1259,13 @@ class MainWindow(QMainWindow):
         self.connection_status.setText("● Processing...")
         self.connection_status.setStyleSheet("color: #f59e0b; font-weight: bold; font-size: 13px;")
         
-        recorded_data = self.recording_buffer.get_data()
-        print(f"Processing {len(recorded_data)} samples...")
+        # The processor reads the spill file in blocks; commit everything recorded first
+        self.recording_buffer.flush()
+        print(f"Processing {self.recording_buffer.get_sample_count()} samples...")
         
-        self.batch_processor = BatchProcessor(
-            recorded_data=recorded_data,
-            preprocessor=self.preprocessor,
-            model_handler=self.model_handler,
-            original_fs=ShimmerConfig.SHIMMER_SAMPLING_RATE,
-            target_fs=ShimmerConfig.MODEL_SAMPLING_RATE,
-            window_size=ShimmerConfig.WINDOW_SIZE_SAMPLES
+        self.batch_processor = self.create_batch_processor(
+            spill_path=self.recording_buffer.spill_path,
+            original_fs=self.recording_buffer.sampling_rate
         )
         
         self.batch_processor.progress_update.connect(self.on_processing_progress)
@@ -1068,11 +1273,16 @@ class MainWindow(QMainWindow):
         self.batch_processor.error_occurred.connect(self.on_processing_error)
         self.batch_processor.start()
     
-    def on_data_received(self, value):
+    def on_data_received(self, value, timestamp=None):
         if not self.is_recording:
             return
         
-        self.recording_buffer.add_sample(value)
+        self.recording_buffer.add_sample(value, timestamp)
+        # Simulated readers stamp on the device time scale; the tracer needs host time
+        if timestamp is not None and self.shimmer_reader is not None:
+            self.latency_tracer.on_buffer_insert(self.shimmer_reader.host_arrival_time(timestamp))
+        else:
+            self.latency_tracer.on_buffer_insert(timestamp)
         
         sample_count = self.recording_buffer.get_sample_count()
         if sample_count <= 10 or sample_count % 512 == 0:
@@ -1147,6 +1357,7 @@ class MainWindow(QMainWindow):
                 self.time_buffer = self.time_buffer[excess:]
             
             self._last_processed_count = current_sample_count
+            self.latency_tracer.on_preprocessed()
                     
         except Exception as e:
             print(f"Preprocessing error: {e}")
@@ -1161,6 +1372,7 @@ class MainWindow(QMainWindow):
             
             if self.processed_curve:
                 self.processed_curve.setData(time_array, data_array)
+                self.latency_tracer.on_plotted()
             
             max_time = time_array[-1]
             self.processed_plot.setXRange(max_time - self.display_window, max_time, padding=0)
@@ -1183,6 +1395,11 @@ class MainWindow(QMainWindow):
         
         sample_count = self.recording_buffer.get_sample_count()
         self.sample_count_label.setText(f"Samples: {sample_count:,}")
+
+        # Percentiles are cheap but not free; refresh the debug panel once a second
+        self._status_updates += 1
+        if ShimmerConfig.LATENCY_DEBUG_PANEL and self._status_updates % 10 == 0:
+            self.latency_label.setText(self.latency_tracer.format_summary())
     
     def on_processing_progress(self, percentage, message):
         self.processing_progress_bar.setValue(percentage)
@@ -1215,7 +1432,9 @@ class MainWindow(QMainWindow):
         
         self.af_count_label.setText(f"AF: {results['af_count']} windows")
         self.normal_count_label.setText(f"Normal: {results['normal_count']} windows")
-        self.total_segments_label.setText(f"Total: {results['total_windows']} segments")
+        excluded = results.get('excluded_windows', 0)
+        self.total_segments_label.setText(f"Total: {results['total_windows']} segments"
+                                          + (f" ({excluded} excluded)" if excluded else ""))
         self.comp_time_label.setText(f"Computation Time:\n{processing_time:.2f} seconds")
         
         print(f"Classification: {results['final_classification']}")
@@ -1223,10 +1442,23 @@ class MainWindow(QMainWindow):
         print(f"Normal Windows: {results['normal_count']}")
         print(f"AF Percentage: {results['af_percentage']:.1f}%")
         print(f"Processing Time: {processing_time:.2f}s")
+        if 'signal_quality' in results:
+            quality = results['signal_quality']
+            reasons = ', '.join(f"{name} {count}" for name, count in quality['reasons'].items() if count)
+            print(f"Signal quality: {quality['excluded_windows']} windows excluded ({quality['mode']})"
+                  + (f" - {reasons}" if reasons else ""))
+        if 'cascade' in results:
+            cascade = results['cascade']
+            print(f"Cascade: {cascade['skipped_fraction'] * 100:.1f}% of windows decided by the RR pre-screen "
+                  f"({cascade['screened_normal']} Normal, {cascade['screened_af']} AF, "
+                  f"{cascade['model_windows']} to the model)")
         print(f"Average voltage label text: {self.avg_voltage_label.text()}")
 
         self.start_btn.setEnabled(True)
         self.source_combo.setEnabled(True)
+        self.load_capture_btn.setEnabled(True)
+        if not self.is_physionet_mode and not self.is_capture_mode:
+            self.dump_latency_trace(results)
         if self.is_physionet_mode:
             raw_mv = self.preprocessor.adc_to_millivolts(self.physionet_data)
             filtered_mv = self.preprocessor.preprocess_for_plot(raw_mv)
@@ -1234,6 +1466,19 @@ class MainWindow(QMainWindow):
             self.avg_voltage_label.setText(f"{avg_mv:.4f} mV")
         
         self.check_ready_state()
+
+        if results.get('inconclusive'):
+            self.connection_status.setText("● Analysis Inconclusive")
+            self.connection_status.setStyleSheet("color: #f59e0b; font-weight: bold; font-size: 13px;")
+            QMessageBox.warning(
+                self,
+                "Insufficient Signal Quality",
+                f"All {results.get('excluded_windows', 0)} windows failed the signal quality check, "
+                f"so no classification was made.\n\n"
+                f"Check the electrode contact and record again.\n\n"
+                f"Processing Time: {processing_time:.2f}s"
+            )
+            return
         
         QMessageBox.information(
             self,
@@ -1241,10 +1486,27 @@ class MainWindow(QMainWindow):
             f"Classification: {results['final_classification']}\n\n"
             f"AF Windows: {results['af_count']}\n"
             f"Normal Windows: {results['normal_count']}\n"
-            f"AF Percentage: {results['af_percentage']:.1f}%\n\n"
+            f"AF Percentage: {results['af_percentage']:.1f}%\n"
+            f"Excluded (poor signal): {results.get('excluded_windows', 0)} windows\n\n"
             f"Processing Time: {processing_time:.2f}s"
         )
     
+    def dump_latency_trace(self, results=None):
+        """Record time-to-label and write the session's latency summary"""
+        if self.latency_tracer.last_arrival is None:
+            return
+        self.latency_tracer.on_classified()
+        extra = {'sampling_rate': self.recording_buffer.sampling_rate,
+                 'samples': self.recording_buffer.get_sample_count()}
+        if results:
+            extra['computation_time'] = results.get('computation_time')
+        path = self.latency_tracer.dump(ShimmerConfig.LATENCY_TRACE_DIR, extra)
+        self.latency_label.setText(self.latency_tracer.format_summary())
+        print(self.latency_tracer.format_summary())
+        if path:
+            print(f"Latency trace saved: {path}")
+        self.latency_tracer.last_arrival = None
+
     def on_processing_error(self, error_msg):
         print(f"Processing error: {error_msg}")
         self.is_processing = False
@@ -1253,6 +1515,10 @@ class MainWindow(QMainWindow):
         self.connection_status.setText("● Processing Failed")
         self.connection_status.setStyleSheet("color: #ef4444; font-weight: bold; font-size: 13px;")
         
+        if self.is_capture_mode:
+            self.source_combo.setEnabled(True)
+            self.load_capture_btn.setEnabled(True)
+
         QMessageBox.critical(self, "Processing Error", f"Failed to process recording:\n{error_msg}")
         self.check_ready_state()
     
@@ -1273,8 +1539,14 @@ class MainWindow(QMainWindow):
                     self.batch_processor.stop()
                     # Give the batch processor a short moment to exit
                     self.batch_processor.wait(1000)
+                self.stop_playback()
+                AnalysisWorker.shutdown_instance()
+                self.recording_buffer.close()
                 event.accept()
             else:
                 event.ignore()
         else:
+            self.stop_playback()
+            AnalysisWorker.shutdown_instance()
+            self.recording_buffer.close()
             event.accept()
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""
+Load test untuk inference server lokal (serve_model.py)
+Mensimulasikan beberapa stasiun akuisisi yang mengirim window 2500 sampel
+secara bersamaan, lalu melaporkan throughput, latency dan metrics server.
+"""
+
+import argparse
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from core.shimmer_config import ShimmerConfig
+
+
+def post_windows(url, windows):
+    request = urllib.request.Request(
+        f"{url}/predict",
+        data=windows.astype(np.float32).tobytes(),
+        headers={"Content-Type": "application/octet-stream"},
+        method="POST"
+    )
+    start_time = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        payload = json.loads(response.read())
+    return time.perf_counter() - start_time, len(payload['probabilities'])
+
+
+def run_station(url, n_requests, windows_per_request, seed):
+    rng = np.random.default_rng(seed)
+    latencies = []
+    for _ in range(n_requests):
+        windows = rng.standard_normal((windows_per_request, ShimmerConfig.WINDOW_SIZE_SAMPLES))
+        latency, _ = post_windows(url, windows)
+        latencies.append(latency)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the local inference server")
+    parser.add_argument("--host", default=ShimmerConfig.INFERENCE_SERVER_HOST)
+    parser.add_argument("--port", type=int, default=ShimmerConfig.INFERENCE_SERVER_PORT)
+    parser.add_argument("--stations", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=50, help="requests per station")
+    parser.add_argument("--windows", type=int, default=1, help="windows per request")
+    args = parser.parse_args()
+
+    if args.host not in ("127.0.0.1", "localhost", "::1"):
+        print("Load test only targets a local server")
+        return
+
+    url = f"http://{args.host}:{args.port}"
+
+    print("=== INFERENCE SERVER LOAD TEST ===")
+    print(f"Server:   {url}")
+    print(f"Stations: {args.stations}")
+    print(f"Requests: {args.requests} per station, {args.windows} window(s) each")
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.stations) as pool:
+        results = list(pool.map(
+            lambda seed: run_station(url, args.requests, args.windows, seed),
+            range(args.stations)
+        ))
+    elapsed = time.perf_counter() - start_time
+
+    latencies_ms = np.concatenate(results) * 1000
+    total_windows = len(latencies_ms) * args.windows
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+
+    print(f"\nClient side:")
+    print(f"  Wall time:  {elapsed:.2f} s")
+    print(f"  Throughput: {total_windows / elapsed:.1f} windows/s ({len(latencies_ms) / elapsed:.1f} req/s)")
+    print(f"  Latency:    p50 {p50:.1f} ms | p95 {p95:.1f} ms | p99 {p99:.1f} ms")
+
+    with urllib.request.urlopen(f"{url}/metrics") as response:
+        metrics = json.loads(response.read())
+
+    print(f"\nServer metrics:")
+    for key, value in metrics.items():
+        print(f"  {key}: {value:.2f}" if isinstance(value, float) else f"  {key}: {value}")
+
+
+if __name__ == '__main__':
+    main()
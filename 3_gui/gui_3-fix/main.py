@@ -1,8 +1,10 @@
 import sys
+from core.resource_governor import apply_role
 from PyQt5.QtWidgets import QApplication
 from gui.main_window import MainWindow
 
 def main():
+    apply_role('ui')
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
     window = MainWindow()
@@ -0,0 +1,43 @@
+import argparse
+import os
+from core.preprocessor import ECGPreprocessor
+from core.model_handler import ModelHandler
+from core.inference_server import InferenceServer
+from core.shimmer_config import ShimmerConfig
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared local AF inference server")
+    parser.add_argument("--model", default=ShimmerConfig.DEFAULT_MODEL_PATH)
+    parser.add_argument("--host", default=ShimmerConfig.INFERENCE_SERVER_HOST)
+    parser.add_argument("--port", type=int, default=ShimmerConfig.INFERENCE_SERVER_PORT)
+    parser.add_argument("--max-batch-size", type=int, default=ShimmerConfig.INFERENCE_MAX_BATCH_SIZE)
+    parser.add_argument("--max-latency-ms", type=float, default=ShimmerConfig.INFERENCE_MAX_LATENCY_MS)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        print(f"Error: Model file not found at {args.model}")
+        return
+
+    model_handler = ModelHandler()
+    success, message = model_handler.load_model(args.model)
+    print(message)
+    if not success:
+        return
+
+    server = InferenceServer(
+        model_handler=model_handler,
+        preprocessor=ECGPreprocessor(fs=ShimmerConfig.MODEL_SAMPLING_RATE),
+        host=args.host,
+        port=args.port,
+        max_batch_size=args.max_batch_size,
+        max_latency_ms=args.max_latency_ms
+    )
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping inference server...")
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Load test jalur akuisisi live GUI dengan SimulatedShimmerReader
+on_data_received -> RecordingBuffer -> preprocess_for_visualization -> plot
+dijalankan di MainWindow asli, tanpa perangkat Shimmer. Untuk setiap
+kombinasi sampling rate x kecepatan replay dilaporkan:
+- sampel yang belum/tidak masuk RecordingBuffer (antrian signal Qt)
+- lag event loop GUI (timer 10 ms)
+- pemakaian CPU process
+
+Contoh:
+    python simulate_load.py --source shimmer_data.csv --speeds 1 10 50
+    python simulate_load.py --rates 128 512 --duration 20 --jitter-ms 15 --packet-loss 0.01
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PyQt5.QtCore import QTimer, QEventLoop
+from PyQt5.QtWidgets import QApplication
+
+from core.shimmer_config import ShimmerConfig
+from core.simulated_reader import SimulatedShimmerReader
+
+PROBE_INTERVAL_MS = 10
+
+
+def run_case(app, window, rate, speed, args):
+    window.sampling_rate_combo.setCurrentIndex(window.sampling_rate_combo.findData(rate))
+    window.recording_duration = args.duration * 10  # the harness stops the run itself
+    if window.port_combo.count() == 0:
+        window.port_combo.addItem("SIMULATED")
+
+    readers = []
+
+    def reader_factory(port, baudrate, channel):
+        reader = SimulatedShimmerReader(
+            port=port, source_path=args.source, source_fs=args.source_fs, sampling_rate=rate,
+            speed=speed, samples_per_packet=args.samples_per_packet,
+            jitter_ms=args.jitter_ms, packet_loss=args.packet_loss
+        )
+        readers.append(reader)
+        return reader
+
+    window.reader_factory = reader_factory
+
+    intervals = []
+    last_tick = [time.perf_counter()]
+
+    def probe():
+        now = time.perf_counter()
+        intervals.append((now - last_tick[0]) * 1000)
+        last_tick[0] = now
+
+    probe_timer = QTimer()
+    probe_timer.timeout.connect(probe)
+
+    window.start_shimmer_recording()
+    reader = readers[0]
+
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    last_tick[0] = wall_start
+    probe_timer.start(PROBE_INTERVAL_MS)
+
+    loop = QEventLoop()
+    QTimer.singleShot(int(args.duration * 1000), loop.quit)
+    loop.exec_()
+
+    probe_timer.stop()
+    cpu_time = time.process_time() - cpu_start
+    wall_time = time.perf_counter() - wall_start
+
+    # Snapshot before the queued signals are drained
+    reader.stop()
+    received_at_stop = window.recording_buffer.get_sample_count()
+    emitted = reader.stats['samples_emitted']
+
+    # Deliver what is still queued (on_data_received only accepts samples while recording)
+    for timer in (window.viz_timer, window.recording_timer, window.preprocess_timer):
+        timer.stop()
+    drain_start = time.perf_counter()
+    while window.recording_buffer.get_sample_count() < emitted and time.perf_counter() - drain_start < 30:
+        app.processEvents(QEventLoop.AllEvents, 50)
+    received = window.recording_buffer.get_sample_count()
+    window.is_recording = False
+
+    lag = np.maximum(np.array(intervals) - PROBE_INTERVAL_MS, 0) if intervals else np.zeros(1)
+    result = {
+        'sampling_rate': rate,
+        'speed': speed,
+        'wall_time_sec': wall_time,
+        'target_samples_per_sec': rate * speed,
+        'emitted_samples_per_sec': emitted / wall_time,
+        'samples_emitted': emitted,
+        'samples_lost_simulated': reader.stats['samples_lost'],
+        'backlog_at_stop': emitted - received_at_stop,
+        'samples_missing': emitted - received,
+        'reader_max_schedule_lag_ms': reader.stats['max_schedule_lag_ms'],
+        'loop_lag_ms_p50': float(np.percentile(lag, 50)),
+        'loop_lag_ms_p95': float(np.percentile(lag, 95)),
+        'loop_lag_ms_max': float(np.max(lag)),
+        'cpu_percent': cpu_time / wall_time * 100
+    }
+
+    window.recording_buffer.clear()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the live acquisition path with a simulated Shimmer")
+    parser.add_argument("--source", default=None, help="PhysioNet .dat, CSV or .ecgs file (default: synthetic ECG)")
+    parser.add_argument("--source-fs", type=int, default=None, help="sampling rate of the source (.dat/.csv)")
+    parser.add_argument("--rates", type=int, nargs='+', default=ShimmerConfig.AVAILABLE_SAMPLING_RATES)
+    parser.add_argument("--speeds", type=float, nargs='+', default=[1, 10, 50])
+    parser.add_argument("--duration", type=float, default=10, help="wall-clock seconds per case")
+    parser.add_argument("--samples-per-packet", type=int, default=1)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--packet-loss", type=float, default=0.0)
+    parser.add_argument("--show", action='store_true', help="show the window while testing")
+    parser.add_argument("--output", default="simulate_load_results.json")
+    args = parser.parse_args()
+
+    if not args.show:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    # Keep test spill files out of the real recordings directory
+    ShimmerConfig.RECORDING_SPILL_DIR = tempfile.mkdtemp(prefix="simulate_load_")
+
+    app = QApplication(sys.argv)
+
+    from gui.main_window import MainWindow
+    window = MainWindow()
+    if args.show:
+        window.show()
+
+    print("=== Live Path Load Test ===")
+    print(f"Source: {args.source or 'synthetic ECG'}")
+    print(f"Rates: {args.rates} Hz, speeds: {args.speeds}x, {args.duration:g}s per case")
+
+    results = []
+    for rate in args.rates:
+        for speed in args.speeds:
+            result = run_case(app, window, rate, speed, args)
+            results.append(result)
+            print(f"  {rate:>4} Hz x{speed:<4g} emitted {result['emitted_samples_per_sec']:>8.0f}/s "
+                  f"(target {result['target_samples_per_sec']:.0f}/s), "
+                  f"backlog {result['backlog_at_stop']:,}, missing {result['samples_missing']:,}, "
+                  f"loop lag p95 {result['loop_lag_ms_p95']:.1f} ms, CPU {result['cpu_percent']:.0f}%")
+
+    print("\n" + "="*100)
+    print(f"{'Rate':>6} {'Speed':>6} {'Emitted/s':>10} {'Backlog':>9} {'Missing':>8} "
+          f"{'Lag p50':>8} {'Lag p95':>8} {'Lag max':>8} {'CPU %':>6}")
+    print("="*100)
+    for r in results:
+        print(f"{r['sampling_rate']:>6} {r['speed']:>6g} {r['emitted_samples_per_sec']:>10.0f} "
+              f"{r['backlog_at_stop']:>9,} {r['samples_missing']:>8,} {r['loop_lag_ms_p50']:>8.1f} "
+              f"{r['loop_lag_ms_p95']:>8.1f} {r['loop_lag_ms_max']:>8.1f} {r['cpu_percent']:>6.0f}")
+
+    window.recording_buffer.close()
+    window.close()
+
+    with open(args.output, 'w') as f:
+        json.dump({'config': vars(args), 'results': results}, f, indent=2)
+    print(f"\n✓ Results saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
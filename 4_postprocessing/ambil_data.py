@@ -5,15 +5,28 @@ import sys
 import csv
 from serial import Serial
 from pyshimmer import ShimmerBluetooth, DEFAULT_BAUDRATE, DataPacket, EChannelType
+from session_writer import BackgroundSampleWriter
 
 # Global variable
 shim_dev = None
 csv_file = None
 csv_writer = None
 header_written = False
+sample_writer = None
 
 TARGET_CHANNEL = EChannelType.EXG_ADS1292R_1_CH1_24BIT
 
+# Logging configuration
+OUTPUT_FILE = "shimmer_data.csv"
+LOG_MODE = "buffered"        # "buffered" (background writer thread) atau "direct" (write + flush per sampel)
+LOG_FORMAT = "csv"           # "csv", "binary" atau "session" (.ecgs, hanya untuk mode buffered)
+SAMPLING_RATE = 128          # disimpan di header file session
+VERBOSE = False              # print setiap paket ke console (memperlambat akuisisi)
+QUEUE_MAX_SAMPLES = 1_000_000
+FSYNC_INTERVAL_SEC = 5
+ROTATE_MAX_BYTES = 0         # 0 = tanpa rotasi berdasarkan ukuran
+ROTATE_MAX_SECONDS = 0       # 0 = tanpa rotasi berdasarkan waktu
+
 def stream_cb(pkt: DataPacket) -> None:
     global csv_writer, header_written, csv_file
 
@@ -22,11 +35,19 @@ def stream_cb(pkt: DataPacket) -> None:
         print(f"Warning: {TARGET_CHANNEL} not found in packet")
         return
 
+    value = pkt[TARGET_CHANNEL]
+
     # Print to console (hanya channel target)
-    print("Received new data packet:")
-    print(f"channel: {TARGET_CHANNEL}")
-    print(f"value: {pkt[TARGET_CHANNEL]}")
-    print("")
+    if VERBOSE:
+        print("Received new data packet:")
+        print(f"channel: {TARGET_CHANNEL}")
+        print(f"value: {value}")
+        print("")
+
+    # --- Buffered mode: callback hanya enqueue, writer thread yang menulis ---
+    if sample_writer is not None:
+        sample_writer.enqueue(time.time(), value)
+        return
 
     # --- Write to CSV ---
     if csv_writer is None:
@@ -38,15 +59,36 @@ def stream_cb(pkt: DataPacket) -> None:
         header_written = True
 
     # Write data row (hanya channel target)
-    row = [time.time(), pkt[TARGET_CHANNEL]]
+    row = [time.time(), value]
     csv_writer.writerow(row)
     csv_file.flush()
 
 
+def close_logging():
+    """Tutup writer/CSV dan tampilkan statistik antrian"""
+    global csv_file, sample_writer
+
+    if sample_writer:
+        stats = sample_writer.stop()
+        sample_writer = None
+        print("Background writer stopped")
+        print(f"  Samples enqueued:    {stats['enqueued']:,}")
+        print(f"  Samples written:     {stats['written']:,}")
+        print(f"  Samples dropped:     {stats['dropped']:,}")
+        print(f"  Queue depth at stop: {stats['queue_depth_at_stop']:,}")
+        print(f"  Max queue depth:     {stats['max_queue_depth']:,}")
+        print(f"  Files: {', '.join(stats['files'])}")
+
+    if csv_file:
+        csv_file.close()
+        csv_file = None
+        print("CSV file closed")
+
+
 def signal_handler(sig, frame):
     """Handle Ctrl+C gracefully"""
     print('\n\nStopping acquisition...')
-    global shim_dev, csv_file
+    global shim_dev
 
     if shim_dev:
         try:
@@ -55,23 +97,35 @@ def signal_handler(sig, frame):
             print('Shimmer stopped successfully')
         except Exception as e:
             print(f'Error stopping Shimmer: {e}')
+        shim_dev = None
 
-    if csv_file:
-        csv_file.close()
-        print("CSV file closed")
+    close_logging()
 
     sys.exit(0)
 
 
 def main(args=None):
-    global shim_dev, csv_file, csv_writer
+    global shim_dev, csv_file, csv_writer, sample_writer
 
     signal.signal(signal.SIGINT, signal_handler)
 
     try:
-        csv_file = open("shimmer_data.csv", "w", newline="")
-        csv_writer = csv.writer(csv_file)
-        print("CSV logging to shimmer_data.csv")
+        if LOG_MODE == "buffered":
+            sample_writer = BackgroundSampleWriter(
+                OUTPUT_FILE,
+                fmt=LOG_FORMAT,
+                max_queue=QUEUE_MAX_SAMPLES,
+                fsync_interval=FSYNC_INTERVAL_SEC,
+                rotate_bytes=ROTATE_MAX_BYTES,
+                rotate_seconds=ROTATE_MAX_SECONDS,
+                session_metadata={'fs': SAMPLING_RATE, 'channel': TARGET_CHANNEL.name}
+            )
+            sample_writer.start()
+            print(f"Buffered {LOG_FORMAT} logging to {sample_writer.files[0]}")
+        else:
+            csv_file = open(OUTPUT_FILE, "w", newline="")
+            csv_writer = csv.writer(csv_file)
+            print(f"CSV logging to {OUTPUT_FILE}")
 
         serial = Serial("COM3", DEFAULT_BAUDRATE)
         shim_dev = ShimmerBluetooth(serial)
@@ -108,9 +162,7 @@ def main(args=None):
                 pass
 
     finally:
-        if csv_file:
-            csv_file.close()
-            print("CSV file closed")
+        close_logging()
         print("Program terminated")
 
 if __name__ == "__main__":
@@ -0,0 +1,392 @@
+"""
+Format file session biner (.ecgs) untuk rekaman Shimmer
+Pengganti CSV (timestamp float + nilai ADC sebagai teks, ~27 byte/sampel):
+
+    [file header]  magic 'ECGSESS\\0', version (uint16), panjang JSON (uint32),
+                   JSON: device, fs, gain, adc_offset, channel, block_samples, ...
+    [block]*       header block (n_samples, value_bytes, time_bytes,
+                   t_start, t_end, first_value, crc32) + payload
+
+Payload block berisi delta antar sampel int24 yang di-zig-zag lalu di-varint
+(biasanya 2-3 byte/sampel), diikuti delta timestamp kedatangan paket dalam
+mikrodetik (varint juga; sebagian besar 0 karena satu paket berisi beberapa
+sampel). CRC32 dihitung atas payload sehingga block rusak bisa dideteksi.
+Encode/decode varint sepenuhnya vectorized dengan NumPy.
+"""
+
+import argparse
+import json
+import os
+import struct
+import time
+import zlib
+import numpy as np
+
+MAGIC = b'ECGSESS\0'
+VERSION = 1
+FILE_HEADER_FORMAT = '<8sHI'
+BLOCK_HEADER_FORMAT = '<IIIddiI'
+FILE_HEADER_SIZE = struct.calcsize(FILE_HEADER_FORMAT)
+BLOCK_HEADER_SIZE = struct.calcsize(BLOCK_HEADER_FORMAT)
+EXTENSION = '.ecgs'
+
+DEFAULT_BLOCK_SAMPLES = 4096
+DEFAULT_METADATA = {
+    'device': 'Shimmer3 ECG',
+    'fs': 128,
+    'gain': 6,
+    'adc_offset': 0,
+    'channel': 'EXG_ADS1292R_1_CH1_24BIT'
+}
+
+
+class SessionFormatError(Exception):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Varint / zig-zag (vectorized)
+# ---------------------------------------------------------------------------
+
+def zigzag_encode(values):
+    values = np.asarray(values, dtype=np.int64)
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+
+def zigzag_decode(values):
+    values = np.asarray(values, dtype=np.uint64)
+    return ((values >> np.uint64(1)).astype(np.int64)) ^ -((values & np.uint64(1)).astype(np.int64))
+
+
+def varint_encode(values):
+    """uint64 array -> bytes (LEB128), tanpa loop per elemen"""
+    values = np.asarray(values, dtype=np.uint64)
+    if len(values) == 0:
+        return b''
+
+    # Jumlah byte per nilai: 7 bit per byte, minimal 1
+    n_bytes = np.ones(len(values), dtype=np.int64)
+    for k in range(1, 10):
+        n_bytes += values >= np.uint64(1 << (7 * k))
+
+    offsets = np.cumsum(n_bytes) - n_bytes
+    out = np.empty(int(n_bytes.sum()), dtype=np.uint8)
+    for k in range(int(n_bytes.max())):
+        idx = np.nonzero(n_bytes > k)[0]
+        chunk = (values[idx] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (n_bytes[idx] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[offsets[idx] + k] = (chunk | more).astype(np.uint8)
+    return out.tobytes()
+
+
+def varint_decode(buffer, count=None):
+    """bytes (LEB128) -> uint64 array"""
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    if len(data) == 0:
+        return np.zeros(0, dtype=np.uint64)
+
+    is_last = data < 0x80
+    if not is_last[-1]:
+        raise SessionFormatError("Truncated varint stream")
+
+    ends = np.nonzero(is_last)[0]
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    value_id = np.concatenate([[0], np.cumsum(is_last)[:-1]])
+    position = np.arange(len(data)) - starts[value_id]
+
+    parts = (data & 0x7F).astype(np.uint64) << (7 * position).astype(np.uint64)
+    values = np.bitwise_or.reduceat(parts, starts)
+
+    if count is not None and len(values) != count:
+        raise SessionFormatError(f"Expected {count} values, decoded {len(values)}")
+    return values
+
+
+# ---------------------------------------------------------------------------
+# Block encode / decode
+# ---------------------------------------------------------------------------
+
+def encode_block(values, timestamps=None):
+    """Encode satu block -> (block header + payload) bytes"""
+    values = np.asarray(values, dtype=np.int64)
+    n = len(values)
+    if n == 0:
+        return b''
+
+    deltas = np.diff(values, prepend=values[0])
+    value_payload = varint_encode(zigzag_encode(deltas))
+
+    if timestamps is not None:
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        t_start, t_end = float(timestamps[0]), float(timestamps[-1])
+        micros = np.round((timestamps - t_start) * 1e6).astype(np.int64)
+        time_payload = varint_encode(zigzag_encode(np.diff(micros, prepend=0)))
+    else:
+        t_start = t_end = 0.0
+        time_payload = b''
+
+    payload = value_payload + time_payload
+    header = struct.pack(BLOCK_HEADER_FORMAT, n, len(value_payload), len(time_payload),
+                         t_start, t_end, int(values[0]), zlib.crc32(payload))
+    return header + payload
+
+
+def decode_block(header_bytes, payload, verify=True):
+    n, value_bytes, time_bytes, t_start, t_end, first_value, crc = struct.unpack(BLOCK_HEADER_FORMAT, header_bytes)
+    if verify and zlib.crc32(payload) != crc:
+        raise SessionFormatError("Block checksum mismatch")
+
+    deltas = zigzag_decode(varint_decode(payload[:value_bytes], n))
+    values = first_value + np.cumsum(deltas)
+
+    if time_bytes:
+        micros = np.cumsum(zigzag_decode(varint_decode(payload[value_bytes:value_bytes + time_bytes], n)))
+        timestamps = t_start + micros / 1e6
+    else:
+        timestamps = None
+    return values.astype(np.int32), timestamps
+
+
+# ---------------------------------------------------------------------------
+# Writer / Reader
+# ---------------------------------------------------------------------------
+
+class SessionWriter:
+    """Tulis sampel secara bertahap; block ditulis setiap block_samples sampel"""
+
+    def __init__(self, path, block_samples=DEFAULT_BLOCK_SAMPLES, sample_timestamps=True, **metadata):
+        self.path = path
+        self.block_samples = int(block_samples)
+        self.sample_timestamps = sample_timestamps
+        self.metadata = {**DEFAULT_METADATA, **metadata,
+                         'block_samples': self.block_samples,
+                         'sample_timestamps': sample_timestamps,
+                         'created': time.strftime('%Y-%m-%d %H:%M:%S')}
+
+        self.file = open(path, 'wb')
+        header_json = json.dumps(self.metadata).encode('utf-8')
+        self.file.write(struct.pack(FILE_HEADER_FORMAT, MAGIC, VERSION, len(header_json)))
+        self.file.write(header_json)
+
+        self.pending_values = []
+        self.pending_times = []
+        self.pending_count = 0
+        self.n_samples = 0
+        self.n_blocks = 0
+        self.bytes_written = self.file.tell()
+
+    def write(self, timestamps, values):
+        values = np.atleast_1d(np.asarray(values, dtype=np.int64))
+        timestamps = np.atleast_1d(np.asarray(timestamps, dtype=np.float64))
+        self.pending_values.append(values)
+        self.pending_times.append(timestamps)
+        self.pending_count += len(values)
+        if self.pending_count >= self.block_samples:
+            self._write_blocks(final=False)
+
+    def _write_blocks(self, final):
+        values = np.concatenate(self.pending_values) if self.pending_values else np.zeros(0, np.int64)
+        times = np.concatenate(self.pending_times) if self.pending_times else np.zeros(0)
+
+        n_full = len(values) // self.block_samples * self.block_samples
+        end = len(values) if final else n_full
+        for start in range(0, end, self.block_samples):
+            stop = min(start + self.block_samples, end)
+            block = encode_block(values[start:stop], times[start:stop] if self.sample_timestamps else None)
+            self.file.write(block)
+            self.bytes_written += len(block)
+            self.n_samples += stop - start
+            self.n_blocks += 1
+
+        self.pending_values = [values[end:]] if end < len(values) else []
+        self.pending_times = [times[end:]] if end < len(values) else []
+        self.pending_count = len(values) - end
+
+    def flush(self, final=False):
+        """Flush block yang sudah penuh ke OS
+
+        Sisa sampel tetap di-buffer sampai block penuh, agar fsync berkala
+        tidak memecah file menjadi banyak block pendek; final=True menulisnya
+        sebagai block pendek (dipakai saat file ditutup).
+        """
+        self._write_blocks(final=final)
+        self.file.flush()
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        if self.file:
+            self.flush(final=True)
+            self.file.close()
+            self.file = None
+
+
+class SessionReader:
+    def __init__(self, path, verify=True):
+        self.path = path
+        self.verify = verify
+        with open(path, 'rb') as f:
+            raw = f.read(FILE_HEADER_SIZE)
+            if len(raw) < FILE_HEADER_SIZE:
+                raise SessionFormatError("Truncated session header")
+            magic, version, header_len = struct.unpack(FILE_HEADER_FORMAT, raw)
+            if magic != MAGIC:
+                raise SessionFormatError("Not an ECG session file")
+            if version != VERSION:
+                raise SessionFormatError(f"Unsupported session version: {version}")
+            self.header = json.loads(f.read(header_len).decode('utf-8'))
+        self.data_offset = FILE_HEADER_SIZE + header_len
+        self.position = self.data_offset  # file offset after the last block read
+        self.fs = self.header['fs']
+
+    def iter_blocks(self):
+        """Yield (timestamps, values) per block; timestamps None jika tidak disimpan"""
+        with open(self.path, 'rb') as f:
+            f.seek(self.data_offset)
+            while True:
+                header_bytes = f.read(BLOCK_HEADER_SIZE)
+                if len(header_bytes) == 0:
+                    break
+                if len(header_bytes) < BLOCK_HEADER_SIZE:
+                    # Block terakhir terpotong (misal program crash saat menulis)
+                    break
+                _, value_bytes, time_bytes = struct.unpack('<III', header_bytes[:12])
+                payload = f.read(value_bytes + time_bytes)
+                if len(payload) < value_bytes + time_bytes:
+                    break
+                values, timestamps = decode_block(header_bytes, payload, self.verify)
+                self.position = f.tell()
+                yield timestamps, values
+
+    def read(self):
+        """Decode seluruh file -> (timestamps, values)"""
+        times, values = [], []
+        for t, v in self.iter_blocks():
+            values.append(v)
+            if t is not None:
+                times.append(t)
+        values = np.concatenate(values) if values else np.zeros(0, dtype=np.int32)
+        timestamps = np.concatenate(times) if times else None
+        return timestamps, values
+
+    def decoded_view(self, cache_dir=None):
+        """Decode sekali ke file .npy lalu kembalikan memmap (timestamps, values)
+
+        Cache dibuat ulang jika file session lebih baru dari cache.
+        """
+        cache_dir = cache_dir or os.path.dirname(os.path.abspath(self.path))
+        root = os.path.join(cache_dir, os.path.splitext(os.path.basename(self.path))[0])
+        values_file, times_file = root + '_values.npy', root + '_timestamps.npy'
+
+        source_mtime = os.path.getmtime(self.path)
+        fresh = (os.path.exists(values_file) and os.path.getmtime(values_file) >= source_mtime and
+                 (not self.header['sample_timestamps'] or
+                  (os.path.exists(times_file) and os.path.getmtime(times_file) >= source_mtime)))
+
+        if not fresh:
+            n_total = sum(len(v) for _, v in self.iter_blocks())
+            values_out = np.lib.format.open_memmap(values_file, mode='w+', dtype=np.int32, shape=(n_total,))
+            times_out = (np.lib.format.open_memmap(times_file, mode='w+', dtype=np.float64, shape=(n_total,))
+                         if self.header['sample_timestamps'] else None)
+            pos = 0
+            for t, v in self.iter_blocks():
+                values_out[pos:pos + len(v)] = v
+                if times_out is not None:
+                    times_out[pos:pos + len(v)] = t
+                pos += len(v)
+            values_out.flush()
+            del values_out
+            if times_out is not None:
+                times_out.flush()
+                del times_out
+
+        values = np.load(values_file, mmap_mode='r')
+        timestamps = np.load(times_file, mmap_mode='r') if self.header['sample_timestamps'] else None
+        return timestamps, values
+
+
+def read_session(path):
+    """Shortcut: (timestamps, values, header)"""
+    reader = SessionReader(path)
+    timestamps, values = reader.read()
+    return timestamps, values, reader.header
+
+
+def convert_csv(csv_path, output_path=None, block_samples=DEFAULT_BLOCK_SAMPLES,
+                value_column='ECG_CH1', **metadata):
+    """Konversi CSV dari ambil_data.py (timestamp, ECG_CH1) ke .ecgs"""
+    import pandas as pd
+
+    output_path = output_path or os.path.splitext(csv_path)[0] + EXTENSION
+    df = pd.read_csv(csv_path)
+    writer = SessionWriter(output_path, block_samples=block_samples, **metadata)
+    writer.write(df['timestamp'].values, df[value_column].values)
+    writer.close()
+    return output_path
+
+
+def compare_with_csv(csv_path, session_path, repeats=5):
+    """Ukuran file dan waktu load CSV vs .ecgs"""
+    import pandas as pd
+
+    def best_time(fn):
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    csv_df = pd.read_csv(csv_path)
+    timestamps, values, _ = read_session(session_path)
+    lossless_values = np.array_equal(csv_df['ECG_CH1'].values, values)
+    max_time_error = float(np.max(np.abs(csv_df['timestamp'].values - timestamps))) if timestamps is not None else None
+
+    n = len(values)
+    csv_size = os.path.getsize(csv_path)
+    session_size = os.path.getsize(session_path)
+    return {
+        'n_samples': n,
+        'csv_bytes': csv_size,
+        'session_bytes': session_size,
+        'csv_bytes_per_sample': csv_size / n,
+        'session_bytes_per_sample': session_size / n,
+        'compression_ratio': csv_size / session_size,
+        'csv_load_sec': best_time(lambda: pd.read_csv(csv_path)),
+        'session_load_sec': best_time(lambda: read_session(session_path)),
+        'values_lossless': lossless_values,
+        'max_timestamp_error_sec': max_time_error
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert Shimmer CSV recordings to the .ecgs session format")
+    parser.add_argument("csv", nargs='+', help="CSV file(s) from ambil_data.py")
+    parser.add_argument("--fs", type=int, default=DEFAULT_METADATA['fs'])
+    parser.add_argument("--gain", type=float, default=DEFAULT_METADATA['gain'])
+    parser.add_argument("--adc-offset", type=float, default=DEFAULT_METADATA['adc_offset'])
+    parser.add_argument("--device", default=DEFAULT_METADATA['device'])
+    parser.add_argument("--block-samples", type=int, default=DEFAULT_BLOCK_SAMPLES)
+    parser.add_argument("--compare", action='store_true', help="report size and load time vs CSV")
+    args = parser.parse_args()
+
+    for csv_path in args.csv:
+        output_path = convert_csv(csv_path, block_samples=args.block_samples, fs=args.fs,
+                                  gain=args.gain, adc_offset=args.adc_offset, device=args.device)
+        print(f"✓ {csv_path} -> {output_path}")
+
+        if args.compare:
+            r = compare_with_csv(csv_path, output_path)
+            print(f"  Samples:        {r['n_samples']:,}")
+            print(f"  CSV size:       {r['csv_bytes']:,} bytes ({r['csv_bytes_per_sample']:.1f} B/sample)")
+            print(f"  Session size:   {r['session_bytes']:,} bytes ({r['session_bytes_per_sample']:.1f} B/sample)")
+            print(f"  Compression:    {r['compression_ratio']:.1f}x")
+            print(f"  CSV load:       {r['csv_load_sec']*1000:.2f} ms")
+            print(f"  Session load:   {r['session_load_sec']*1000:.2f} ms")
+            print(f"  Values lossless: {r['values_lossless']}, "
+                  f"max timestamp error: {r['max_timestamp_error_sec']:.2e} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Background writer untuk logging sampel Shimmer
+Callback streaming hanya memasukkan (timestamp, value) ke antrian terbatas;
+thread writer mengambil sampel per batch, menulis sekaligus (CSV, binary atau
+session .ecgs dari session_format.py),
+melakukan fsync berkala dan rotasi file berdasarkan ukuran atau waktu.
+"""
+
+import csv
+import io
+import os
+import threading
+import time
+from collections import deque
+import numpy as np
+from session_format import SessionWriter, EXTENSION as SESSION_EXTENSION
+
+BINARY_DTYPE = np.dtype([('timestamp', '<f8'), ('value', '<i4')])
+
+
+class BackgroundSampleWriter:
+    def __init__(self, base_path, fmt='csv', max_queue=1_000_000, batch_size=4096,
+                 fsync_interval=5.0, rotate_bytes=0, rotate_seconds=0, header=("timestamp", "ECG_CH1"),
+                 session_metadata=None):
+        if fmt not in ('csv', 'binary', 'session'):
+            raise ValueError(f"Unknown format: {fmt}")
+
+        self.base_path = base_path
+        self.fmt = fmt
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.fsync_interval = fsync_interval
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.header = header
+        self.session_metadata = session_metadata or {}
+
+        # deque.append/popleft are atomic under the GIL, so the producer never takes a lock
+        self.queue = deque()
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.max_depth = 0
+        self.files = []
+
+        self.file = None
+        self.file_bytes = 0
+        self.file_opened_at = 0
+        self.last_fsync = 0
+        self.part = 0
+
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self._open_next_file()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="SampleWriter", daemon=True)
+        self.thread.start()
+
+    def enqueue(self, timestamp, value):
+        """Dipanggil dari stream callback: O(1), tidak pernah memblok"""
+        depth = len(self.queue)
+        if depth >= self.max_queue:
+            self.dropped += 1
+            return False
+        self.queue.append((timestamp, value))
+        self.enqueued += 1
+        if depth + 1 > self.max_depth:
+            self.max_depth = depth + 1
+        return True
+
+    def _file_name(self):
+        root, ext = os.path.splitext(self.base_path)
+        ext = ext or '.csv'
+        if self.fmt == 'binary' and ext == '.csv':
+            ext = '.bin'
+        elif self.fmt == 'session':
+            ext = SESSION_EXTENSION
+        if not (self.rotate_bytes or self.rotate_seconds):
+            return root + ext
+        return f"{root}_{self.part:03d}{ext}"
+
+    def _open_next_file(self):
+        if self.file:
+            self._sync(final=True)
+            self.file.close()
+
+        self.part += 1
+        path = self._file_name()
+        if self.fmt == 'csv':
+            self.file = open(path, 'w', newline='')
+        elif self.fmt == 'binary':
+            self.file = open(path, 'wb')
+        else:
+            self.file = SessionWriter(path, **self.session_metadata)
+        self.files.append(path)
+        self.file_bytes = 0
+        self.file_opened_at = time.monotonic()
+        self.last_fsync = self.file_opened_at
+
+        if self.fmt == 'csv' and self.header:
+            line = ",".join(self.header) + "\r\n"
+            self.file.write(line)
+            self.file_bytes += len(line)
+
+    def _should_rotate(self):
+        if self.rotate_bytes and self.file_bytes >= self.rotate_bytes:
+            return True
+        if self.rotate_seconds and time.monotonic() - self.file_opened_at >= self.rotate_seconds:
+            return True
+        return False
+
+    def _drain(self, limit):
+        batch = []
+        queue = self.queue
+        while queue and len(batch) < limit:
+            batch.append(queue.popleft())
+        return batch
+
+    def _write_batch(self, batch):
+        if self.fmt == 'csv':
+            text = io.StringIO()
+            csv.writer(text).writerows(batch)
+            data = text.getvalue()
+            self.file.write(data)
+            self.file_bytes += len(data)
+        elif self.fmt == 'binary':
+            records = np.array(batch, dtype=BINARY_DTYPE)
+            records.tofile(self.file)
+            self.file_bytes += records.nbytes
+        else:
+            records = np.array(batch, dtype=BINARY_DTYPE)
+            self.file.write(records['timestamp'], records['value'])
+            self.file_bytes = self.file.bytes_written
+        self.written += len(batch)
+
+    def _sync(self, final=False):
+        if self.fmt == 'session':
+            # Periodic syncs only persist full blocks; the partial one is written on close
+            self.file.flush(final=final)
+        else:
+            self.file.flush()
+        os.fsync(self.file.fileno())
+        self.last_fsync = time.monotonic()
+
+    def _run(self):
+        while self.running or self.queue:
+            batch = self._drain(self.batch_size)
+            if batch:
+                self._write_batch(batch)
+            elif self.running:
+                time.sleep(0.05)
+
+            if time.monotonic() - self.last_fsync >= self.fsync_interval:
+                self._sync()
+            if self._should_rotate():
+                self._open_next_file()
+
+    def stop(self):
+        """Stop thread, tulis sisa antrian, tutup file dan kembalikan statistik"""
+        depth_at_stop = len(self.queue)
+        self.running = False
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        if self.file:
+            self._sync(final=True)
+            self.file.close()
+            self.file = None
+
+        return {
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'queue_depth_at_stop': depth_at_stop,
+            'max_queue_depth': self.max_depth,
+            'files': list(self.files)
+        }
+
+
+def read_binary_log(path):
+    """Baca file binary dari BackgroundSampleWriter sebagai structured array"""
+    return np.fromfile(path, dtype=BINARY_DTYPE)